@@ -0,0 +1,42 @@
+"""rate_limit_logs.route_id on delete set null
+
+Revision ID: 006_rate_limit_log_route_fk
+Revises: 005_add_workflow_execution_indexes
+Create Date: 2026-10-17 10:00:00
+
+GatewayRoute.rate_limit_logs 改为 passive_deletes，删除路由时由数据库
+将限流日志的 route_id 置空，ORM 不再加载日志集合
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '006_rate_limit_log_route_fk'
+down_revision = '005_add_workflow_execution_indexes'
+branch_labels = None
+depends_on = None
+
+
+# 003 建表时按 Base.metadata 的命名约定生成的外键名
+FK_NAME = 'fk_rate_limit_logs_route_id_gateway_routes'
+
+
+def upgrade():
+    """route_id 外键改为 ON DELETE SET NULL"""
+    op.drop_constraint(FK_NAME, 'rate_limit_logs', type_='foreignkey')
+    op.create_foreign_key(
+        FK_NAME,
+        'rate_limit_logs', 'gateway_routes',
+        ['route_id'], ['id'],
+        ondelete='SET NULL'
+    )
+
+
+def downgrade():
+    """恢复为普通外键"""
+    op.drop_constraint(FK_NAME, 'rate_limit_logs', type_='foreignkey')
+    op.create_foreign_key(
+        FK_NAME,
+        'rate_limit_logs', 'gateway_routes',
+        ['route_id'], ['id']
+    )
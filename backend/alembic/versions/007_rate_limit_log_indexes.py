@@ -0,0 +1,39 @@
+"""rate_limit_logs composite indexes
+
+Revision ID: 007_rate_limit_log_indexes
+Revises: 006_rate_limit_log_route_fk
+Create Date: 2026-10-17 11:00:00
+
+按限流键 / 路由查询时间范围的复合索引；
+key_value 单列索引由复合索引的前导列覆盖，删除
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '007_rate_limit_log_indexes'
+down_revision = '006_rate_limit_log_route_fk'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """添加复合索引，删除冗余单列索引"""
+    op.create_index(
+        'ix_rate_limit_logs_key_created',
+        'rate_limit_logs',
+        ['key_value', 'created_at']
+    )
+    op.create_index(
+        'ix_rate_limit_logs_route_created',
+        'rate_limit_logs',
+        ['route_id', 'created_at']
+    )
+    op.drop_index('ix_rate_limit_logs_key_value', table_name='rate_limit_logs')
+
+
+def downgrade():
+    """恢复单列索引"""
+    op.create_index('ix_rate_limit_logs_key_value', 'rate_limit_logs', ['key_value'])
+    op.drop_index('ix_rate_limit_logs_route_created', table_name='rate_limit_logs')
+    op.drop_index('ix_rate_limit_logs_key_created', table_name='rate_limit_logs')
@@ -0,0 +1,57 @@
+"""gateway json columns to jsonb with gin indexes
+
+Revision ID: 008_gateway_jsonb
+Revises: 007_rate_limit_log_indexes
+Create Date: 2026-10-17 12:00:00
+
+路由方法、标签以及 API 密钥的权限范围、IP 白名单改为 JSONB，
+并为需要做包含查询 (@>) 的列添加 GIN 索引
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '008_gateway_jsonb'
+down_revision = '007_rate_limit_log_indexes'
+branch_labels = None
+depends_on = None
+
+
+JSONB_COLUMNS = [
+    ('gateway_routes', 'methods'),
+    ('gateway_routes', 'tags'),
+    ('api_keys', 'scopes'),
+    ('api_keys', 'allowed_ips'),
+]
+
+GIN_INDEXES = [
+    ('ix_gateway_routes_methods_gin', 'gateway_routes', 'methods'),
+    ('ix_api_keys_scopes_gin', 'api_keys', 'scopes'),
+    ('ix_api_keys_allowed_ips_gin', 'api_keys', 'allowed_ips'),
+]
+
+
+def upgrade():
+    """JSON 列改为 JSONB 并创建 GIN 索引"""
+    for table, column in JSONB_COLUMNS:
+        op.alter_column(
+            table, column,
+            type_=postgresql.JSONB(astext_type=sa.Text()),
+            postgresql_using=f'{column}::jsonb'
+        )
+    for name, table, column in GIN_INDEXES:
+        op.create_index(name, table, [column], postgresql_using='gin')
+
+
+def downgrade():
+    """删除 GIN 索引并恢复为 JSON"""
+    for name, table, _ in GIN_INDEXES:
+        op.drop_index(name, table_name=table)
+    for table, column in JSONB_COLUMNS:
+        op.alter_column(
+            table, column,
+            type_=postgresql.JSON(astext_type=sa.Text()),
+            postgresql_using=f'{column}::json'
+        )
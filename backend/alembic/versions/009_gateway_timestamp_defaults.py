@@ -0,0 +1,38 @@
+"""gateway timestamp server defaults
+
+Revision ID: 009_gateway_timestamp_defaults
+Revises: 008_gateway_jsonb
+Create Date: 2026-10-17 13:00:00
+
+created_at / updated_at 改由数据库生成默认值 (now())
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '009_gateway_timestamp_defaults'
+down_revision = '008_gateway_jsonb'
+branch_labels = None
+depends_on = None
+
+
+TIMESTAMP_COLUMNS = [
+    ('gateway_routes', 'created_at'),
+    ('gateway_routes', 'updated_at'),
+    ('api_keys', 'created_at'),
+    ('api_keys', 'updated_at'),
+    ('rate_limit_logs', 'created_at'),
+]
+
+
+def upgrade():
+    """添加 now() 默认值"""
+    for table, column in TIMESTAMP_COLUMNS:
+        op.alter_column(table, column, server_default=sa.func.now())
+
+
+def downgrade():
+    """移除默认值"""
+    for table, column in TIMESTAMP_COLUMNS:
+        op.alter_column(table, column, server_default=None)
@@ -0,0 +1,26 @@
+"""api_keys fillfactor
+
+Revision ID: 010_api_keys_fillfactor
+Revises: 009_gateway_timestamp_defaults
+Create Date: 2026-10-17 14:00:00
+
+api_keys 每次验证都会更新使用统计，降低 fillfactor 以便 HOT 更新
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '010_api_keys_fillfactor'
+down_revision = '009_gateway_timestamp_defaults'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """设置 fillfactor = 70"""
+    op.execute('ALTER TABLE api_keys SET (fillfactor = 70)')
+
+
+def downgrade():
+    """恢复默认 fillfactor"""
+    op.execute('ALTER TABLE api_keys RESET (fillfactor)')
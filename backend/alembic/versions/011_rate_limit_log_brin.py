@@ -0,0 +1,33 @@
+"""rate_limit_logs created_at brin index
+
+Revision ID: 011_rate_limit_log_brin
+Revises: 010_api_keys_fillfactor
+Create Date: 2026-10-17 15:00:00
+
+created_at 随写入单调递增，单列 B-tree 索引替换为 BRIN
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '011_rate_limit_log_brin'
+down_revision = '010_api_keys_fillfactor'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """B-tree 索引替换为 BRIN"""
+    op.create_index(
+        'ix_rate_limit_logs_created_brin',
+        'rate_limit_logs',
+        ['created_at'],
+        postgresql_using='brin'
+    )
+    op.drop_index('ix_rate_limit_logs_created_at', table_name='rate_limit_logs')
+
+
+def downgrade():
+    """恢复 B-tree 索引"""
+    op.create_index('ix_rate_limit_logs_created_at', 'rate_limit_logs', ['created_at'])
+    op.drop_index('ix_rate_limit_logs_created_brin', table_name='rate_limit_logs')
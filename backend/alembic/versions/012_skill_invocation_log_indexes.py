@@ -0,0 +1,31 @@
+"""drop redundant skill_invocation_logs single-column indexes
+
+Revision ID: 012_skill_invocation_log_indexes
+Revises: 011_rate_limit_log_brin
+Create Date: 2026-10-17 16:00:00
+
+skill_id、user_id、status 分别是 idx_skill_invocation_*_date 复合索引的首列，
+单列索引只增加写入开销
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '012_skill_invocation_log_indexes'
+down_revision = '011_rate_limit_log_brin'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """删除被复合索引前缀覆盖的单列索引"""
+    op.drop_index('ix_skill_invocation_logs_skill_id', table_name='skill_invocation_logs')
+    op.drop_index('ix_skill_invocation_logs_user_id', table_name='skill_invocation_logs')
+    op.drop_index('ix_skill_invocation_logs_status', table_name='skill_invocation_logs')
+
+
+def downgrade():
+    """恢复单列索引"""
+    op.create_index('ix_skill_invocation_logs_status', 'skill_invocation_logs', ['status'])
+    op.create_index('ix_skill_invocation_logs_user_id', 'skill_invocation_logs', ['user_id'])
+    op.create_index('ix_skill_invocation_logs_skill_id', 'skill_invocation_logs', ['skill_id'])
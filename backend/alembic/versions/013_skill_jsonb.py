@@ -0,0 +1,51 @@
+"""skill and workflow json columns to jsonb
+
+Revision ID: 013_skill_jsonb
+Revises: 012_skill_invocation_log_indexes
+Create Date: 2026-10-17 17:00:00
+
+技能、技能版本、工作流以及技能调用/错误日志的 JSON 列改为 JSONB，
+读取时不再重新解析文本
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '013_skill_jsonb'
+down_revision = '012_skill_invocation_log_indexes'
+branch_labels = None
+depends_on = None
+
+
+JSONB_COLUMNS = [
+    ('skills', 'config'),
+    ('skills', 'tags'),
+    ('skill_versions', 'metadata'),
+    ('workflows', 'definition'),
+    ('workflows', 'variables'),
+    ('skill_invocation_logs', 'input_params'),
+    ('skill_invocation_logs', 'metadata'),
+    ('skill_error_logs', 'metadata'),
+]
+
+
+def upgrade():
+    """JSON 列改为 JSONB"""
+    for table, column in JSONB_COLUMNS:
+        op.alter_column(
+            table, column,
+            type_=postgresql.JSONB(astext_type=sa.Text()),
+            postgresql_using=f'"{column}"::jsonb'
+        )
+
+
+def downgrade():
+    """恢复为 JSON"""
+    for table, column in JSONB_COLUMNS:
+        op.alter_column(
+            table, column,
+            type_=postgresql.JSON(astext_type=sa.Text()),
+            postgresql_using=f'"{column}"::json'
+        )
@@ -0,0 +1,157 @@
+"""rate_limit_logs partitioned by month
+
+Revision ID: 014_rate_limit_logs_partitioned
+Revises: 013_skill_jsonb
+Create Date: 2026-10-17 18:00:00
+
+rate_limit_logs 改为按 created_at 每月一个分区的分区表：旧表改名后新建分区表，
+按旧数据覆盖的月份建好分区再整表复制，最后删除旧表。
+主键改为 (id, created_at)，id 由 SERIAL 改为 IDENTITY
+"""
+from datetime import date, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '014_rate_limit_logs_partitioned'
+down_revision = '013_skill_jsonb'
+branch_labels = None
+depends_on = None
+
+
+TABLE = 'rate_limit_logs'
+# 与 app.database.PARTITION_MONTHS_AHEAD 一致，之后的分区由定时任务补齐
+PARTITION_MONTHS_AHEAD = 2
+
+COLUMNS = [
+    'id', 'key_type', 'key_value', 'route_id', 'path', 'method',
+    'limit', 'window_seconds', 'current_count', 'blocked', 'created_at',
+]
+INDEXES = [
+    ('ix_rate_limit_logs_key_created', ['key_value', 'created_at'], {}),
+    ('ix_rate_limit_logs_route_created', ['route_id', 'created_at'], {}),
+    ('ix_rate_limit_logs_created_brin', ['created_at'], {'postgresql_using': 'brin'}),
+]
+
+
+def _columns(id_column: sa.Column) -> list:
+    return [
+        id_column,
+        sa.Column('key_type', sa.String(length=20), nullable=False),
+        sa.Column('key_value', sa.String(length=100), nullable=False),
+        sa.Column('route_id', sa.Integer(), nullable=True),
+        sa.Column('path', sa.String(length=500), nullable=False),
+        sa.Column('method', sa.String(length=10), nullable=False),
+        sa.Column('limit', sa.Integer(), nullable=False),
+        sa.Column('window_seconds', sa.Integer(), nullable=False),
+        sa.Column('current_count', sa.Integer(), nullable=False),
+        sa.Column('blocked', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.ForeignKeyConstraint(['route_id'], ['gateway_routes.id'], ondelete='SET NULL'),
+    ]
+
+
+def _next_month(day: date) -> date:
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def _is_partitioned() -> bool:
+    return bool(op.get_bind().execute(
+        sa.text("SELECT relkind = 'p' FROM pg_class WHERE relname = :name"), {'name': TABLE}
+    ).scalar())
+
+
+def _move_aside(suffix: str, index_names: list) -> str:
+    """
+    旧表改名，并让出主键、序列和索引的名称
+
+    约束名由 Base.metadata 的命名约定生成（pk_<表名>），与 003 建表时一致
+    """
+    old = f'{TABLE}_{suffix}'
+    op.rename_table(TABLE, old)
+    op.execute(f'ALTER TABLE "{old}" RENAME CONSTRAINT "pk_{TABLE}" TO "pk_{old}"')
+    op.execute(f'ALTER SEQUENCE IF EXISTS "{TABLE}_id_seq" RENAME TO "{old}_id_seq"')
+    for name in index_names:
+        op.drop_index(name, table_name=old)
+    return old
+
+
+def _create_partitions(source: str) -> None:
+    """
+    创建旧数据覆盖的各月份以及之后几个月的分区和默认分区
+
+    分区命名与 app.database.ensure_partitions 一致；先建好月份分区，
+    避免复制的数据全部落入默认分区
+    """
+    first, last = op.get_bind().execute(
+        sa.text(f'SELECT MIN(created_at), MAX(created_at) FROM "{source}"')
+    ).one()
+    today = date.today()
+    start = (first.date() if first else today).replace(day=1)
+    stop = max(last.date() if last else today, today)
+    for _ in range(PARTITION_MONTHS_AHEAD):
+        stop = _next_month(stop)
+    while start <= stop:
+        end = _next_month(start)
+        op.execute(
+            f'CREATE TABLE "{TABLE}_p{start:%Y%m}" PARTITION OF "{TABLE}" '
+            f"FOR VALUES FROM ('{start}') TO ('{end}')"
+        )
+        start = end
+    op.execute(f'CREATE TABLE "{TABLE}_default" PARTITION OF "{TABLE}" DEFAULT')
+
+
+def _copy_rows(source: str) -> None:
+    """整表复制并把 id 序列推进到已有最大值之后"""
+    columns = ', '.join(f'"{c}"' for c in COLUMNS)
+    op.execute(f'INSERT INTO "{TABLE}" ({columns}) SELECT {columns} FROM "{source}"')
+    op.execute(
+        f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), "
+        f'COALESCE(MAX(id), 0) + 1, false) FROM "{TABLE}"'
+    )
+
+
+def _create_indexes() -> None:
+    for name, columns, kwargs in INDEXES:
+        op.create_index(name, TABLE, columns, **kwargs)
+
+
+def upgrade():
+    """转换为按月分区表"""
+    if _is_partitioned():
+        return
+
+    old = _move_aside('old', [name for name, _, _ in INDEXES])
+
+    op.create_table(
+        TABLE,
+        *_columns(sa.Column('id', sa.Integer(), sa.Identity(), nullable=False)),
+        sa.PrimaryKeyConstraint('id', 'created_at'),
+        postgresql_partition_by='RANGE (created_at)'
+    )
+
+    _create_partitions(old)
+    _copy_rows(old)
+    _create_indexes()
+    op.drop_table(old)
+
+
+def downgrade():
+    """恢复为普通表"""
+    if not _is_partitioned():
+        return
+
+    partitioned = _move_aside('partitioned', [name for name, _, _ in INDEXES])
+
+    op.create_table(
+        TABLE,
+        *_columns(sa.Column('id', sa.Integer(), autoincrement=True, nullable=False)),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    _copy_rows(partitioned)
+    _create_indexes()
+    # 删除分区表时各月分区一并删除
+    op.drop_table(partitioned)
@@ -0,0 +1,212 @@
+"""skill invocation and view logs partitioned by month
+
+Revision ID: 015_skill_logs_partitioned
+Revises: 014_rate_limit_logs_partitioned
+Create Date: 2026-10-17 19:00:00
+
+skill_invocation_logs（按 started_at）和 skill_view_logs（按 created_at）改为每月一个
+分区的分区表：旧表改名后新建分区表，按旧数据覆盖的月份建好分区再整表复制，最后删除旧表。
+主键改为 (id, 分区键)，id 由 SERIAL 改为 IDENTITY。
+
+skill_view_logs 不由迁移创建（init_db 中 create_all 建表），库中没有该表时跳过，
+之后由 create_all 直接建为分区表；skill_stat_execution_logs 是新表，同样由 create_all 创建
+"""
+from datetime import date, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '015_skill_logs_partitioned'
+down_revision = '014_rate_limit_logs_partitioned'
+branch_labels = None
+depends_on = None
+
+
+# 与 app.database.PARTITION_MONTHS_AHEAD 一致，之后的分区由定时任务补齐
+PARTITION_MONTHS_AHEAD = 2
+
+
+def _invocation_columns(id_column: sa.Column) -> list:
+    return [
+        id_column,
+        sa.Column('skill_id', sa.Integer(), nullable=False),
+        sa.Column('skill_name', sa.String(length=255), nullable=False),
+        sa.Column('skill_version', sa.String(length=50), nullable=True),
+        sa.Column('execution_type', sa.String(length=50), nullable=False, server_default='api'),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('session_id', sa.Integer(), nullable=True),
+        sa.Column('request_id', sa.String(length=100), nullable=True),
+        sa.Column('input_params', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('output_data', sa.Text(), nullable=True),
+        sa.Column('error_message', sa.Text(), nullable=True),
+        sa.Column('error_type', sa.String(length=100), nullable=True),
+        sa.Column('error_stack_trace', sa.Text(), nullable=True),
+        sa.Column('duration_ms', sa.Integer(), nullable=True),
+        sa.Column('memory_bytes', sa.Integer(), nullable=True),
+        sa.Column('cpu_percent', sa.Float(), nullable=True),
+        sa.Column('metadata', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    ]
+
+
+def _view_columns(id_column: sa.Column) -> list:
+    return [
+        id_column,
+        sa.Column('skill_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('source', sa.String(length=50), nullable=True),
+        sa.Column('referrer', sa.String(length=500), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['skill_id'], ['published_skills.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+    ]
+
+
+# (表名, 分区键, 列定义, 分区表索引, 仅普通表上的索引)
+TABLES = [
+    (
+        'skill_invocation_logs', 'started_at', _invocation_columns,
+        [
+            ('ix_skill_invocation_logs_session_id', ['session_id']),
+            ('ix_skill_invocation_logs_request_id', ['request_id']),
+            ('ix_skill_invocation_logs_started_at', ['started_at']),
+            ('idx_skill_invocation_skill_date', ['skill_id', 'started_at']),
+            ('idx_skill_invocation_user_date', ['user_id', 'started_at']),
+            ('idx_skill_invocation_status_date', ['status', 'started_at']),
+        ],
+        # 组合主键以 id 开头，分区表上不再单独为 id 建索引
+        [('ix_skill_invocation_logs_id', ['id'])],
+    ),
+    (
+        'skill_view_logs', 'created_at', _view_columns,
+        [
+            ('ix_skill_view_logs_skill_created', ['skill_id', 'created_at']),
+            ('ix_skill_view_logs_user_id', ['user_id']),
+            ('ix_skill_view_logs_created_at', ['created_at']),
+        ],
+        [('ix_skill_view_logs_id', ['id'])],
+    ),
+]
+
+
+def _next_month(day: date) -> date:
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def _relkind(table: str):
+    """pg_class 中的表类型：'r' 普通表，'p' 分区表，表不存在时为 None"""
+    return op.get_bind().execute(
+        sa.text(
+            "SELECT CAST(relkind AS text) FROM pg_class "
+            "WHERE relname = :name AND relkind IN ('r', 'p')"
+        ),
+        {'name': table}
+    ).scalar()
+
+
+def _move_aside(table: str, suffix: str) -> str:
+    """
+    旧表改名，并让出主键、序列和索引的名称
+
+    两张表曾经由 create_all 或迁移建立，索引集合不一定相同，按系统表查出后删除
+    """
+    bind = op.get_bind()
+    old = f'{table}_{suffix}'
+    op.rename_table(table, old)
+
+    pk_name = bind.execute(sa.text(
+        "SELECT conname FROM pg_constraint "
+        "WHERE conrelid = CAST(:name AS regclass) AND contype = 'p'"
+    ), {'name': old}).scalar()
+    op.execute(f'ALTER TABLE "{old}" RENAME CONSTRAINT "{pk_name}" TO "pk_{old}"')
+    op.execute(f'ALTER SEQUENCE IF EXISTS "{table}_id_seq" RENAME TO "{old}_id_seq"')
+
+    index_names = bind.execute(sa.text(
+        "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE i.indrelid = CAST(:name AS regclass) AND NOT i.indisprimary"
+    ), {'name': old}).scalars().all()
+    for name in index_names:
+        op.drop_index(name, table_name=old)
+    return old
+
+
+def _create_partitions(table: str, column: str, source: str) -> None:
+    """
+    创建旧数据覆盖的各月份以及之后几个月的分区和默认分区
+
+    分区命名与 app.database.ensure_partitions 一致；先建好月份分区，
+    避免复制的数据全部落入默认分区
+    """
+    first, last = op.get_bind().execute(
+        sa.text(f'SELECT MIN("{column}"), MAX("{column}") FROM "{source}"')
+    ).one()
+    today = date.today()
+    start = (first.date() if first else today).replace(day=1)
+    stop = max(last.date() if last else today, today)
+    for _ in range(PARTITION_MONTHS_AHEAD):
+        stop = _next_month(stop)
+    while start <= stop:
+        end = _next_month(start)
+        op.execute(
+            f'CREATE TABLE "{table}_p{start:%Y%m}" PARTITION OF "{table}" '
+            f"FOR VALUES FROM ('{start}') TO ('{end}')"
+        )
+        start = end
+    op.execute(f'CREATE TABLE "{table}_default" PARTITION OF "{table}" DEFAULT')
+
+
+def _copy_rows(table: str, columns: list, source: str) -> None:
+    """整表复制并把 id 序列推进到已有最大值之后"""
+    names = ', '.join(f'"{c.name}"' for c in columns if isinstance(c, sa.Column))
+    op.execute(f'INSERT INTO "{table}" ({names}) SELECT {names} FROM "{source}"')
+    op.execute(
+        f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+        f'COALESCE(MAX(id), 0) + 1, false) FROM "{table}"'
+    )
+
+
+def upgrade():
+    """转换为按月分区表"""
+    for table, column, columns, indexes, _ in TABLES:
+        if _relkind(table) != 'r':
+            continue
+
+        old = _move_aside(table, 'old')
+        table_columns = columns(sa.Column('id', sa.Integer(), sa.Identity(), nullable=False))
+        op.create_table(
+            table,
+            *table_columns,
+            sa.PrimaryKeyConstraint('id', column),
+            postgresql_partition_by=f'RANGE ({column})'
+        )
+        _create_partitions(table, column, old)
+        _copy_rows(table, table_columns, old)
+        for name, index_columns in indexes:
+            op.create_index(name, table, index_columns)
+        op.drop_table(old)
+
+
+def downgrade():
+    """恢复为普通表"""
+    for table, column, columns, indexes, plain_indexes in reversed(TABLES):
+        if _relkind(table) != 'p':
+            continue
+
+        partitioned = _move_aside(table, 'partitioned')
+        table_columns = columns(sa.Column('id', sa.Integer(), autoincrement=True, nullable=False))
+        op.create_table(
+            table,
+            *table_columns,
+            sa.PrimaryKeyConstraint('id')
+        )
+        _copy_rows(table, table_columns, partitioned)
+        for name, index_columns in plain_indexes + indexes:
+            op.create_index(name, table, index_columns)
+        # 删除分区表时各月分区一并删除
+        op.drop_table(partitioned)
@@ -12,7 +12,7 @@ from app.database import get_db
 from app.core.security import get_current_user, get_current_admin_user
 from app.models.user import User
 from app.models.billing import (
-    BillingPlan, Subscription, BillingUsage, BillingBill,
+    BillingPlan, Subscription, BillingUsage, BillingBill, BillingLoaders,
     BillingPlanType, BillingCycle, BillingUsageType, SubscriptionStatus, BillStatus
 )
 from app.schemas.billing import (
@@ -22,6 +22,7 @@ from app.schemas.billing import (
     SubscriptionCreate, SubscriptionResponse, SubscriptionListResponse,
     # 用量
     UsageQueryParams, UsageResponse, UsageSummary, UsageRecord, SkillUsageSummary,
+    UsageRecordBatchRequest,
     # 账单
     BillCreate, BillResponse, BillListResponse, BillGenerateResponse,
     # 配置
@@ -205,7 +206,11 @@ async def list_subscriptions(
     获取用户订阅列表
     """
     from sqlalchemy import select
-    query = select(Subscription).where(Subscription.user_id == current_user.id)
+    query = (
+        select(Subscription)
+        .options(*BillingLoaders.subscription_with_plan)
+        .where(Subscription.user_id == current_user.id)
+    )
     
     if status:
         query = query.where(Subscription.status == status)
@@ -366,6 +371,43 @@ async def record_usage(
         )
 
 
+@router.post("/usage/record/batch")
+async def record_usage_batch(
+    request: UsageRecordBatchRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    批量记录用量
+    
+    内部接口，一次执行产生的多种资源用量（调用次数、CPU、内存、执行时间等）
+    一并上报，订阅只查询一次，用量记录通过一条 INSERT 写入
+    """
+    try:
+        count = await UsageTrackingService.record_usage_batch(
+            db,
+            subscription_id=request.subscription_id,
+            user_id=current_user.id,
+            items=[
+                {
+                    "usage_type": BillingUsageType(item.usage_type.value),
+                    "quantity": item.quantity,
+                    "skill_id": item.skill_id,
+                    "skill_name": item.skill_name,
+                    "metadata": item.metadata,
+                }
+                for item in request.items
+            ]
+        )
+        
+        return {"message": "Usage recorded", "count": count}
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
 # ============ 账单管理 ============
 
 @router.get("/bills", response_model=BillListResponse)
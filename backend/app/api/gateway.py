@@ -458,7 +458,7 @@ async def get_gateway_stats(
 ):
     """获取网关统计信息"""
     from sqlalchemy import func
-    from datetime import date
+    from datetime import date, timedelta
     
     service = GatewayService(db, cache.client if cache._connected else None)
     
@@ -479,18 +479,22 @@ async def get_gateway_stats(
     ) or 0
     
     # 获取今日请求统计（从限流日志）
-    today = date.today()
+    # 使用 created_at 范围条件而非 date(created_at)，可以走 created_at 索引
+    today_start = datetime.combine(date.today(), datetime.min.time())
+    tomorrow_start = today_start + timedelta(days=1)
     from app.models.gateway import RateLimitLog
     
     requests_today = await db.scalar(
         func.count(RateLimitLog.id).where(
-            func.date(RateLimitLog.created_at) == today
+            RateLimitLog.created_at >= today_start,
+            RateLimitLog.created_at < tomorrow_start
         )
     ) or 0
     
     blocked_today = await db.scalar(
         func.count(RateLimitLog.id).where(
-            func.date(RateLimitLog.created_at) == today,
+            RateLimitLog.created_at >= today_start,
+            RateLimitLog.created_at < tomorrow_start,
             RateLimitLog.blocked == True
         )
     ) or 0
@@ -350,7 +350,7 @@ async def upload_skill_package(
         package_id=skill_package.id,
         version=version,
         file_size=file_size,
-        checksum=checksum
+        checksum=skill_package.checksum_hex
     )
 
 
@@ -13,7 +13,7 @@ import logging
 from app.database import get_db
 from app.core.security import get_current_user, get_optional_user
 from app.models.user import User
-from app.services.stats_service import StatsService
+from app.services.stats_service import StatsLogBuffer, StatsService
 from app.schemas.stats import (
     OverviewStatsResponse,
     SkillStatsResponse,
@@ -291,18 +291,17 @@ async def record_install(
 @router.post("/record/execution", status_code=status.HTTP_204_NO_CONTENT)
 async def record_execution(
     request: RecordExecutionRequest = Body(...),
-    db: AsyncSession = Depends(get_db),
     current_user: Optional[User] = Depends(get_optional_user)
 ):
     """
     记录执行
     
     用于统计技能使用量。记录执行类型、结果、时长等。
+    日志放入队列后由后台批量写入，接口不等待写库。
     """
-    stats_service = StatsService(db)
     user_id = current_user.id if current_user else None
     
-    success = await stats_service.record_execution(
+    StatsLogBuffer.record_execution(
         skill_id=request.skill_id,
         user_id=user_id,
         session_id=request.session_id,
@@ -314,40 +313,27 @@ async def record_execution(
         error_message=request.error_message,
         metadata=request.metadata
     )
-    
-    if not success:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to record execution"
-        )
 
 
 @router.post("/record/view", status_code=status.HTTP_204_NO_CONTENT)
 async def record_view(
     request: RecordViewRequest = Body(...),
-    db: AsyncSession = Depends(get_db),
     current_user: Optional[User] = Depends(get_optional_user)
 ):
     """
     记录浏览
     
     用于统计技能浏览量。记录来源和referrer。
+    日志放入队列后由后台批量写入，接口不等待写库。
     """
-    stats_service = StatsService(db)
     user_id = current_user.id if current_user else None
     
-    success = await stats_service.record_view(
+    StatsLogBuffer.record_view(
         skill_id=request.skill_id,
         user_id=user_id,
         source=request.source,
         referrer=request.referrer
     )
-    
-    if not success:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to record view"
-        )
 
 
 @router.post("/record/search", status_code=status.HTTP_204_NO_CONTENT)
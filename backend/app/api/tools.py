@@ -261,7 +261,7 @@ async def add_execution_log(
         tool_call_id=tool_call_id,
         log_level=log.log_level,
         message=log.message,
-        metadata=json.dumps(log.metadata) if log.metadata else None
+        extra_data=json.dumps(log.metadata) if log.metadata else None
     )
 
     db.add(db_log)
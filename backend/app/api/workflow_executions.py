@@ -252,7 +252,7 @@ async def _save_execution_logs(
             execution_id=execution_id,
             level=log_data.get("level", "INFO"),
             message=log_data.get("message", ""),
-            metadata=log_data.get("metadata", {})
+            extra_data=log_data.get("metadata", {})
         )
         db.add(log)
     
@@ -29,6 +29,7 @@ class Settings(BaseSettings):
     DEBUG: bool = False
     BASE_DIR: str = "/tmp"  # 基础目录，用于文件存储等
     ENVIRONMENT: str = "development"  # development, staging, production
+    LOG_FORMAT: str = "text"  # text, json
     
     # API配置
     API_V1_PREFIX: str = "/api/v1"
@@ -40,10 +41,13 @@ class Settings(BaseSettings):
     DB_POOL_TIMEOUT: int = 30
     DB_POOL_RECYCLE: int = 3600
     DB_ECHO: bool = False
+    DB_STATEMENT_CACHE_SIZE: int = 1024  # 每个连接缓存的预编译语句数
+    DB_USE_PGBOUNCER: bool = False  # 经 PgBouncer 事务池连接时关闭预编译语句缓存
     
     # Redis配置
     REDIS_URL: str = "redis://localhost:6379/0"
     REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_POOL_TIMEOUT: int = 5  # 连接池耗尽时等待空闲连接的秒数
     
     # JWT配置
     SECRET_KEY: str  # 必须从环境变量加载，无默认值
@@ -68,6 +72,7 @@ class Settings(BaseSettings):
     
     # API限流配置
     RATE_LIMIT_PER_MINUTE: int = 60
+    MAX_INFLIGHT_REQUESTS: int = 256  # 单个 worker 同时处理的 HTTP 请求上限，超出时直接返回 503；0 表示不限制
     
     # WebSocket配置
     WS_HEARTBEAT_INTERVAL: int = 30
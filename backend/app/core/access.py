@@ -0,0 +1,185 @@
+"""
+访问中间件
+
+把限流和请求日志合并为一个纯 ASGI 中间件，每个请求只经过一层包装，
+也没有 BaseHTTPMiddleware 的请求/响应流桥接。
+"""
+import itertools
+import logging
+import os
+from time import perf_counter_ns
+
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.error_codes import ErrorCode, create_error_response
+from app.core.monitoring import ErrorLogger, PerformanceMonitor
+from app.core.rate_limit import check_rate_limit, client_ip_from_scope
+
+logger = logging.getLogger(__name__)
+
+# 请求ID：进程级随机前缀 + 自增计数，避免每个请求读取 /dev/urandom
+_REQUEST_ID_PREFIX = os.urandom(6).hex()
+_next_request_number = itertools.count(1).__next__
+
+
+def _new_request_id() -> str:
+    """生成本进程内唯一的请求ID"""
+    return f"{_REQUEST_ID_PREFIX}-{_next_request_number():x}"
+
+
+def _overloaded_response() -> JSONResponse:
+    """并发数超限时的 503 响应"""
+    error_response = create_error_response(ErrorCode.SERVICE_OVERLOADED)
+    return JSONResponse(
+        status_code=error_response.http_status,
+        content=error_response.to_dict(),
+        headers={"Retry-After": "1"}
+    )
+
+
+class AccessMiddleware:
+    """
+    访问中间件
+
+    对每个 HTTP 请求（CORS 预检请求除外）：
+    - 生成或透传请求ID (X-Request-ID)
+    - 同时处理的请求数达到 max_inflight 时直接返回 503，不在 worker 内排队
+      （健康检查不受限制）
+    - 执行限流检查，超限时直接返回 429
+    - 在响应头中添加请求ID、限流信息和响应时间 (X-Response-Time)
+    - 记录访问日志 (request_id, method, path, status_code, duration_ms, client_ip)
+    - 记录请求性能 (PerformanceMonitor，健康检查、文档等路径除外)，未处理的异常记入 ErrorLogger
+    """
+
+    def __init__(self, app: ASGIApp, max_inflight: int = 0):
+        self.app = app
+        self.max_inflight = max_inflight
+        # 只在事件循环线程中增减，不需要加锁
+        self._inflight = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+
+        # CORS 预检请求直接交给 CORSMiddleware，不计入限流也不记访问日志
+        if scope["method"] == "OPTIONS" and "access-control-request-method" in request.headers:
+            await self.app(scope, receive, send)
+            return
+
+        request_id = request.headers.get("x-request-id") or _new_request_id()
+
+        # 访问日志关闭时跳过计时和日志（isEnabledFor 的结果由 logging 内部缓存）
+        log_enabled = logger.isEnabledFor(logging.INFO)
+        start_ns = perf_counter_ns()
+        status_code = 500
+
+        if (
+            self.max_inflight
+            and self._inflight >= self.max_inflight
+            and not scope["path"].startswith("/health")
+        ):
+            rejected, extra_headers = _overloaded_response(), []
+        else:
+            rejected, extra_headers = await check_rate_limit(request)
+
+        if rejected is not None:
+            rejected.headers["X-Request-ID"] = request_id
+            status_code = rejected.status_code
+            await rejected(scope, receive, send)
+        else:
+            path = scope["path"]
+            monitored = path not in PerformanceMonitor.EXCLUDED_PATHS
+
+            async def send_wrapper(message: Message) -> None:
+                nonlocal status_code
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                    headers = MutableHeaders(scope=message)
+                    headers["X-Request-ID"] = request_id
+                    if monitored:
+                        headers["X-Response-Time"] = f"{(perf_counter_ns() - start_ns) / 1_000_000:.2f}ms"
+                    for name, value in extra_headers:
+                        headers.raw.append((name, value))
+                await send(message)
+
+            self._inflight += 1
+            try:
+                await self.app(scope, receive, send_wrapper)
+            except Exception as e:
+                duration_ms = (perf_counter_ns() - start_ns) / 1_000_000
+                if monitored:
+                    await ErrorLogger.log_error(
+                        error_type=type(e).__name__,
+                        message=str(e),
+                        endpoint=path,
+                        method=request.method
+                    )
+                logger.error(
+                    "request_failed",
+                    extra={
+                        "request_id": request_id,
+                        "method": request.method,
+                        "path": request.url.path,
+                        "duration_ms": round(duration_ms, 2),
+                        "client_ip": client_ip_from_scope(scope),
+                        "error": str(e),
+                    }
+                )
+                raise
+            finally:
+                self._inflight -= 1
+
+            if monitored:
+                PerformanceMonitor.record_completed(
+                    path, request.method, (perf_counter_ns() - start_ns) / 1_000_000, status_code
+                )
+
+        if log_enabled:
+            duration_ms = (perf_counter_ns() - start_ns) / 1_000_000
+            logger.info(
+                "request_completed",
+                extra={
+                    "request_id": request_id,
+                    "method": request.method,
+                    "path": request.url.path,
+                    "status_code": status_code,
+                    "duration_ms": round(duration_ms, 2),
+                    "client_ip": client_ip_from_scope(scope),
+                }
+            )
+
+
+class LivenessProbeMiddleware:
+    """
+    存活探针中间件
+
+    注册在最外层，对 GET 探针路径直接返回预先序列化的响应体，
+    不经过限流、访问日志和路由匹配
+    """
+
+    def __init__(self, app: ASGIApp, path: str, body: bytes):
+        self.app = app
+        self.path = path
+        self.body = body
+        self.start_message = {
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        }
+        self.body_message = {"type": "http.response.body", "body": body}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["path"] == self.path and scope["method"] == "GET":
+            await send(self.start_message)
+            await send(self.body_message)
+            return
+        await self.app(scope, receive, send)
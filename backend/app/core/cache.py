@@ -5,7 +5,7 @@ Redis缓存模块
 """
 import json
 import hashlib
-from typing import Optional, Any, List, Callable
+from typing import Optional, Any, Dict, List, Callable
 from datetime import timedelta
 from functools import wraps
 import redis.asyncio as redis
@@ -21,16 +21,25 @@ class CacheManager:
     
     def __init__(self):
         self.client: Optional[redis.Redis] = None
+        self.pool: Optional[redis.BlockingConnectionPool] = None
         self._connected = False
     
     async def connect(self):
-        """连接到Redis"""
+        """
+        连接到Redis（所有调用方共享同一个连接池）
+
+        连接数达到上限时，请求等待空闲连接（最多 REDIS_POOL_TIMEOUT 秒），
+        而不是直接报错
+        """
         try:
-            self.client = redis.from_url(
+            self.pool = redis.BlockingConnectionPool.from_url(
                 settings.REDIS_URL,
+                max_connections=settings.REDIS_MAX_CONNECTIONS,
+                timeout=settings.REDIS_POOL_TIMEOUT,
                 encoding="utf-8",
                 decode_responses=True
             )
+            self.client = redis.Redis(connection_pool=self.pool)
             # 测试连接
             await self.client.ping()
             self._connected = True
@@ -43,8 +52,20 @@ class CacheManager:
         """断开Redis连接"""
         if self.client:
             await self.client.close()
+            if self.pool:
+                await self.pool.disconnect()
             self._connected = False
             logger.info("Disconnected from Redis cache")
+
+    def pool_stats(self) -> Dict[str, int]:
+        """连接池使用情况，in_use 接近 max_connections 说明连接池将被耗尽"""
+        if not self.pool:
+            return {}
+        return {
+            "max_connections": self.pool.max_connections,
+            "in_use": len(self.pool._in_use_connections),
+            "available": len(self.pool._available_connections)
+        }
     
     def _generate_key(self, prefix: str, *args, **kwargs) -> str:
         """生成缓存键"""
@@ -13,6 +13,7 @@ class ErrorCode(str, Enum):
     INVALID_REQUEST = "ERR_1001"
     VALIDATION_ERROR = "ERR_1002"
     RATE_LIMIT_EXCEEDED = "ERR_1003"
+    SERVICE_OVERLOADED = "ERR_1004"
     
     # 认证错误 (2xxx)
     UNAUTHORIZED = "ERR_2000"
@@ -93,6 +94,7 @@ ERROR_CODE_TO_HTTP_STATUS = {
     ErrorCode.INVALID_REQUEST: 400,
     ErrorCode.VALIDATION_ERROR: 422,
     ErrorCode.RATE_LIMIT_EXCEEDED: 429,
+    ErrorCode.SERVICE_OVERLOADED: 503,
     
     ErrorCode.UNAUTHORIZED: 401,
     ErrorCode.INVALID_TOKEN: 401,
@@ -140,6 +142,7 @@ ERROR_CODE_TO_MESSAGE = {
     ErrorCode.INVALID_REQUEST: "Invalid request parameters",
     ErrorCode.VALIDATION_ERROR: "Validation failed",
     ErrorCode.RATE_LIMIT_EXCEEDED: "Too many requests. Please try again later",
+    ErrorCode.SERVICE_OVERLOADED: "Server is busy. Please try again later",
     
     ErrorCode.UNAUTHORIZED: "Authentication required",
     ErrorCode.INVALID_TOKEN: "Invalid authentication token",
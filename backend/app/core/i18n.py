@@ -49,6 +49,12 @@ ERROR_MESSAGES: Dict[str, Dict[str, str]] = {
         "zh-TW": "請求過於頻繁，請稍後再試",
         "ja": "リクエストが多すぎます。後でもう一度お試しください"
     },
+    "ERR_1004": {
+        "en": "Server is busy. Please try again later",
+        "zh-CN": "服务器繁忙，请稍后再试",
+        "zh-TW": "伺服器繁忙，請稍後再試",
+        "ja": "サーバーが混雑しています。後でもう一度お試しください"
+    },
     
     # 认证错误 (2xxx)
     "ERR_2000": {
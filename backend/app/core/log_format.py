@@ -0,0 +1,64 @@
+"""
+日志格式化模块
+
+通过 logging 的 extra= 传入结构化字段，由格式化器统一输出：
+- JSONFormatter: 每条记录序列化为一行 JSON，便于日志管道直接解析
+- KeyValueFormatter: 在常规文本格式后追加 key=value 字段，便于本地阅读
+"""
+import json
+import logging
+from typing import Any, Dict
+
+try:
+    import orjson
+
+    def _dumps(obj: Any) -> str:
+        return orjson.dumps(obj, default=str).decode()
+except ImportError:  # orjson 未安装时使用标准库
+    def _dumps(obj: Any) -> str:
+        return json.dumps(obj, ensure_ascii=False, default=str)
+
+
+# LogRecord 自带的属性，其余属性均来自 extra=
+_RESERVED_ATTRS = frozenset(
+    vars(logging.LogRecord("", 0, "", 0, "", None, None))
+) | {"message", "asctime"}
+
+
+def _extra_fields(record: logging.LogRecord) -> Dict[str, Any]:
+    """提取通过 extra= 附加到记录上的字段"""
+    return {
+        key: value for key, value in record.__dict__.items()
+        if key not in _RESERVED_ATTRS
+    }
+
+
+class JSONFormatter(logging.Formatter):
+    """单行 JSON 格式化器"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        payload.update(_extra_fields(record))
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return _dumps(payload)
+
+
+class KeyValueFormatter(logging.Formatter):
+    """文本格式化器，在消息后追加 extra 字段"""
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        line = super().formatMessage(record)
+        extra = _extra_fields(record)
+        if not extra:
+            return line
+        fields = " | ".join(
+            f'{key}="{value}"' if isinstance(value, str) else f"{key}={value}"
+            for key, value in extra.items()
+        )
+        return f"{line} | {fields}"
@@ -9,23 +9,135 @@
 import time
 import logging
 import json
-from typing import Optional, Dict, Any, List, Callable
+import os
+import random
+import traceback
+from typing import Optional, Dict, Any, List, Callable, Deque, Tuple, Union
 from datetime import datetime, timedelta
-from functools import wraps
-from collections import defaultdict
+from functools import wraps, lru_cache
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
 import asyncio
 
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import JSONResponse
 
 from app.core.cache import cache
 
+try:
+    import orjson
+
+    def _dumps(obj: Any) -> bytes:
+        # 直接返回 bytes 交给 LPUSH，省去 str 再编码回 UTF-8 的往返
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+    _loads = orjson.loads
+except ImportError:  # orjson 未安装时使用标准库
+    _dumps = json.dumps
+    _loads = json.loads
+
+try:
+    import psutil
+
+    # 当前进程句柄只创建一次；首次调用 cpu_percent 作为基准，之后非阻塞取增量
+    _process = psutil.Process(os.getpid())
+    psutil.cpu_percent(interval=None)
+except ImportError:  # psutil 未安装时系统指标不可用
+    psutil = None
+    _process = None
+
 logger = logging.getLogger(__name__)
 
+# 当前 UTC 日期字符串及其失效时间（下一个 UTC 零点的时间戳）
+_today_str = ""
+_today_expires_at = 0.0
+
+
+def _today() -> str:
+    """返回当前 UTC 日期（YYYY-MM-DD），跨过零点前复用同一个字符串"""
+    global _today_str, _today_expires_at
+    now = time.time()
+    if now >= _today_expires_at:
+        day = datetime.utcfromtimestamp(now).date()
+        _today_str = day.strftime("%Y-%m-%d")
+        _today_expires_at = (
+            datetime(day.year, day.month, day.day) + timedelta(days=1) - datetime(1970, 1, 1)
+        ).total_seconds()
+    return _today_str
+
+
+# 每写入多少条日志列表记录执行一次 LTRIM（列表最多超出上限这么多条）
+LTRIM_INTERVAL = 100
+
+_lpush_counts: Dict[str, int] = defaultdict(int)
+
+
+def _should_trim(list_name: str, pushed: int = 1) -> bool:
+    """记录写入列表的条数，返回本次是否需要对列表执行 LTRIM"""
+    before = _lpush_counts[list_name]
+    after = before + pushed
+    _lpush_counts[list_name] = after
+    return before // LTRIM_INTERVAL != after // LTRIM_INTERVAL
+
+
+# 已解码的日志列表记录: {列表名: {原始 JSON: 解码结果}}
+_MAX_DECODED_LISTS = 32
+_decoded_logs: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+
+def _decode_logs(list_name: str, logs: List[str]) -> List[Dict[str, Any]]:
+    """
+    解码从 Redis 列表读取的 JSON 记录
+
+    仪表盘轮询时大部分记录在上次读取时已经解码过，按原始字符串复用
+    上次的解码结果，只对新写入的记录执行解码。返回的字典在
+    多次调用间共享，调用方不应修改。
+    """
+    previous = _decoded_logs.get(list_name, {})
+    current: Dict[str, Dict[str, Any]] = {}
+    result = []
+    for log in logs:
+        record = previous.get(log)
+        if record is None:
+            record = _loads(log)
+        current[log] = record
+        result.append(record)
+
+    if list_name not in _decoded_logs and len(_decoded_logs) >= _MAX_DECODED_LISTS:
+        _decoded_logs.clear()
+    _decoded_logs[list_name] = current
+    return result
+
 
 # ============= 性能监控 =============
 
+@dataclass(slots=True)
+class EndpointStats:
+    """单个端点的性能统计记录"""
+
+    total_requests: int = 0
+    total_time_ms: float = 0.0
+    error_count: int = 0
+    slow_count: int = 0
+    last_updated: float = 0.0  # time.time()，读取时再格式化
+    # get_stats 计算出的派生指标，记录变化时置空
+    snapshot: Optional[Dict[str, Any]] = field(default=None, repr=False, compare=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """返回派生指标，未变化时复用上次的计算结果"""
+        if self.snapshot is None:
+            total = self.total_requests
+            self.snapshot = {
+                "total_requests": total,
+                "avg_time_ms": round(self.total_time_ms / total, 2),
+                "error_count": self.error_count,
+                "error_rate": round(self.error_count / total * 100, 2),
+                "slow_count": self.slow_count,
+                "slow_rate": round(self.slow_count / total * 100, 2),
+                "last_updated": datetime.utcfromtimestamp(self.last_updated).isoformat()
+            }
+        return self.snapshot
+
+
 class PerformanceMonitor:
     """API性能监控"""
 
@@ -33,14 +145,69 @@ class PerformanceMonitor:
     SLOW_REQUEST_THRESHOLD_MS = 1000  # 慢请求阈值（毫秒）
     VERY_SLOW_REQUEST_THRESHOLD_MS = 5000  # 非常慢请求阈值
 
-    # 统计数据
-    _stats: Dict[str, Dict[str, Any]] = defaultdict(lambda: {
-        "total_requests": 0,
-        "total_time_ms": 0,
-        "error_count": 0,
-        "slow_count": 0,
-        "last_updated": None
-    })
+    # 正常快速请求的采样率：每 SAMPLE_RATE 个记录一个，计数按权重放大（1 表示不采样）
+    SAMPLE_RATE = 10
+
+    # 不做性能监控的路径
+    EXCLUDED_PATHS = frozenset({"/health", "/metrics", "/", "/docs", "/openapi.json"})
+
+    # 统计数据: {(method, endpoint): EndpointStats}
+    _stats: Dict[Tuple[str, str], EndpointStats] = {}
+
+    # 待刷新到 Redis 的增量: {(method, endpoint): [count, time_ms]}，由 MonitoringFlusher 定期写出
+    _pending: Dict[Tuple[str, str], List[float]] = defaultdict(lambda: [0, 0.0])
+
+    @classmethod
+    def record_request_sync(
+        cls,
+        endpoint: str,
+        method: str,
+        duration_ms: float,
+        status_code: int,
+        weight: int = 1
+    ):
+        """
+        记录请求性能（不做任何 IO）
+
+        端点计数以增量形式累计，慢请求记录放入 MonitoringFlusher 的队列，
+        两者都由后台任务批量写入 Redis。weight 为采样权重，一条记录
+        代表 weight 个请求。
+        """
+        key = (method, endpoint)
+        stats = cls._stats.get(key)
+        if stats is None:
+            stats = cls._stats[key] = EndpointStats()
+
+        now = time.time()
+        stats.total_requests += weight
+        stats.total_time_ms += duration_ms * weight
+        stats.last_updated = now
+        stats.snapshot = None
+
+        if status_code >= 400:
+            stats.error_count += weight
+
+        if duration_ms > cls.SLOW_REQUEST_THRESHOLD_MS:
+            stats.slow_count += weight
+
+        if not cache._connected or not cache.client:
+            return
+
+        pending = cls._pending[key]
+        pending[0] += weight
+        pending[1] += duration_ms * weight
+
+        # 快速路径：非慢请求不产生 Redis 写入
+        if duration_ms <= cls.SLOW_REQUEST_THRESHOLD_MS:
+            return
+
+        MonitoringFlusher.enqueue("slow", {
+            "endpoint": endpoint,
+            "method": method,
+            "duration_ms": duration_ms,
+            "status_code": status_code,
+            "timestamp": datetime.utcfromtimestamp(now).isoformat()
+        })
 
     @classmethod
     async def record_request(
@@ -49,76 +216,74 @@ class PerformanceMonitor:
         method: str,
         duration_ms: float,
         status_code: int,
-        error: Optional[str] = None
+        error: Optional[str] = None,
+        weight: int = 1
     ):
         """记录请求性能"""
-        key = f"{method}:{endpoint}"
-        stats = cls._stats[key]
+        cls.record_request_sync(endpoint, method, duration_ms, status_code, weight)
 
-        stats["total_requests"] += 1
-        stats["total_time_ms"] += duration_ms
-        stats["last_updated"] = datetime.utcnow().isoformat()
+    @classmethod
+    def record_completed(cls, endpoint: str, method: str, duration_ms: float, status_code: int):
+        """
+        请求结束时由访问中间件调用（不做任何 IO）
 
-        if status_code >= 400:
-            stats["error_count"] += 1
+        按采样权重记录请求性能，慢请求同时写警告日志
+        """
+        weight = cls.sample_weight(duration_ms, status_code)
+        if weight:
+            cls.record_request_sync(endpoint, method, duration_ms, status_code, weight)
 
         if duration_ms > cls.SLOW_REQUEST_THRESHOLD_MS:
-            stats["slow_count"] += 1
+            logger.warning(
+                "Slow request: %s %s took %.2fms",
+                method,
+                endpoint,
+                duration_ms
+            )
 
-        # 记录到Redis
-        if cache._connected and cache.client:
-            try:
-                # 记录到时间序列
-                today = datetime.utcnow().strftime("%Y-%m-%d")
-                hour = datetime.utcnow().strftime("%H")
-
-                # 端点性能统计
-                await cache.client.hset(
-                    f"monitor:api:{today}",
-                    f"{key}:count",
-                    stats["total_requests"]
-                )
-                await cache.client.hset(
-                    f"monitor:api:{today}",
-                    f"{key}:time",
-                    stats["total_time_ms"]
-                )
+    @classmethod
+    def sample_weight(cls, duration_ms: float, status_code: int) -> int:
+        """
+        返回请求的采样权重，0 表示不记录
+
+        错误和慢请求总是记录；正常快速请求按 1/SAMPLE_RATE 采样，
+        被采中的记录以 SAMPLE_RATE 为权重放大计数。
+        """
+        if status_code >= 400 or duration_ms > cls.SLOW_REQUEST_THRESHOLD_MS:
+            return 1
+        if cls.SAMPLE_RATE <= 1:
+            return 1
+        if random.random() < 1.0 / cls.SAMPLE_RATE:
+            return cls.SAMPLE_RATE
+        return 0
 
-                # 记录慢请求
-                if duration_ms > cls.SLOW_REQUEST_THRESHOLD_MS:
-                    slow_log = {
-                        "endpoint": endpoint,
-                        "method": method,
-                        "duration_ms": duration_ms,
-                        "status_code": status_code,
-                        "timestamp": datetime.utcnow().isoformat()
-                    }
-                    await cache.client.lpush(
-                        f"monitor:slow:{today}",
-                        json.dumps(slow_log)
-                    )
-                    # 保留最近1000条
-                    await cache.client.ltrim(f"monitor:slow:{today}", 0, 999)
+    @classmethod
+    def take_pending(cls) -> Dict[Tuple[str, str], List[float]]:
+        """取出并清空累计的端点增量"""
+        pending, cls._pending = cls._pending, defaultdict(lambda: [0, 0.0])
+        return pending
 
-            except Exception as e:
-                logger.error(f"Failed to record performance to Redis: {e}")
+    @classmethod
+    def restore_pending(cls, pending: Dict[Tuple[str, str], List[float]]):
+        """写入失败时把增量合并回去，等待下次刷新"""
+        for key, (count, time_ms) in pending.items():
+            merged = cls._pending[key]
+            merged[0] += count
+            merged[1] += time_ms
 
     @classmethod
     def get_stats(cls) -> Dict[str, Any]:
-        """获取性能统计"""
-        result = {}
-        for key, stats in cls._stats.items():
-            if stats["total_requests"] > 0:
-                result[key] = {
-                    "total_requests": stats["total_requests"],
-                    "avg_time_ms": round(stats["total_time_ms"] / stats["total_requests"], 2),
-                    "error_count": stats["error_count"],
-                    "error_rate": round(stats["error_count"] / stats["total_requests"] * 100, 2),
-                    "slow_count": stats["slow_count"],
-                    "slow_rate": round(stats["slow_count"] / stats["total_requests"] * 100, 2),
-                    "last_updated": stats["last_updated"]
-                }
-        return result
+        """
+        获取性能统计
+
+        只重新计算自上次调用以来有新请求的端点，仪表盘频繁轮询时
+        大部分端点直接复用缓存结果。
+        """
+        return {
+            f"{method}:{endpoint}": stats.to_dict()
+            for (method, endpoint), stats in cls._stats.items()
+            if stats.total_requests > 0
+        }
 
     @classmethod
     async def get_slow_requests(
@@ -131,29 +296,52 @@ class PerformanceMonitor:
             return []
 
         if not date:
-            date = datetime.utcnow().strftime("%Y-%m-%d")
+            date = _today()
 
         try:
-            logs = await cache.client.lrange(f"monitor:slow:{date}", 0, limit - 1)
-            return [json.loads(log) for log in logs]
+            list_name = f"monitor:slow:{date}"
+            logs = await cache.client.lrange(list_name, 0, limit - 1)
+            return _decode_logs(list_name, logs)
         except Exception as e:
-            logger.error(f"Failed to get slow requests: {e}")
+            logger.error("Failed to get slow requests: %s", e)
             return []
 
     @classmethod
-    async def get_daily_stats(cls, date: Optional[str] = None) -> Dict[str, Any]:
-        """获取每日统计"""
+    async def get_daily_stats(
+        cls,
+        date: Optional[str] = None,
+        endpoints: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        获取每日统计
+
+        Args:
+            date: 日期（YYYY-MM-DD），默认今天
+            endpoints: 只返回这些端点（"METHOD:path"）的字段，使用 HMGET 代替 HGETALL
+        """
         if not cache._connected or not cache.client:
             return {}
 
         if not date:
-            date = datetime.utcnow().strftime("%Y-%m-%d")
+            date = _today()
 
         try:
-            data = await cache.client.hgetall(f"monitor:api:{date}")
-            return data or {}
+            if endpoints is None:
+                data = await cache.client.hgetall(f"monitor:api:{date}")
+                return data or {}
+
+            if not endpoints:
+                return {}
+
+            fields = [f"{e}:count" for e in endpoints] + [f"{e}:time" for e in endpoints]
+            values = await cache.client.hmget(f"monitor:api:{date}", fields)
+            return {
+                field: value
+                for field, value in zip(fields, values)
+                if value is not None
+            }
         except Exception as e:
-            logger.error(f"Failed to get daily stats: {e}")
+            logger.error("Failed to get daily stats: %s", e)
             return {}
 
 
@@ -162,7 +350,11 @@ class PerformanceMonitor:
 class ErrorLogger:
     """错误日志收集器"""
 
-    _errors: List[Dict[str, Any]] = []
+    # 是否在错误记录中附带完整堆栈（堆栈较大，默认关闭以减小写入 Redis 的数据量）
+    INCLUDE_TRACEBACKS = False
+
+    # 内存中保留最近100条，超出时自动淘汰最旧的记录
+    _errors: Deque[Dict[str, Any]] = deque(maxlen=100)
 
     @classmethod
     async def log_error(
@@ -187,30 +379,17 @@ class ErrorLogger:
             "timestamp": datetime.utcnow().isoformat()
         }
 
-        # 内存中保留最近100条
         cls._errors.append(error_log)
-        if len(cls._errors) > 100:
-            cls._errors = cls._errors[-100:]
 
-        # 记录到Redis
+        # 记录到Redis（由后台任务批量写入）
         if cache._connected and cache.client:
-            try:
-                today = datetime.utcnow().strftime("%Y-%m-%d")
-                await cache.client.lpush(
-                    f"monitor:errors:{today}",
-                    json.dumps(error_log)
-                )
-                # 保留最近1000条
-                await cache.client.ltrim(f"monitor:errors:{today}", 0, 999)
-
-                # 增加错误计数
-                await cache.client.incr(f"monitor:errors:{today}:count")
-            except Exception as e:
-                logger.error(f"Failed to log error to Redis: {e}")
+            MonitoringFlusher.enqueue("errors", error_log)
 
         # 同时记录到日志
         logger.error(
-            f"API Error: {error_type} - {message}",
+            "API Error: %s - %s",
+            error_type,
+            message,
             extra={
                 "endpoint": endpoint,
                 "method": method,
@@ -226,17 +405,18 @@ class ErrorLogger:
     ) -> List[Dict[str, Any]]:
         """获取最近错误"""
         if not cache._connected or not cache.client:
-            return cls._errors[-limit:]
+            return list(cls._errors)[-limit:]
 
         if not date:
-            date = datetime.utcnow().strftime("%Y-%m-%d")
+            date = _today()
 
         try:
-            logs = await cache.client.lrange(f"monitor:errors:{date}", 0, limit - 1)
-            return [json.loads(log) for log in logs]
+            list_name = f"monitor:errors:{date}"
+            logs = await cache.client.lrange(list_name, 0, limit - 1)
+            return _decode_logs(list_name, logs)
         except Exception as e:
-            logger.error(f"Failed to get errors: {e}")
-            return cls._errors[-limit:]
+            logger.error("Failed to get errors: %s", e)
+            return list(cls._errors)[-limit:]
 
     @classmethod
     async def get_error_count(cls, date: Optional[str] = None) -> int:
@@ -245,18 +425,24 @@ class ErrorLogger:
             return len(cls._errors)
 
         if not date:
-            date = datetime.utcnow().strftime("%Y-%m-%d")
+            date = _today()
 
         try:
             count = await cache.client.get(f"monitor:errors:{date}:count")
             return int(count) if count else 0
         except Exception as e:
-            logger.error(f"Failed to get error count: {e}")
+            logger.error("Failed to get error count: %s", e)
             return 0
 
 
 # ============= 慢查询检测 =============
 
+@lru_cache(maxsize=1024)
+def _truncate_query(query: str) -> str:
+    """截断长查询（同一查询文本反复出现时复用同一个截断结果）"""
+    return query[:500] if len(query) > 500 else query
+
+
 class SlowQueryDetector:
     """慢查询检测器"""
 
@@ -273,32 +459,23 @@ class SlowQueryDetector:
         if duration_ms < cls.SLOW_QUERY_THRESHOLD_MS:
             return
 
-        query_log = {
-            "query": query[:500] if len(query) > 500 else query,  # 截断长查询
+        if logger.isEnabledFor(logging.WARNING):
+            logger.warning(
+                "Slow query detected: %.2fms",
+                duration_ms,
+                extra={"query": query[:200]}
+            )
+
+        # 记录到Redis（由后台任务批量写入）；未连接时不构建记录
+        if not cache._connected or not cache.client:
+            return
+
+        MonitoringFlusher.enqueue("slow_queries", {
+            "query": _truncate_query(query),  # 截断长查询
             "duration_ms": round(duration_ms, 2),
             "params": params,
             "timestamp": datetime.utcnow().isoformat()
-        }
-
-        logger.warning(
-            f"Slow query detected: {duration_ms:.2f}ms",
-            extra={"query": query[:200]}
-        )
-
-        # 记录到Redis
-        if cache._connected and cache.client:
-            try:
-                today = datetime.utcnow().strftime("%Y-%m-%d")
-                await cache.client.lpush(
-                    f"monitor:slow_queries:{today}",
-                    json.dumps(query_log)
-                )
-                await cache.client.ltrim(f"monitor:slow_queries:{today}", 0, 499)
-
-                # 增加慢查询计数
-                await cache.client.incr(f"monitor:slow_queries:{today}:count")
-            except Exception as e:
-                logger.error(f"Failed to log slow query: {e}")
+        })
 
     @classmethod
     async def get_slow_queries(
@@ -311,13 +488,14 @@ class SlowQueryDetector:
             return []
 
         if not date:
-            date = datetime.utcnow().strftime("%Y-%m-%d")
+            date = _today()
 
         try:
-            logs = await cache.client.lrange(f"monitor:slow_queries:{date}", 0, limit - 1)
-            return [json.loads(log) for log in logs]
+            list_name = f"monitor:slow_queries:{date}"
+            logs = await cache.client.lrange(list_name, 0, limit - 1)
+            return _decode_logs(list_name, logs)
         except Exception as e:
-            logger.error(f"Failed to get slow queries: {e}")
+            logger.error("Failed to get slow queries: %s", e)
             return []
 
     @classmethod
@@ -327,63 +505,184 @@ class SlowQueryDetector:
             return 0
 
         if not date:
-            date = datetime.utcnow().strftime("%Y-%m-%d")
+            date = _today()
 
         try:
             count = await cache.client.get(f"monitor:slow_queries:{date}:count")
             return int(count) if count else 0
         except Exception as e:
-            logger.error(f"Failed to get slow query count: {e}")
+            logger.error("Failed to get slow query count: %s", e)
             return 0
 
 
-# ============= 监控中间件 =============
+# ============= 后台批量写入 =============
+
+class MonitoringFlusher:
+    """
+    监控数据后台写入器
+
+    请求路径上只把事件放入内存队列，后台任务把一段时间内的事件和端点
+    计数增量合并成一次 pipeline 写入 Redis，Redis 延迟不再计入请求耗时。
+    队列有上限，写满时丢弃新事件而不是阻塞请求。
+    """
 
-class MonitoringMiddleware(BaseHTTPMiddleware):
-    """监控中间件"""
+    MAX_QUEUE_SIZE = 10000  # 队列上限
+    MAX_BATCH_SIZE = 500  # 单次 pipeline 最多包含的事件数
+    LINGER_SECONDS = 0.05  # 收到事件后等待更多事件合并写入的时间
+    COUNTER_FLUSH_INTERVAL_SECONDS = 5  # 端点计数增量的刷新间隔
 
-    async def dispatch(self, request: Request, call_next):
-        # 排除健康检查等路径
-        if request.url.path in ["/health", "/metrics", "/"]:
-            return await call_next(request)
+    # 各日志列表保留的条数
+    LIST_CAPS = {"slow": 1000, "errors": 1000, "slow_queries": 500}
+    # 同时维护每日计数的日志列表
+    COUNTED_LISTS = frozenset({"errors", "slow_queries"})
 
-        start_time = time.time()
-        error = None
+    _queue: "asyncio.Queue[Tuple[str, str, Dict[str, Any]]]" = asyncio.Queue(
+        maxsize=MAX_QUEUE_SIZE
+    )
+    _task: Optional[asyncio.Task] = None
+    dropped_events = 0
 
+    @classmethod
+    def enqueue(cls, list_name: str, record: Dict[str, Any]):
+        """把一条日志记录放入写入队列（不阻塞）"""
         try:
-            response = await call_next(request)
-        except Exception as e:
-            error = str(e)
-            await ErrorLogger.log_error(
-                error_type=type(e).__name__,
-                message=str(e),
-                endpoint=request.url.path,
-                method=request.method
-            )
-            raise
+            cls._queue.put_nowait((list_name, _today(), record))
+        except asyncio.QueueFull:
+            cls.dropped_events += 1
 
-        # 计算响应时间
-        duration_ms = (time.time() - start_time) * 1000
+    @classmethod
+    def start(cls):
+        """
+        启动后台写入任务
+
+        _run 中等待 queue.get() 会把队列绑定到当时的事件循环，同一进程内
+        再次启动（新的 lifespan）时换成新队列，并把尚未写出的事件转移过去
+        """
+        if cls._task is None or cls._task.done():
+            queue = asyncio.Queue(maxsize=cls.MAX_QUEUE_SIZE)
+            while True:
+                try:
+                    queue.put_nowait(cls._queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            cls._queue = queue
+            cls._task = asyncio.create_task(cls._run())
 
-        # 记录性能
-        await PerformanceMonitor.record_request(
-            endpoint=request.url.path,
-            method=request.method,
-            duration_ms=duration_ms,
-            status_code=response.status_code,
-            error=error
-        )
+    @classmethod
+    async def stop(cls):
+        """停止后台写入任务并写出剩余数据"""
+        if cls._task is not None:
+            cls._task.cancel()
+            try:
+                await cls._task
+            except asyncio.CancelledError:
+                pass
+            cls._task = None
+        await cls.flush()
 
-        # 添加性能头
-        response.headers["X-Response-Time"] = f"{duration_ms:.2f}ms"
+    @classmethod
+    async def flush(cls):
+        """
+        写出调用时队列中已有的事件和端点计数增量
+
+        只处理开始时的队列长度，写入期间新到达的事件留给下一轮，
+        事件持续涌入时关闭流程也能结束
+        """
+        pending = cls._queue.qsize()
+        while True:
+            events = cls._drain([], min(pending, cls.MAX_BATCH_SIZE))
+            pending -= len(events)
+            await cls._write(events, flush_counters=True)
+            if pending <= 0 or not events:
+                break
 
-        # 记录慢请求日志
-        if duration_ms > PerformanceMonitor.SLOW_REQUEST_THRESHOLD_MS:
-            logger.warning(
-                f"Slow request: {request.method} {request.url.path} took {duration_ms:.2f}ms"
-            )
+    @classmethod
+    def _drain(
+        cls,
+        events: List[Tuple[str, str, Dict[str, Any]]],
+        limit: Optional[int] = None
+    ):
+        """从队列中非阻塞地取出事件，直到队列为空或达到批量上限（默认 MAX_BATCH_SIZE）"""
+        limit = cls.MAX_BATCH_SIZE if limit is None else limit
+        while len(events) < limit:
+            try:
+                events.append(cls._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return events
+
+    @classmethod
+    async def _run(cls):
+        """后台循环：合并事件并定期刷新端点计数"""
+        loop = asyncio.get_running_loop()
+        next_counter_flush = loop.time() + cls.COUNTER_FLUSH_INTERVAL_SECONDS
+
+        while True:
+            timeout = max(0.0, next_counter_flush - loop.time())
+            events = []
+            try:
+                events.append(await asyncio.wait_for(cls._queue.get(), timeout=timeout))
+                await asyncio.sleep(cls.LINGER_SECONDS)
+                cls._drain(events)
+            except asyncio.TimeoutError:
+                pass
+
+            flush_counters = loop.time() >= next_counter_flush
+            if flush_counters:
+                next_counter_flush = loop.time() + cls.COUNTER_FLUSH_INTERVAL_SECONDS
+
+            try:
+                await cls._write(events, flush_counters)
+            except Exception as e:
+                logger.error("Monitoring flusher error: %s", e)
+
+    @classmethod
+    async def _write(
+        cls,
+        events: List[Tuple[str, str, Dict[str, Any]]],
+        flush_counters: bool
+    ):
+        """把一批事件（以及可选的端点计数增量）通过一次 pipeline 写入 Redis"""
+        if not cache._connected or not cache.client:
+            return
+
+        pending = PerformanceMonitor.take_pending() if flush_counters else {}
+        skill_pending = SkillExecutionMetrics.take_pending() if flush_counters else {}
+        if not events and not pending and not skill_pending:
+            return
 
-        return response
+        try:
+            # 同一列表的记录合并为一条 LPUSH（按入队顺序压入，最新的在表头）
+            grouped: Dict[Tuple[str, str], List[Union[str, bytes]]] = {}
+            for list_name, date, record in events:
+                grouped.setdefault((list_name, date), []).append(_dumps(record))
+
+            async with cache.client.pipeline(transaction=False) as pipe:
+                for (list_name, date), payloads in grouped.items():
+                    list_key = f"monitor:{list_name}:{date}"
+                    pipe.lpush(list_key, *payloads)
+                    if _should_trim(list_name, len(payloads)):
+                        pipe.ltrim(list_key, 0, cls.LIST_CAPS[list_name] - 1)
+                    if list_name in cls.COUNTED_LISTS:
+                        pipe.incrby(f"{list_key}:count", len(payloads))
+
+                if pending:
+                    today = _today()
+                    for (method, endpoint), (count, time_ms) in pending.items():
+                        key = f"{method}:{endpoint}"
+                        pipe.hincrby(f"monitor:api:{today}", f"{key}:count", count)
+                        pipe.hincrbyfloat(f"monitor:api:{today}", f"{key}:time", time_ms)
+
+                if skill_pending:
+                    today = _today()
+                    for (skill_id, outcome), count in skill_pending.items():
+                        pipe.hincrby(f"monitor:skills:{today}", f"{skill_id}:{outcome}", count)
+
+                await pipe.execute()
+        except Exception as e:
+            logger.error("Failed to write monitoring data to Redis: %s", e)
+            PerformanceMonitor.restore_pending(pending)
+            SkillExecutionMetrics.restore_pending(skill_pending)
 
 
 # ============= 查询监控装饰器 =============
@@ -392,10 +691,10 @@ def monitor_query(func):
     """查询监控装饰器"""
     @wraps(func)
     async def wrapper(*args, **kwargs):
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
         try:
             result = await func(*args, **kwargs)
-            duration_ms = (time.time() - start_time) * 1000
+            duration_ms = (time.perf_counter_ns() - start_ns) / 1_000_000
 
             # 记录慢查询
             await SlowQueryDetector.log_query(
@@ -406,12 +705,16 @@ def monitor_query(func):
 
             return result
         except Exception as e:
-            duration_ms = (time.time() - start_time) * 1000
+            stack_trace = None
+            if ErrorLogger.INCLUDE_TRACEBACKS:
+                stack_trace = "".join(
+                    traceback.format_exception(type(e), e, e.__traceback__)
+                )
             await ErrorLogger.log_error(
                 error_type=type(e).__name__,
                 message=str(e),
                 endpoint=func.__name__,
-                stack_trace=str(e.__traceback__) if hasattr(e, '__traceback__') else None
+                stack_trace=stack_trace
             )
             raise
 
@@ -423,31 +726,88 @@ def monitor_query(func):
 class MonitoringStats:
     """监控统计数据"""
 
+    @staticmethod
+    async def fetch_batched(date: str, limit: int = 20) -> Dict[str, Any]:
+        """
+        通过一次 pipeline 读取某天的全部监控数据
+
+        Redis 不可用或 pipeline 失败时退回到各模块自己的读取方法。
+        """
+        if cache._connected and cache.client:
+            try:
+                async with cache.client.pipeline(transaction=False) as pipe:
+                    pipe.lrange(f"monitor:slow:{date}", 0, limit - 1)
+                    pipe.get(f"monitor:errors:{date}:count")
+                    pipe.lrange(f"monitor:errors:{date}", 0, limit - 1)
+                    pipe.get(f"monitor:slow_queries:{date}:count")
+                    pipe.lrange(f"monitor:slow_queries:{date}", 0, limit - 1)
+                    pipe.hgetall(f"monitor:api:{date}")
+                    (
+                        slow_requests,
+                        error_count,
+                        recent_errors,
+                        slow_query_count,
+                        slow_queries,
+                        daily,
+                    ) = await pipe.execute()
+
+                return {
+                    "slow_requests": _decode_logs(f"monitor:slow:{date}", slow_requests),
+                    "error_count": int(error_count) if error_count else 0,
+                    "recent_errors": _decode_logs(f"monitor:errors:{date}", recent_errors),
+                    "slow_query_count": int(slow_query_count) if slow_query_count else 0,
+                    "slow_queries": _decode_logs(f"monitor:slow_queries:{date}", slow_queries),
+                    "daily": daily or {},
+                }
+            except Exception as e:
+                logger.error("Failed to fetch monitoring stats in batch: %s", e)
+
+        (
+            slow_requests,
+            error_count,
+            recent_errors,
+            slow_query_count,
+            slow_queries,
+            daily,
+        ) = await asyncio.gather(
+            PerformanceMonitor.get_slow_requests(date, limit=limit),
+            ErrorLogger.get_error_count(date),
+            ErrorLogger.get_recent_errors(date, limit=limit),
+            SlowQueryDetector.get_slow_query_count(date),
+            SlowQueryDetector.get_slow_queries(date, limit=limit),
+            PerformanceMonitor.get_daily_stats(date),
+        )
+        return {
+            "slow_requests": slow_requests,
+            "error_count": error_count,
+            "recent_errors": recent_errors,
+            "slow_query_count": slow_query_count,
+            "slow_queries": slow_queries,
+            "daily": daily,
+        }
+
     @staticmethod
     async def get_full_stats() -> Dict[str, Any]:
         """获取完整监控统计"""
-        today = datetime.utcnow().strftime("%Y-%m-%d")
+        today = _today()
 
         performance_stats = PerformanceMonitor.get_stats()
-        slow_requests = await PerformanceMonitor.get_slow_requests(today, limit=20)
-        error_count = await ErrorLogger.get_error_count(today)
-        recent_errors = await ErrorLogger.get_recent_errors(today, limit=20)
-        slow_query_count = await SlowQueryDetector.get_slow_query_count(today)
-        slow_queries = await SlowQueryDetector.get_slow_queries(today, limit=20)
+        batch = await MonitoringStats.fetch_batched(today, limit=20)
 
         return {
             "date": today,
             "performance": {
                 "endpoints": performance_stats,
-                "slow_requests": slow_requests
+                "slow_requests": batch["slow_requests"],
+                "daily": batch["daily"]
             },
             "errors": {
-                "count": error_count,
-                "recent": recent_errors
+                "count": batch["error_count"],
+                "recent": batch["recent_errors"]
             },
             "queries": {
-                "slow_count": slow_query_count,
-                "slow_queries": slow_queries
+                "slow_count": batch["slow_query_count"],
+                "slow_queries": batch["slow_queries"]
             },
             "thresholds": {
                 "slow_request_ms": PerformanceMonitor.SLOW_REQUEST_THRESHOLD_MS,
@@ -462,17 +822,30 @@ class SystemMetrics:
     """系统资源监控"""
     
     _metrics: Dict[str, Any] = {}
-    
+
+    # 是否采集本进程的网络连接数和打开文件数（都需要扫描 /proc，可分别关闭）
+    COLLECT_NET_CONNECTIONS = True
+    COLLECT_OPEN_FILES = True
+    # 上述进程扫描结果的缓存时间（秒）
+    PROCESS_SCAN_TTL_SECONDS = 5.0
+
+    _connections: Optional[int] = None
+    _open_files: Optional[int] = None
+    _process_scan_expires_at = 0.0
+    _cpu_count: Optional[int] = None
+
     @classmethod
     async def collect(cls) -> Dict[str, Any]:
         """收集系统指标"""
-        import psutil
-        import os
-        
+        if psutil is None:
+            return {"error": "psutil not installed"}
+
         try:
-            # CPU 使用率
-            cpu_percent = psutil.cpu_percent(interval=0.1)
-            cpu_count = psutil.cpu_count()
+            # CPU 使用率：自上次调用以来的平均值，不阻塞事件循环
+            cpu_percent = psutil.cpu_percent(interval=None)
+            if cls._cpu_count is None:
+                cls._cpu_count = psutil.cpu_count()
+            cpu_count = cls._cpu_count
             
             # 内存使用
             memory = psutil.virtual_memory()
@@ -481,11 +854,19 @@ class SystemMetrics:
             disk = psutil.disk_usage('/')
             
             # 进程信息
-            process = psutil.Process(os.getpid())
+            process = _process
             process_memory = process.memory_info()
             
-            # 网络连接数
-            connections = len(psutil.net_connections())
+            # 网络连接数（只统计本进程的 inet 连接）和打开文件数，缓存一段时间
+            now = time.monotonic()
+            if now >= cls._process_scan_expires_at:
+                if cls.COLLECT_NET_CONNECTIONS:
+                    # psutil 6 起 connections() 更名为 net_connections()
+                    net_connections = getattr(process, "net_connections", None) or process.connections
+                    cls._connections = len(net_connections(kind="inet"))
+                if cls.COLLECT_OPEN_FILES:
+                    cls._open_files = len(process.open_files())
+                cls._process_scan_expires_at = now + cls.PROCESS_SCAN_TTL_SECONDS
             
             cls._metrics = {
                 "cpu": {
@@ -508,20 +889,18 @@ class SystemMetrics:
                 "process": {
                     "rss_mb": round(process_memory.rss / (1024 * 1024), 2),
                     "vms_mb": round(process_memory.vms / (1024 * 1024), 2),
-                    "open_files": len(process.open_files()) if hasattr(process, 'open_files') else 0,
+                    "open_files": cls._open_files if cls.COLLECT_OPEN_FILES else None,
                     "threads": process.num_threads()
                 },
                 "network": {
-                    "connections": connections
-                }
+                    "connections": cls._connections if cls.COLLECT_NET_CONNECTIONS else None
+                },
+                "redis_pool": cache.pool_stats()
             }
             
             return cls._metrics
-        except ImportError:
-            # psutil 未安装
-            return {"error": "psutil not installed"}
         except Exception as e:
-            logger.error(f"Failed to collect system metrics: {e}")
+            logger.error("Failed to collect system metrics: %s", e)
             return {"error": str(e)}
     
     @classmethod
@@ -530,6 +909,49 @@ class SystemMetrics:
         return cls._metrics
 
 
+class MetricsSnapshot:
+    """
+    /metrics 响应快照
+
+    TTL 内直接复用上次结果；快照过期时，并发请求共享同一次采集，
+    多个采集端同时抓取也只计算一次
+    """
+
+    TTL_SECONDS = 5.0
+
+    _snapshot: Optional[Dict[str, Any]] = None
+    _expires_at = 0.0
+    _inflight: Optional["asyncio.Task"] = None
+
+    @classmethod
+    async def get(cls) -> Dict[str, Any]:
+        """获取监控指标快照"""
+        if cls._snapshot is not None and time.monotonic() < cls._expires_at:
+            return cls._snapshot
+
+        if cls._inflight is None:
+            cls._inflight = asyncio.create_task(cls._collect())
+        # shield：单个请求取消时不影响其他等待同一次采集的请求
+        return await asyncio.shield(cls._inflight)
+
+    @classmethod
+    async def _collect(cls) -> Dict[str, Any]:
+        """采集一次监控统计和系统指标"""
+        try:
+            stats, system = await asyncio.gather(
+                MonitoringStats.get_full_stats(),
+                SystemMetrics.collect()
+            )
+            cls._snapshot = {
+                "monitoring": stats,
+                "system": system
+            }
+            cls._expires_at = time.monotonic() + cls.TTL_SECONDS
+            return cls._snapshot
+        finally:
+            cls._inflight = None
+
+
 # ============= 技能执行指标 =============
 
 class SkillExecutionMetrics:
@@ -543,6 +965,9 @@ class SkillExecutionMetrics:
         "total_time_ms": 0,
         "last_executed": None
     })
+
+    # 待刷新到 Redis 的计数增量: {(skill_id, "total"/"success"/"failure"): count}
+    _pending: Dict[Tuple[int, str], int] = defaultdict(int)
     
     @classmethod
     async def record_execution(
@@ -567,17 +992,23 @@ class SkillExecutionMetrics:
             if error_code == "TIMEOUT":
                 stats["timeout_count"] += 1
         
-        # 记录到 Redis
+        # 记录到 Redis：累计增量，由 MonitoringFlusher 与端点计数一起批量写入
         if cache._connected and cache.client:
-            try:
-                today = datetime.utcnow().strftime("%Y-%m-%d")
-                await cache.client.hincrby(f"monitor:skills:{today}", f"{skill_id}:total", 1)
-                if success:
-                    await cache.client.hincrby(f"monitor:skills:{today}", f"{skill_id}:success", 1)
-                else:
-                    await cache.client.hincrby(f"monitor:skills:{today}", f"{skill_id}:failure", 1)
-            except Exception as e:
-                logger.error(f"Failed to record skill execution: {e}")
+            pending = cls._pending
+            pending[(skill_id, "total")] += 1
+            pending[(skill_id, "success" if success else "failure")] += 1
+
+    @classmethod
+    def take_pending(cls) -> Dict[Tuple[int, str], int]:
+        """取出并清空累计的计数增量"""
+        pending, cls._pending = cls._pending, defaultdict(int)
+        return pending
+
+    @classmethod
+    def restore_pending(cls, pending: Dict[Tuple[int, str], int]):
+        """写入失败时把增量合并回去，等待下次刷新"""
+        for key, count in pending.items():
+            cls._pending[key] += count
     
     @classmethod
     def get_stats(cls) -> Dict[str, Any]:
@@ -617,9 +1048,9 @@ class HealthChecker:
             return {"status": "unhealthy", "error": "Not connected"}
         
         try:
-            start = time.time()
+            start_ns = time.perf_counter_ns()
             await cache.client.ping()
-            latency_ms = round((time.time() - start) * 1000, 2)
+            latency_ms = round((time.perf_counter_ns() - start_ns) / 1_000_000, 2)
             
             info = await cache.client.info()
             
@@ -651,11 +1082,16 @@ class HealthChecker:
     
     @classmethod
     async def get_full_health(cls) -> Dict[str, Any]:
-        """获取完整健康检查报告"""
+        """获取完整健康检查报告（各项检查并行执行）"""
+        database, redis_health, disk = await asyncio.gather(
+            cls.check_database(),
+            cls.check_redis(),
+            cls.check_disk_space()
+        )
         checks = {
-            "database": await cls.check_database(),
-            "redis": await cls.check_redis(),
-            "disk": await cls.check_disk_space()
+            "database": database,
+            "redis": redis_health,
+            "disk": disk
         }
         
         # 判断整体状态
@@ -1,25 +1,42 @@
 """
 API限流中间件 - 支持 Redis 和内存双模式
 """
-from fastapi import Request, HTTPException, status
+from fastapi import Request, status
 from fastapi.responses import JSONResponse
-from typing import Dict, Tuple, Optional
+from starlette.types import Scope
+from typing import Any, Deque, Dict, List, Tuple, Optional
+import asyncio
+import random
 import time
 import logging
-from collections import defaultdict
+from hashlib import blake2b
+from collections import deque
+from functools import lru_cache
 
 from app.core.cache import cache
+from app.core.error_codes import ErrorCode, create_error_response
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
 
 class InMemoryRateLimiter:
-    """内存限流器（Redis 不可用时的后备方案）"""
+    """
+    内存限流器（Redis 不可用时的后备方案）
+
+    is_allowed 是同步方法，只在事件循环线程中调用：从过期清理到记录本次请求
+    之间没有 await，单个事件循环内的检查不会交错，因此不需要加锁。
+    不要在线程池中调用；如需跨线程使用，应在 is_allowed 外层加 threading.Lock。
+    """
+
+    # 每处理多少次检查清理一次已过期的键
+    GC_INTERVAL = 1024
 
     def __init__(self):
-        # 存储格式: {key: [(timestamp, count), ...]}
-        self.requests: Dict[str, list] = defaultdict(list)
+        # 存储格式: {key: deque([timestamp, ...])}，时间戳取自单调时钟，按请求顺序递增
+        self.requests: Dict[str, Deque[float]] = {}
+        self._ops_since_gc = 0
+        self._max_window = 0
 
     def is_allowed(self, key: str, max_requests: int, window_seconds: int) -> Tuple[bool, int, int]:
         """
@@ -33,38 +50,94 @@ class InMemoryRateLimiter:
         Returns:
             (is_allowed, remaining_seconds, current_count)
         """
-        now = time.time()
+        # 单调时钟不受系统时间调整影响，时间回拨不会让窗口失效或永久封禁
+        now = time.monotonic()
         window_start = now - window_seconds
 
-        # 清理过期的请求记录
-        self.requests[key] = [
-            (ts, count) for ts, count in self.requests[key]
-            if ts > window_start
-        ]
+        if window_seconds > self._max_window:
+            self._max_window = window_seconds
+        self._ops_since_gc += 1
+        if self._ops_since_gc >= self.GC_INTERVAL:
+            self._collect_garbage(now)
 
-        # 计算当前窗口内的请求数
-        current_count = sum(count for _, count in self.requests[key])
+        timestamps = self.requests.get(key)
+        if timestamps is None:
+            timestamps = self.requests[key] = deque()
+
+        # 从队头弹出过期的请求记录（每个时间戳只入队、出队各一次）
+        while timestamps and timestamps[0] <= window_start:
+            timestamps.popleft()
+
+        current_count = len(timestamps)
 
         if current_count >= max_requests:
-            # 计算需要等待的时间
-            oldest_ts = min(ts for ts, _ in self.requests[key])
-            remaining = int(oldest_ts + window_seconds - now)
+            # 最早的请求过期后才能再次请求（向上取整到秒）
+            remaining = -int((now - timestamps[0] - window_seconds) // 1)
             return False, max(0, remaining), current_count
 
         # 记录本次请求
-        self.requests[key].append((now, 1))
+        timestamps.append(now)
         return True, 0, current_count + 1
 
+    def _collect_garbage(self, now: float):
+        """删除最近一次请求已超出所有窗口的键，避免大量不同 IP 使内存无限增长"""
+        self._ops_since_gc = 0
+        expire_before = now - self._max_window
+        stale = [
+            key for key, timestamps in self.requests.items()
+            if not timestamps or timestamps[-1] <= expire_before
+        ]
+        for key in stale:
+            del self.requests[key]
+
 
 class RedisRateLimiter:
-    """Redis 限流器（使用滑动窗口算法）"""
+    """Redis 限流器（固定窗口计数，Lua 脚本一次往返完成检查和计数）"""
+
+    # 计数加一，首次计数时设置窗口过期时间；返回 {当前计数, 剩余毫秒}
+    LUA_SCRIPT = """
+local n = redis.call('INCR', KEYS[1])
+if n == 1 then
+    redis.call('PEXPIRE', KEYS[1], ARGV[1])
+end
+local ttl = redis.call('PTTL', KEYS[1])
+if ttl < 0 then
+    redis.call('PEXPIRE', KEYS[1], ARGV[1])
+    ttl = tonumber(ARGV[1])
+end
+return {n, ttl}
+"""
+
+    # 本地封禁缓存的最大条目数，超过时清理已过期的条目
+    MAX_BLOCKED_KEYS = 10000
 
     def __init__(self):
         self.key_prefix = "ratelimit"
+        self._script = None
+        # 已超限的键: {redis_key: (解封时间(monotonic), 超限时的计数)}，窗口内直接拒绝
+        self._blocked: Dict[str, Tuple[float, int]] = {}
+
+    async def load_script(self):
+        """
+        启动时预加载限流脚本
+
+        register_script 在服务端没有缓存脚本时会先收到 NOSCRIPT 再重新加载，
+        预加载后第一个请求也只需一次 EVALSHA。
+        """
+        if not cache._connected or not cache.client:
+            return
+
+        try:
+            self._script = cache.client.register_script(self.LUA_SCRIPT)
+            await cache.client.script_load(self.LUA_SCRIPT)
+        except Exception as e:
+            logger.warning(f"Failed to preload rate limit script: {e}")
 
     async def is_allowed(self, key: str, max_requests: int, window_seconds: int) -> Tuple[bool, int, int]:
         """
-        使用 Redis 实现滑动窗口限流
+        使用 Redis 实现固定窗口限流
+
+        计数保存在 Redis 中，所有 worker 共享同一限额；键随窗口过期自动删除。
 
         Args:
             key: 限流键
@@ -78,44 +151,52 @@ class RedisRateLimiter:
             # Redis 不可用，返回允许（由外层使用后备方案）
             raise ConnectionError("Redis not connected")
 
-        redis_key = f"{self.key_prefix}:{key}"
-        now = time.time()
-        window_start = now - window_seconds
+        redis_key = f"{self.key_prefix}:{key}:{window_seconds}"
+
+        # 每次检查只取一次时间，窗口计算使用单调时钟
+        now = time.monotonic()
+
+        # 同一窗口内已超限的键不再访问 Redis
+        blocked = self._blocked.get(redis_key)
+        if blocked is not None:
+            blocked_until, blocked_count = blocked
+            if now < blocked_until:
+                remaining = -int((now - blocked_until) // 1)  # 向上取整到秒
+                return False, remaining, blocked_count
+            del self._blocked[redis_key]
 
         try:
-            # 使用 Redis 事务确保原子性
-            async with cache.client.pipeline() as pipe:
-                # 1. 移除过期的请求记录
-                await pipe.zremrangebyscore(redis_key, 0, window_start)
-                
-                # 2. 获取当前窗口内的请求数
-                await pipe.zcard(redis_key)
-                
-                # 3. 执行事务
-                results = await pipe.execute()
-                
-            current_count = results[1]
-
-            if current_count >= max_requests:
-                # 获取最早的请求时间，计算剩余等待时间
-                oldest = await cache.client.zrange(redis_key, 0, 0, withscores=True)
-                if oldest:
-                    oldest_ts = oldest[0][1]
-                    remaining = int(oldest_ts + window_seconds - now)
-                    return False, max(0, remaining), current_count
-                return False, window_seconds, current_count
-
-            # 添加当前请求
-            await cache.client.zadd(redis_key, {str(now): now})
-            # 设置过期时间
-            await cache.client.expire(redis_key, window_seconds + 1)
-
-            return True, 0, current_count + 1
+            if self._script is None:
+                # register_script 使用 EVALSHA，脚本未缓存时自动回退为 SCRIPT LOAD
+                self._script = cache.client.register_script(self.LUA_SCRIPT)
+
+            current_count, ttl_ms = await self._script(
+                keys=[redis_key],
+                args=[window_seconds * 1000],
+                client=cache.client
+            )
+            current_count = int(current_count)
+
+            if current_count > max_requests:
+                remaining = -(-int(ttl_ms) // 1000)  # 向上取整到秒
+                self._block(redis_key, now + int(ttl_ms) / 1000, current_count)
+                return False, max(0, remaining), current_count
+
+            return True, 0, current_count
 
         except Exception as e:
             logger.error(f"Redis rate limit error: {e}")
             raise
 
+    def _block(self, redis_key: str, blocked_until: float, current_count: int):
+        """记录超限的键，直到窗口过期"""
+        if len(self._blocked) >= self.MAX_BLOCKED_KEYS:
+            now = time.monotonic()
+            self._blocked = {
+                k: v for k, v in self._blocked.items() if v[0] > now
+            }
+        self._blocked[redis_key] = (blocked_until, current_count)
+
 
 class RateLimiter:
     """智能限流器 - 优先使用 Redis，降级到内存"""
@@ -157,6 +238,150 @@ class RateLimiter:
 rate_limiter = RateLimiter()
 
 
+class RateLimitAuditLog:
+    """
+    限流审计日志后台写入器
+
+    限额由 Redis 计数执行，rate_limit_logs 只用于审计：每个键在每个窗口内
+    只记录第一次被拒绝（之后的拒绝多由本地封禁缓存直接应答，不再写库），
+    放行的请求按 SAMPLE_RATE 抽样。请求路径上只把事件放入内存队列，
+    后台任务定期用一条 INSERT 批量写入数据库；队列写满时丢弃新事件。
+    """
+
+    SAMPLE_RATE = 0.001  # 放行请求的抽样比例
+    MAX_QUEUE_SIZE = 10000  # 队列上限
+    MAX_BATCH_SIZE = 500  # 单次 INSERT 最多包含的事件数
+    FLUSH_INTERVAL_SECONDS = 1.0  # 写入间隔
+    MAX_BLOCKED_KEYS = 10000  # 已记录拒绝的键的缓存上限
+
+    _queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=MAX_QUEUE_SIZE)
+    _task: Optional[asyncio.Task] = None
+    # 本窗口内已记录过拒绝的键: {"限流键:窗口": 窗口结束时间(monotonic)}
+    _blocked_logged: Dict[str, float] = {}
+    dropped_events = 0
+
+    @classmethod
+    def record(
+        cls,
+        key: str,
+        path: str,
+        method: str,
+        limit: int,
+        window_seconds: int,
+        current_count: int,
+        blocked: bool,
+        retry_after: int = 0
+    ):
+        """
+        记录一次限流检查（不阻塞）
+
+        放行的请求按比例抽样；被拒绝的请求在 retry_after 秒内每个键只记录一次
+        """
+        if blocked:
+            if not cls._first_block(f"{key}:{window_seconds}", retry_after):
+                return
+        elif random.random() >= cls.SAMPLE_RATE:
+            return
+        try:
+            cls._queue.put_nowait({
+                "key_type": "user" if key.startswith("u:") else "ip",
+                "key_value": key,
+                "path": path[:500],
+                "method": method,
+                "limit": limit,
+                "window_seconds": window_seconds,
+                "current_count": current_count,
+                "blocked": blocked,
+            })
+        except asyncio.QueueFull:
+            cls.dropped_events += 1
+
+    @classmethod
+    def _first_block(cls, block_key: str, retry_after: int) -> bool:
+        """判断是否为该键在当前窗口内的第一次拒绝，是则记下窗口结束时间"""
+        now = time.monotonic()
+        logged_until = cls._blocked_logged.get(block_key)
+        if logged_until is not None and now < logged_until:
+            return False
+        if len(cls._blocked_logged) >= cls.MAX_BLOCKED_KEYS:
+            cls._blocked_logged = {
+                k: v for k, v in cls._blocked_logged.items() if v > now
+            }
+        cls._blocked_logged[block_key] = now + max(retry_after, 1)
+        return True
+
+    @classmethod
+    def start(cls):
+        """启动后台写入任务"""
+        if cls._task is None or cls._task.done():
+            cls._task = asyncio.create_task(cls._run())
+
+    @classmethod
+    async def stop(cls):
+        """停止后台写入任务并写出剩余事件"""
+        if cls._task is not None:
+            cls._task.cancel()
+            try:
+                await cls._task
+            except asyncio.CancelledError:
+                pass
+            cls._task = None
+        await cls.flush()
+
+    @classmethod
+    async def flush(cls):
+        """
+        写出调用时队列中已有的事件
+
+        只处理开始时的队列长度，写入期间新到达的事件留给下一轮，
+        事件持续涌入时本次刷新也能结束
+        """
+        pending = cls._queue.qsize()
+        while pending > 0:
+            rows = cls._drain(min(pending, cls.MAX_BATCH_SIZE))
+            if not rows:
+                break
+            pending -= len(rows)
+            await cls._write(rows)
+
+    @classmethod
+    def _drain(cls, limit: int) -> List[Dict[str, Any]]:
+        """从队列中非阻塞地取出事件，直到队列为空或取满 limit 个"""
+        rows = []
+        while len(rows) < limit:
+            try:
+                rows.append(cls._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return rows
+
+    @classmethod
+    async def _run(cls):
+        """后台循环：定期批量写入"""
+        while True:
+            await asyncio.sleep(cls.FLUSH_INTERVAL_SECONDS)
+            try:
+                await cls.flush()
+            except Exception as e:
+                logger.error(f"Rate limit audit log flush error: {e}")
+
+    @classmethod
+    async def _write(cls, rows: List[Dict[str, Any]]):
+        """把一批事件写入 rate_limit_logs"""
+        if not rows:
+            return
+
+        from app.database import AsyncSessionLocal
+        from app.models.gateway import RateLimitLog
+
+        try:
+            async with AsyncSessionLocal() as session:
+                await RateLimitLog.bulk_insert(session, rows)
+                await session.commit()
+        except Exception as e:
+            logger.error(f"Failed to write {len(rows)} rate limit audit logs: {e}")
+
+
 # 限流配置
 class RateLimitConfig:
     """限流配置"""
@@ -177,65 +402,112 @@ class RateLimitConfig:
     WEBSOCKET = (30, 60)  # 30 次/分钟
 
 
-async def rate_limit_middleware(request: Request, call_next):
+# 不做限流的路径
+_EXCLUDED_PATHS = frozenset({"/health", "/docs", "/redoc", "/openapi.json"})
+
+# 按顺序匹配的路径片段 -> 限流规则，未命中时按 /api/ 前缀或默认规则
+_RATE_RULES = (
+    ("/upload", RateLimitConfig.FILE_UPLOAD),
+    ("/auth/", RateLimitConfig.AUTH),
+    ("/login", RateLimitConfig.AUTH),
+)
+
+
+@lru_cache(maxsize=1024)
+def _resolve_rule(path: str) -> Tuple[int, int]:
+    """根据路由选择限流规则，结果按路径缓存"""
+    for fragment, rule in _RATE_RULES:
+        if fragment in path:
+            return rule
+    if path.startswith("/api/"):
+        return RateLimitConfig.API
+    return RateLimitConfig.DEFAULT
+
+
+def client_ip_from_scope(scope: Scope) -> str:
+    """
+    从 ASGI scope 获取客户端IP
+
+    直接遍历原始请求头，存在 X-Forwarded-For 时使用其中第一个地址，
+    否则使用连接的对端地址
     """
-    限流中间件
+    for name, value in scope["headers"]:
+        if name == b"x-forwarded-for":
+            comma = value.find(b",")
+            return (value[:comma] if comma != -1 else value).strip().decode("latin-1")
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def _rate_limit_key(request: Request) -> str:
+    """
+    计算限流键（优先使用用户ID，否则使用IP）
+
+    已认证请求不解析客户端地址。IP 经哈希后再放入键中，
+    Redis 和日志里不保存原始地址。
+    """
+    user_id = getattr(request.state, "user_id", None)
+    if user_id:
+        return f"u:{user_id}"
+
+    client_ip = client_ip_from_scope(request.scope)
+    return f"i:{blake2b(client_ip.encode(), digest_size=8).hexdigest()}"
+
+
+async def check_rate_limit(request: Request) -> Tuple[Optional[JSONResponse], List[Tuple[bytes, bytes]]]:
+    """
+    对请求执行限流检查
 
     限流规则：
     - 普通请求: 100 请求/分钟
     - API路由: 60 请求/分钟
     - 文件上传: 10 请求/分钟
     - 认证接口: 10 请求/分钟
+
+    Returns:
+        (拒绝响应, 限流响应头)；允许时拒绝响应为 None，
+        排除路径两者均为空
     """
+    path = request.url.path
+
     # 跳过健康检查和文档
-    if request.url.path in ["/health", "/docs", "/redoc", "/openapi.json"]:
-        return await call_next(request)
+    if path in _EXCLUDED_PATHS:
+        return None, []
 
     # 定期重试 Redis 连接
     if not rate_limiter._use_redis and cache._connected:
         rate_limiter.reset_redis_flag()
 
-    # 获取限流键（优先使用用户ID，否则使用IP）
-    user_id = getattr(request.state, "user_id", None)
-    client_ip = request.client.host if request.client else "unknown"
-    
-    # 处理代理情况
-    forwarded_for = request.headers.get("X-Forwarded-For")
-    if forwarded_for:
-        client_ip = forwarded_for.split(",")[0].strip()
-    
-    key = f"user:{user_id}" if user_id else f"ip:{client_ip}"
+    # 获取限流键，保存到 request.state 供后续中间件复用
+    key = request.state.rate_limit_key = _rate_limit_key(request)
 
     # 根据路由选择限流规则
-    if "/upload" in request.url.path:
-        max_requests, window = RateLimitConfig.FILE_UPLOAD
-    elif "/auth/" in request.url.path or "/login" in request.url.path:
-        max_requests, window = RateLimitConfig.AUTH
-    elif request.url.path.startswith("/api/"):
-        max_requests, window = RateLimitConfig.API
-    else:
-        max_requests, window = RateLimitConfig.DEFAULT
+    max_requests, window = _resolve_rule(path)
 
     # 检查限流
     allowed, remaining, current_count = await rate_limiter.is_allowed(key, max_requests, window)
+    RateLimitAuditLog.record(
+        key, path, request.method, max_requests, window, current_count,
+        blocked=not allowed, retry_after=remaining
+    )
 
     if not allowed:
         logger.warning(
-            f"Rate limit exceeded: key={key}, path={request.url.path}, "
+            f"Rate limit exceeded: key={key}, path={path}, "
             f"count={current_count}, limit={max_requests}/window"
         )
-        raise HTTPException(
+        error_response = create_error_response(
+            error_code=ErrorCode.RATE_LIMIT_EXCEEDED,
+            message=f"Rate limit exceeded. Try again in {remaining} seconds."
+        )
+        return JSONResponse(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            detail=f"Rate limit exceeded. Try again in {remaining} seconds.",
+            content=error_response.to_dict(),
             headers={"Retry-After": str(remaining)}
-        )
-
-    # 执行请求
-    response = await call_next(request)
-    
-    # 添加限流头
-    response.headers["X-RateLimit-Limit"] = str(max_requests)
-    response.headers["X-RateLimit-Remaining"] = str(max(0, max_requests - current_count))
-    response.headers["X-RateLimit-Reset"] = str(window)
+        ), []
 
-    return response
+    return None, [
+        (b"x-ratelimit-limit", str(max_requests).encode()),
+        (b"x-ratelimit-remaining", str(max(0, max_requests - current_count)).encode()),
+        (b"x-ratelimit-reset", str(window).encode()),
+    ]
@@ -5,15 +5,28 @@
 """
 import docker
 import asyncio
+import io
 import json
-import tempfile
-import os
+import shlex
+import tarfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from typing import Dict, Any, Optional
 from datetime import datetime
 import logging
 
 from app.config import settings
 
+try:
+    import orjson
+
+    def _dumps_params(params: Dict[str, Any]) -> bytes:
+        return orjson.dumps(params, option=orjson.OPT_NON_STR_KEYS)
+except ImportError:  # orjson 未安装时使用标准库
+    def _dumps_params(params: Dict[str, Any]) -> bytes:
+        return json.dumps(params).encode('utf-8')
+
 logger = logging.getLogger(__name__)
 
 
@@ -24,21 +37,173 @@ DEFAULT_CPU_QUOTA = settings.SKILL_CPU_QUOTA
 MAX_OUTPUT_SIZE = settings.SKILL_MAX_OUTPUT_SIZE
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 单文件最大10MB
 MAX_TOTAL_SIZE = 50 * 1024 * 1024  # 总文件大小最大50MB
+SANDBOX_IMAGE = "python:3.11-slim"
+MAX_CONCURRENT_EXECUTIONS = 8  # 同时执行的技能容器上限
+WARM_POOL_SIZE = 2  # 预先创建、等待使用的容器数
+# 技能进程以 nobody 身份运行：/app/skill 卷和写入的文件属于 root，技能代码只能读取，
+# 不能改写自身文件、.sandbox_env 或向卷中写入数据
+SANDBOX_USER = "65534:65534"
+
+# 容器创建时命令固定，技能相关的环境变量和主文件名在启动前随技能文件写入
+SANDBOX_ENV_FILE = ".sandbox_env"
+SANDBOX_COMMAND = [
+    "sh", "-c",
+    f'set -a && . /app/skill/{SANDBOX_ENV_FILE} && exec python "$SKILL_MAIN_FILE"'
+]
+
+# 线程池用于执行阻塞的 Docker 和文件操作，同时限制并发执行的容器数
+_executor = ThreadPoolExecutor(
+    max_workers=MAX_CONCURRENT_EXECUTIONS,
+    thread_name_prefix="skill-sandbox"
+)
+
+# 预创建容器的补充和清理使用单独的线程，不占用执行槽位
+_pool_executor = ThreadPoolExecutor(
+    max_workers=1,
+    thread_name_prefix="skill-sandbox-pool"
+)
+
+# 进程内共享的 Docker 客户端，首次使用时创建
+_docker_client: Optional[docker.DockerClient] = None
+
+
+def get_docker_client() -> docker.DockerClient:
+    """获取共享的 Docker 客户端"""
+    global _docker_client
+    if _docker_client is None:
+        _docker_client = docker.from_env()
+    return _docker_client
 
 
 class SkillExecutionSandbox:
     """技能执行沙箱"""
 
     def __init__(self):
-        self.client = docker.from_env()
         self.container_timeout = DEFAULT_TIMEOUT
         self.memory_limit = DEFAULT_MEMORY_LIMIT
         self.cpu_quota = DEFAULT_CPU_QUOTA
         self.pids_limit = 100  # 最大进程数
         self.max_output_size = MAX_OUTPUT_SIZE
+        self.warm_pool_size = WARM_POOL_SIZE
+        # 已创建未启动的容器ID，每个容器只执行一次技能
+        self._warm_pool: asyncio.Queue = asyncio.Queue()
+        self._refill_task: Optional[asyncio.Task] = None
+
+    def _run_in_executor(self, func, *args, **kwargs):
+        """在线程池中执行同步函数，避免阻塞事件循环"""
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(_executor, partial(func, *args, **kwargs))
+
+    def _run_in_pool_executor(self, func, *args, **kwargs):
+        """在预创建容器专用的线程中执行同步函数"""
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(_pool_executor, partial(func, *args, **kwargs))
+
+    @property
+    def client(self) -> docker.DockerClient:
+        """高层 Docker 客户端（所有沙箱实例共享）"""
+        return get_docker_client()
+
+    @property
+    def api(self) -> docker.APIClient:
+        """底层 Docker API 客户端，每个调用对应一次 Docker API 请求"""
+        return get_docker_client().api
+
+    def _create_container(self) -> str:
+        """
+        创建技能容器（带完整资源限制），返回容器ID
+
+        /app/skill 声明为匿名卷，技能文件在启动前通过 put_archive 以 root 身份写入；
+        技能进程以非特权用户运行，卷对其只读，根文件系统同样只读，
+        可写的只有限制大小的 /tmp。容器与具体技能无关，可以提前创建。
+        """
+        host_config = self.api.create_host_config(
+            # 资源限制
+            mem_limit=self.memory_limit,
+            memswap_limit=self.memory_limit,  # 禁用swap
+            cpu_quota=self.cpu_quota,
+            cpu_period=100000,  # 100ms CPU周期
+            pids_limit=self.pids_limit,
+            # 安全限制
+            network_mode="none",  # 禁用网络
+            read_only=True,  # 只读文件系统（除了/tmp）
+            security_opt=["no-new-privileges"],
+            cap_drop=["ALL"],  # 移除所有Linux能力
+            tmpfs={"/tmp": "size=10m,mode=1777"}  # 临时目录限制10MB
+        )
+        kwargs = dict(
+            image=SANDBOX_IMAGE,
+            command=SANDBOX_COMMAND,
+            working_dir="/app/skill",
+            volumes=["/app/skill"],
+            user=SANDBOX_USER,
+            environment={
+                "PYTHONUNBUFFERED": "1",
+                "TMPDIR": "/tmp"
+            },
+            network_disabled=True,
+            host_config=host_config
+        )
+        try:
+            return self.api.create_container(**kwargs)["Id"]
+        except docker.errors.ImageNotFound:
+            # 与 containers.run 一致：镜像不存在时拉取后重试
+            self.api.pull(SANDBOX_IMAGE)
+            return self.api.create_container(**kwargs)["Id"]
+
+    async def _acquire_container(self) -> str:
+        """
+        取一个预先创建的容器，池为空时现场创建
+
+        容器创建（镜像层挂载、cgroup 配置）不在执行路径上；每个容器只启动一次，
+        不同技能之间不共享进程和文件。
+        """
+        try:
+            container_id = self._warm_pool.get_nowait()
+        except asyncio.QueueEmpty:
+            container_id = await self._run_in_executor(self._create_container)
+        self._schedule_refill()
+        return container_id
+
+    def _schedule_refill(self):
+        """在后台补充预创建的容器"""
+        if self.warm_pool_size <= 0:
+            return
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.create_task(self._refill())
 
-    def _validate_files(self, files: Dict[str, str]) -> None:
-        """验证上传的文件"""
+    async def _refill(self):
+        """创建容器直到池中数量达到 warm_pool_size"""
+        while self._warm_pool.qsize() < self.warm_pool_size:
+            try:
+                container_id = await self._run_in_pool_executor(self._create_container)
+            except Exception as e:
+                logger.warning(f"Failed to pre-create sandbox container: {e}")
+                return
+            self._warm_pool.put_nowait(container_id)
+
+    async def close(self):
+        """停止补充并删除尚未使用的预创建容器"""
+        if self._refill_task is not None:
+            self._refill_task.cancel()
+            try:
+                await self._refill_task
+            except asyncio.CancelledError:
+                pass
+            self._refill_task = None
+
+        while not self._warm_pool.empty():
+            container_id = self._warm_pool.get_nowait()
+            try:
+                await self._run_in_pool_executor(
+                    self.api.remove_container, container_id, v=True, force=True
+                )
+            except Exception as e:
+                logger.warning(f"Failed to remove container: {e}")
+
+    def _validate_files(self, files: Dict[str, str]) -> Dict[str, bytes]:
+        """验证上传的文件，返回 UTF-8 编码后的文件内容供写入复用"""
+        encoded: Dict[str, bytes] = {}
         total_size = 0
         for filename, content in files.items():
             # 检查文件路径安全性
@@ -46,21 +211,73 @@ class SkillExecutionSandbox:
                 raise ValueError(f"Invalid file path: {filename}")
             
             # 检查文件大小
-            file_size = len(content.encode('utf-8'))
+            data = content.encode('utf-8')
+            file_size = len(data)
             if file_size > MAX_FILE_SIZE:
                 raise ValueError(f"File {filename} exceeds maximum size of {MAX_FILE_SIZE} bytes")
             total_size += file_size
+            encoded[filename] = data
         
         if total_size > MAX_TOTAL_SIZE:
             raise ValueError(f"Total file size exceeds maximum of {MAX_TOTAL_SIZE} bytes")
+        return encoded
+
+    def _read_logs(self, container_id: str) -> str:
+        """流式读取容器日志，超过 max_output_size 字节后停止读取并截断"""
+        buffer = bytearray()
+        truncated = False
+        stream = self.api.logs(container_id, stream=True, follow=False)
+        try:
+            for chunk in stream:
+                buffer += chunk
+                if len(buffer) > self.max_output_size:
+                    truncated = True
+                    break
+        finally:
+            stream.close()
+
+        if truncated:
+            del buffer[self.max_output_size:]
+        logs = buffer.decode('utf-8', errors='replace')
+        if truncated:
+            logs += "\n... [output truncated]"
+        return logs
+
+    def _build_archive(
+        self,
+        files: Dict[str, bytes],
+        params_json: bytes,
+        environment: Dict[str, str]
+    ) -> bytes:
+        """把技能文件、参数文件和环境变量文件打包为内存中的 tar 包，不落盘"""
+        entries = dict(files)
+        entries["params.json"] = params_json
+        entries[SANDBOX_ENV_FILE] = "".join(
+            f"{key}={shlex.quote(value)}\n" for key, value in environment.items()
+        ).encode('utf-8')
+
+        mtime = time.time()
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w") as tar:
+            for filename, data in entries.items():
+                info = tarfile.TarInfo(filename)
+                info.size = len(data)
+                info.mtime = mtime
+                info.mode = 0o644  # 属主 root，沙箱用户只读
+                tar.addfile(info, io.BytesIO(data))
+        return buffer.getvalue()
+
+    def _validate_params(self, params: Dict[str, Any]) -> bytes:
+        """验证参数，返回序列化后的 params.json 内容（只序列化一次）"""
+        try:
+            params_json = _dumps_params(params)
+        except TypeError as e:
+            raise ValueError(f"Parameters are not JSON serializable: {e}")
 
-    def _validate_params(self, params: Dict[str, Any]) -> Dict[str, Any]:
-        """验证并清理参数"""
         # 限制参数大小
-        params_str = json.dumps(params)
-        if len(params_str) > 64 * 1024:  # 64KB 参数限制
+        if len(params_json) > 64 * 1024:  # 64KB 参数限制
             raise ValueError("Parameters exceed maximum size")
-        return params
+        return params_json
 
     async def execute_skill(
         self,
@@ -83,113 +300,78 @@ class SkillExecutionSandbox:
         Returns:
             执行结果
         """
-        container = None
+        container_id = None
         try:
             # 验证输入
-            self._validate_files(files)
-            params = self._validate_params(params)
-
-            # 创建临时目录
-            with tempfile.TemporaryDirectory() as temp_dir:
-                # 写入技能文件
-                skill_dir = os.path.join(temp_dir, f"skill_{skill_id}")
-                os.makedirs(skill_dir)
-
-                for filename, content in files.items():
-                    file_path = os.path.join(skill_dir, filename)
-                    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-                    with open(file_path, 'w', encoding='utf-8') as f:
-                        f.write(content)
-
-                # 写入参数文件
-                params_file = os.path.join(skill_dir, "params.json")
-                with open(params_file, 'w', encoding='utf-8') as f:
-                    json.dump(params, f)
-
-                # 创建 Docker 容器（带完整资源限制）
-                container = self.client.containers.run(
-                    image="python:3.11-slim",
-                    command=f"python {main_file}",
-                    volumes={
-                        skill_dir: {
-                            'bind': '/app/skill',
-                            'mode': 'ro'
-                        }
-                    },
-                    working_dir="/app/skill",
-                    # 资源限制
-                    mem_limit=self.memory_limit,
-                    memswap_limit=self.memory_limit,  # 禁用swap
-                    cpu_quota=self.cpu_quota,
-                    cpu_period=100000,  # 100ms CPU周期
-                    pids_limit=self.pids_limit,
-                    # 安全限制
-                    network_disabled=True,  # 禁用网络
-                    read_only=True,  # 只读文件系统（除了/tmp）
-                    security_opt=["no-new-privileges"],
-                    cap_drop=["ALL"],  # 移除所有Linux能力
-                    # 其他配置
-                    remove=False,
-                    detach=True,
-                    environment={
-                        "SKILL_ID": str(skill_id),
-                        "USER_ID": str(user_id),
-                        "PYTHONUNBUFFERED": "1",
-                        "TMPDIR": "/tmp"
-                    },
-                    tmpfs={"/tmp": "size=10m,mode=1777"}  # 临时目录限制10MB
+            encoded_files = self._validate_files(files)
+            params_json = self._validate_params(params)
+
+            # 技能文件打包在内存中，一次上传到容器
+            archive = self._build_archive(encoded_files, params_json, {
+                "SKILL_ID": str(skill_id),
+                "USER_ID": str(user_id),
+                "SKILL_MAIN_FILE": main_file
+            })
+
+            # 取预创建的容器，写入技能文件后启动
+            container_id = await self._acquire_container()
+            await self._run_in_executor(
+                self.api.put_archive, container_id, "/app/skill", archive
+            )
+            await self._run_in_executor(self.api.start, container_id)
+
+            # 等待容器执行完成
+            start_time = datetime.utcnow()
+
+            try:
+                result = await self._run_in_executor(
+                    self.api.wait, container_id, timeout=self.container_timeout
                 )
+                exit_code = result['StatusCode']
+            except Exception as e:
+                logger.error(f"Container timeout for skill {skill_id}: {e}")
+                await self._run_in_executor(self.api.kill, container_id)
+                exit_code = -1
+                return {
+                    "success": False,
+                    "error": "Execution timeout exceeded",
+                    "error_code": "TIMEOUT",
+                    "execution_time": self.container_timeout * 1000
+                }
 
-                # 等待容器执行完成
-                start_time = datetime.utcnow()
+            end_time = datetime.utcnow()
+            execution_time = int((end_time - start_time).total_seconds() * 1000)
 
-                try:
-                    result = container.wait(timeout=self.container_timeout)
-                    exit_code = result['StatusCode']
-                except Exception as e:
-                    logger.error(f"Container timeout for skill {skill_id}: {e}")
-                    container.kill()
-                    exit_code = -1
-                    return {
-                        "success": False,
-                        "error": "Execution timeout exceeded",
-                        "error_code": "TIMEOUT",
-                        "execution_time": self.container_timeout * 1000
-                    }
-
-                end_time = datetime.utcnow()
-                execution_time = int((end_time - start_time).total_seconds() * 1000)
-
-                # 获取日志（限制大小）
-                logs = container.logs().decode('utf-8')
-                if len(logs) > self.max_output_size:
-                    logs = logs[:self.max_output_size] + "\n... [output truncated]"
-
-                # 获取容器资源使用统计
-                stats = None
-                try:
-                    stats = container.stats(stream=False)
-                except Exception:
-                    pass
-
-                # 构建结果
-                if exit_code == 0:
-                    return {
-                        "success": True,
-                        "output": logs,
-                        "execution_time": execution_time,
-                        "container_id": container.id[:12],
-                        "resource_usage": self._extract_resource_usage(stats)
-                    }
-                else:
-                    return {
-                        "success": False,
-                        "error": logs,
-                        "execution_time": execution_time,
-                        "container_id": container.id[:12],
-                        "exit_code": exit_code,
-                        "resource_usage": self._extract_resource_usage(stats)
-                    }
+            # 获取日志（限制大小）
+            logs = await self._run_in_executor(self._read_logs, container_id)
+
+            # 获取容器资源使用统计
+            stats = None
+            try:
+                stats = await self._run_in_executor(
+                    self.api.stats, container_id, stream=False
+                )
+            except Exception:
+                pass
+
+            # 构建结果
+            if exit_code == 0:
+                return {
+                    "success": True,
+                    "output": logs,
+                    "execution_time": execution_time,
+                    "container_id": container_id[:12],
+                    "resource_usage": self._extract_resource_usage(stats)
+                }
+            else:
+                return {
+                    "success": False,
+                    "error": logs,
+                    "execution_time": execution_time,
+                    "container_id": container_id[:12],
+                    "exit_code": exit_code,
+                    "resource_usage": self._extract_resource_usage(stats)
+                }
 
         except docker.errors.DockerException as e:
             logger.error(f"Docker error for skill {skill_id}: {e}")
@@ -217,9 +399,11 @@ class SkillExecutionSandbox:
             }
         finally:
             # 清理容器
-            if container:
+            if container_id:
                 try:
-                    container.remove(force=True)
+                    await self._run_in_executor(
+                        self.api.remove_container, container_id, v=True, force=True
+                    )
                 except Exception as e:
                     logger.warning(f"Failed to remove container: {e}")
 
@@ -8,6 +8,7 @@
 - 实时统计
 """
 import logging
+from functools import lru_cache
 from typing import Optional, Dict, Any
 from datetime import datetime
 from prometheus_client import Counter, Histogram, Gauge, Info
@@ -17,19 +18,21 @@ logger = logging.getLogger(__name__)
 
 
 # ============= Prometheus 指标定义 =============
+# 指标只以 skill_id 作为技能标签，技能名称通过 skill_info 关联，
+# 避免名称变化时产生大量时间序列
 
 # 技能调用计数器
 SKILL_INVOCATIONS_TOTAL = Counter(
     'skill_invocations_total',
     'Total number of skill invocations',
-    ['skill_id', 'skill_name', 'status', 'execution_type']
+    ['skill_id', 'status', 'execution_type']
 )
 
 # 技能调用响应时间直方图
 SKILL_INVOCATION_DURATION = Histogram(
     'skill_invocation_duration_seconds',
     'Duration of skill invocations in seconds',
-    ['skill_id', 'skill_name', 'execution_type'],
+    ['skill_id', 'execution_type'],
     buckets=[0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0, 15.0, 30.0, 60.0]
 )
 
@@ -37,7 +40,7 @@ SKILL_INVOCATION_DURATION = Histogram(
 SKILL_ERRORS_TOTAL = Counter(
     'skill_errors_total',
     'Total number of skill execution errors',
-    ['skill_id', 'skill_name', 'error_type']
+    ['skill_id', 'error_type']
 )
 
 # 当前正在执行的技能数
@@ -51,12 +54,19 @@ SKILL_ACTIVE_EXECUTIONS = Gauge(
 SKILL_MEMORY_USAGE = Gauge(
     'skill_memory_usage_bytes',
     'Memory usage of skill executions',
-    ['skill_id', 'skill_name']
+    ['skill_id']
 )
 
 SKILL_CPU_USAGE = Gauge(
     'skill_cpu_usage_percent',
     'CPU usage percentage of skill executions',
+    ['skill_id']
+)
+
+# 技能名称（值恒为 1，查询时按 skill_id 关联）
+SKILL_INFO = Gauge(
+    'skill_info',
+    'Skill metadata, value is always 1',
     ['skill_id', 'skill_name']
 )
 
@@ -73,6 +83,23 @@ SYSTEM_INFO.info({
 })
 
 
+@lru_cache(maxsize=4096)
+def _labeled(metric, *label_values: str):
+    """
+    获取带标签的指标子对象并缓存
+
+    prometheus_client 每次 labels() 都要校验参数、加锁查表，
+    同一组标签重复调用时直接复用子对象。
+    """
+    return metric.labels(*label_values)
+
+
+@lru_cache(maxsize=4096)
+def _record_skill_info(skill_id: str, skill_name: str):
+    """每个 (skill_id, skill_name) 只设置一次 skill_info"""
+    SKILL_INFO.labels(skill_id, skill_name).set(1)
+
+
 # ============= 技能调用监控类 =============
 
 class SkillMetrics:
@@ -103,46 +130,29 @@ class SkillMetrics:
             cpu_percent: CPU使用百分比
         """
         try:
-            # 转换为字符串标签
+            # 转换为字符串标签（标签值的转义由 prometheus_client 负责）
             skill_id_str = str(skill_id)
-            skill_name_safe = skill_name.replace('"', '\\"')
+            _record_skill_info(skill_id_str, skill_name)
             
-            # 记录调用计数
-            SKILL_INVOCATIONS_TOTAL.labels(
-                skill_id=skill_id_str,
-                skill_name=skill_name_safe,
-                status=status,
-                execution_type=execution_type
-            ).inc()
+            # 记录调用计数（标签按指标定义的顺序传入）
+            _labeled(SKILL_INVOCATIONS_TOTAL, skill_id_str, status, execution_type).inc()
             
             # 记录响应时间
             if duration_seconds is not None:
-                SKILL_INVOCATION_DURATION.labels(
-                    skill_id=skill_id_str,
-                    skill_name=skill_name_safe,
-                    execution_type=execution_type
+                _labeled(
+                    SKILL_INVOCATION_DURATION, skill_id_str, execution_type
                 ).observe(duration_seconds)
             
             # 记录错误
             if status == "error" and error_type:
-                SKILL_ERRORS_TOTAL.labels(
-                    skill_id=skill_id_str,
-                    skill_name=skill_name_safe,
-                    error_type=error_type
-                ).inc()
+                _labeled(SKILL_ERRORS_TOTAL, skill_id_str, error_type).inc()
             
             # 记录资源使用
             if memory_bytes is not None:
-                SKILL_MEMORY_USAGE.labels(
-                    skill_id=skill_id_str,
-                    skill_name=skill_name_safe
-                ).set(memory_bytes)
+                _labeled(SKILL_MEMORY_USAGE, skill_id_str).set(memory_bytes)
             
             if cpu_percent is not None:
-                SKILL_CPU_USAGE.labels(
-                    skill_id=skill_id_str,
-                    skill_name=skill_name_safe
-                ).set(cpu_percent)
+                _labeled(SKILL_CPU_USAGE, skill_id_str).set(cpu_percent)
                 
         except Exception as e:
             logger.error(f"Failed to record skill metrics: {e}")
@@ -151,7 +161,7 @@ class SkillMetrics:
     def start_execution(execution_type: str = "api"):
         """开始执行时增加活跃计数"""
         try:
-            SKILL_ACTIVE_EXECUTIONS.labels(execution_type=execution_type).inc()
+            _labeled(SKILL_ACTIVE_EXECUTIONS, execution_type).inc()
         except Exception as e:
             logger.error(f"Failed to increment active executions: {e}")
 
@@ -159,7 +169,7 @@ class SkillMetrics:
     def end_execution(execution_type: str = "api"):
         """结束执行时减少活跃计数"""
         try:
-            SKILL_ACTIVE_EXECUTIONS.labels(execution_type=execution_type).dec()
+            _labeled(SKILL_ACTIVE_EXECUTIONS, execution_type).dec()
         except Exception as e:
             logger.error(f"Failed to decrement active executions: {e}")
 
@@ -181,13 +191,14 @@ class SkillExecutionTimer:
         self.error_type = None
     
     def __enter__(self):
-        self.start_time = time.time()
+        self.start_time = time.perf_counter()
         SkillMetrics.start_execution(self.execution_type)
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
         # 计算执行时长
-        duration = time.time() - self.start_time if self.start_time else 0
+        # perf_counter 为单调时钟，不会因系统时间调整得到负的时长
+        duration = time.perf_counter() - self.start_time if self.start_time else 0
         
         # 设置状态
         if exc_type is not None:
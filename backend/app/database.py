@@ -3,11 +3,17 @@
 
 提供SQLAlchemy异步引擎和会话管理
 """
-from typing import AsyncGenerator
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from datetime import date, timedelta
+from enum import Enum
+from typing import AsyncGenerator, Callable, List, Type
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
-from sqlalchemy import MetaData
+from sqlalchemy import JSON, Enum as SQLEnum, MetaData, Table, event, insert, text, type_coerce
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.pool import NullPool
 import logging
+import time
+from uuid import uuid4
 
 from app.config import settings
 
@@ -28,6 +34,92 @@ metadata = MetaData(naming_convention=convention)
 class Base(DeclarativeBase):
     """SQLAlchemy基类"""
     metadata = metadata
+    # 时间戳由数据库生成 (server_default / onupdate=func.now())，INSERT/UPDATE 时
+    # 通过 RETURNING 一并取回，避免异步会话中访问过期属性触发懒加载
+    __mapper_args__ = {"eager_defaults": True}
+
+
+# 需要按内容过滤的 JSON 列：PostgreSQL 上使用 JSONB（可建 GIN 索引），
+# 其他数据库（如测试用的 SQLite）仍为 JSON
+JSONBType = JSON().with_variant(JSONB(), "postgresql")
+
+
+def jsonb_contains(column, value):
+    """
+    JSONB 包含查询 (column @> value)，可以使用列上的 GIN 索引
+
+    通用 JSON 类型的 .contains() 会编译为 LIKE，既不正确也用不上索引
+    """
+    return column.op("@>")(type_coerce(value, JSONB))
+
+
+class BulkInsertMixin:
+    """
+    按请求频率写入的日志类模型的批量写入入口
+
+    rows 为属性名到取值的字典列表，通过一条多 VALUES 的 INSERT 写入，
+    不构造 ORM 对象，也不经过工作单元和标识映射
+    """
+
+    @classmethod
+    async def bulk_insert(cls, session: AsyncSession, rows: List[dict]) -> None:
+        if rows:
+            await session.execute(insert(cls), rows)
+
+
+class loader_options:
+    """
+    模型类上的预加载选项声明
+
+    首次访问时才构造选项元组并缓存到类属性上：selectinload(Model.attr)
+    会触发映射器配置，放在类体中直接求值时关联的模型可能尚未导入
+    """
+
+    def __init__(self, factory: Callable[[], tuple]):
+        self.factory = factory
+        self.name = factory.__name__
+
+    def __get__(self, obj, owner) -> tuple:
+        options = self.factory()
+        setattr(owner, self.name, options)
+        return options
+
+
+def varchar_enum(enum_cls: Type[Enum], length: int = 20) -> SQLEnum:
+    """
+    枚举列类型：以 VARCHAR + CHECK 约束存储枚举值（如 "running"，而非成员名 "RUNNING"）
+
+    不使用 PostgreSQL 原生枚举类型，新增取值时无需 ALTER TYPE
+    """
+    return SQLEnum(
+        enum_cls,
+        native_enum=False,
+        length=length,
+        create_constraint=True,
+        validate_strings=True,
+        values_callable=lambda members: [member.value for member in members],
+    )
+
+
+def _connect_args() -> dict:
+    """asyncpg 连接参数"""
+    args = {
+        "command_timeout": 60,
+        # asyncpg 自身的预编译语句缓存和 SQLAlchemy 方言层的缓存
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "server_settings": {
+            "jit": "off",  # 禁用JIT以避免首次查询延迟
+            "timezone": "UTC",  # now() 与应用中的 datetime.utcnow() 保持一致
+            "application_name": "opencode-platform"
+        }
+    }
+    if settings.DB_USE_PGBOUNCER:
+        # 事务池模式下同一会话可能落在不同的服务端连接上，预编译语句不能复用
+        args["statement_cache_size"] = 0
+        args["prepared_statement_cache_size"] = 0
+        args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid4()}__"
+    return args
 
 
 # 创建异步引擎（完整连接池配置）
@@ -41,13 +133,9 @@ engine = create_async_engine(
     pool_timeout=settings.DB_POOL_TIMEOUT,
     pool_recycle=settings.DB_POOL_RECYCLE,
     pool_pre_ping=True,  # 连接健康检查
+    pool_use_lifo=True,  # 优先复用最近归还的连接，空闲连接可按 pool_recycle 回收
     # 连接参数
-    connect_args={
-        "command_timeout": 60,
-        "server_settings": {
-            "jit": "off"  # 禁用JIT以避免首次查询延迟
-        }
-    }
+    connect_args=_connect_args()
 )
 
 # 创建异步会话工厂
@@ -59,6 +147,25 @@ AsyncSessionLocal = async_sessionmaker(
     autoflush=False
 )
 
+# 后台任务（Celery）使用的引擎：不使用连接池
+# 每个任务通过 asyncio.run 在新的事件循环中执行，连接不能跨事件循环复用，
+# 任务结束即关闭连接，也不会在 worker 进程中长期占用数据库连接
+worker_engine = create_async_engine(
+    settings.DATABASE_URL,
+    echo=settings.DB_ECHO,
+    future=True,
+    poolclass=NullPool,
+    connect_args=_connect_args()
+)
+
+WorkerSessionLocal = async_sessionmaker(
+    worker_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+    autocommit=False,
+    autoflush=False
+)
+
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """
@@ -83,6 +190,103 @@ async def init_db() -> None:
     logger.info(f"Initializing database with pool_size={settings.DB_POOL_SIZE}, max_overflow={settings.DB_MAX_OVERFLOW}")
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await ensure_partitions(conn)
+
+
+# ============= 按月分区的日志表 =============
+
+# 提前创建未来几个月的分区
+PARTITION_MONTHS_AHEAD = 2
+
+
+def partitioned_by_month(column: str) -> dict:
+    """
+    按时间列做 RANGE 分区的表参数（仅 PostgreSQL 生效）
+
+    分区键必须包含在主键中，模型需把该列一并声明为主键
+    """
+    return {
+        "postgresql_partition_by": f"RANGE ({column})",
+        "info": {"partition_by_month": column},
+    }
+
+
+def _month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def _next_month(day: date) -> date:
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+async def ensure_partitions(conn: AsyncConnection, months_ahead: int = PARTITION_MONTHS_AHEAD) -> None:
+    """
+    为按月分区的表创建默认分区以及本月和之后 months_ahead 个月的分区
+
+    只处理数据库中确实是分区表的表（旧库中未分区的表跳过）；可重复执行
+    """
+    if conn.dialect.name != "postgresql":
+        return
+
+    result = await conn.execute(text("SELECT relname FROM pg_class WHERE relkind = 'p'"))
+    partitioned = {row[0] for row in result}
+
+    for table in Base.metadata.sorted_tables:
+        if "partition_by_month" not in table.info or table.name not in partitioned:
+            continue
+
+        # 默认分区兜底，避免分区未及时创建时写入失败
+        await conn.execute(text(
+            f'CREATE TABLE IF NOT EXISTS "{table.name}_default" '
+            f'PARTITION OF "{table.name}" DEFAULT'
+        ))
+
+        start = _month_start(date.today())
+        for _ in range(months_ahead + 1):
+            end = _next_month(start)
+            try:
+                # 默认分区中已有该月数据时创建会失败，使用保存点不影响其余分区
+                async with conn.begin_nested():
+                    await conn.execute(text(
+                        f'CREATE TABLE IF NOT EXISTS "{table.name}_p{start:%Y%m}" '
+                        f'PARTITION OF "{table.name}" '
+                        f"FOR VALUES FROM ('{start}') TO ('{end}')"
+                    ))
+            except Exception as e:
+                logger.warning(f"Failed to create partition {table.name}_p{start:%Y%m}: {e}")
+            start = end
+
+
+async def maintain_partitions() -> None:
+    """定期任务入口：补齐即将用到的分区"""
+    # worker 进程不加载 API 路由，需在此注册模型，Base.metadata 中才有分区表
+    import app.models  # noqa: F401
+    import app.models.skill_stats  # noqa: F401
+
+    async with worker_engine.begin() as conn:
+        await ensure_partitions(conn)
+
+
+# ============= 频繁更新的表 =============
+
+# 为原地更新预留页内空间，使 PostgreSQL 能做 HOT 更新，减少索引膨胀
+UPDATE_HEAVY_FILLFACTOR = 70
+
+
+def update_heavy(fillfactor: int = UPDATE_HEAVY_FILLFACTOR) -> dict:
+    """
+    频繁更新的表的表参数（仅 PostgreSQL 生效）
+
+    Table 不支持 WITH (fillfactor = ...) 选项，建表后由 after_create 事件设置
+    """
+    return {"info": {"fillfactor": fillfactor}}
+
+
+@event.listens_for(Table, "after_create")
+def _set_fillfactor(table: Table, connection, **kw) -> None:
+    fillfactor = table.info.get("fillfactor")
+    if fillfactor and connection.dialect.name == "postgresql":
+        connection.execute(text(f'ALTER TABLE "{table.name}" SET (fillfactor = {int(fillfactor)})'))
 
 
 async def close_db() -> None:
@@ -91,14 +295,34 @@ async def close_db() -> None:
     await engine.dispose()
 
 
+# 健康检查语句及结果缓存，频繁轮询时短时间内复用上次结果
+_PING = text("SELECT 1")
+DB_HEALTH_CACHE_SECONDS = 1.0
+_db_health: dict = {}
+_db_health_expires_at = 0.0
+
+
 async def check_db_connection() -> dict:
     """
     检查数据库连接状态
-    返回连接健康状态信息
+    返回连接健康状态信息（DB_HEALTH_CACHE_SECONDS 内复用上次结果）
     """
+    global _db_health, _db_health_expires_at
+
+    now = time.monotonic()
+    if now < _db_health_expires_at:
+        return _db_health
+
+    _db_health = await _check_db_connection()
+    _db_health_expires_at = time.monotonic() + DB_HEALTH_CACHE_SECONDS
+    return _db_health
+
+
+async def _check_db_connection() -> dict:
+    """执行一次数据库连接检查"""
     try:
         async with engine.connect() as conn:
-            result = await conn.execute("SELECT 1")
+            result = await conn.execute(_PING)
             result.fetchone()
             
             # 获取连接池状态
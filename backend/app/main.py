@@ -1,95 +1,104 @@
 """
 FastAPI主应用 - 优化版
 """
-from fastapi import FastAPI, Request, Response
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.openapi.docs import get_swagger_ui_html, get_redoc_html
+import asyncio
 import logging
 import sys
-import time
-import uuid
+from contextlib import asynccontextmanager
+
+import orjson
 
 from app.config import settings
 from app.database import init_db, close_db
-from app.core.rate_limit import rate_limit_middleware
+from app.core.rate_limit import RateLimitAuditLog, rate_limiter
+from app.core.access import AccessMiddleware, LivenessProbeMiddleware
 from app.core.exceptions import register_exception_handlers
 from app.core.cache import cache
-from app.core.monitoring import HealthChecker, MonitoringStats, SystemMetrics
+from app.core.monitoring import HealthChecker, MetricsSnapshot, MonitoringFlusher
+from app.core.skill_executor import skill_sandbox
+from app.services.stats_service import StatsLogBuffer
+from app.core.log_format import JSONFormatter, KeyValueFormatter
+from app.api import api_router
+from app.api import websocket as session_websocket
+from app.api import debug_websocket
 
 # 配置日志
+_log_handler = logging.StreamHandler(sys.stdout)
+if settings.LOG_FORMAT == "json":
+    _log_handler.setFormatter(JSONFormatter())
+else:
+    _log_handler.setFormatter(
+        KeyValueFormatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    )
+
 logging.basicConfig(
     level=logging.INFO if not settings.DEBUG else logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     handlers=[
-        logging.StreamHandler(sys.stdout),
+        _log_handler,
         # 可以添加文件处理器等其他handler
     ]
 )
 
 logger = logging.getLogger(__name__)
 
+# 固定内容的响应体只序列化一次
+_ROOT_BODY = orjson.dumps({
+    "message": "OpenCode Platform API",
+    "version": "1.0.0",
+    "api_version": "v1",
+    "api_prefix": "/api/v1",
+    "docs": "/docs",
+    "redoc": "/redoc"
+})
+_HEALTH_BODIES = {
+    connected: orjson.dumps({
+        "status": "healthy",
+        "cache": "connected" if connected else "disconnected"
+    })
+    for connected in (True, False)
+}
+_ALIVE_BODY = orjson.dumps({"status": "alive"})
 
-async def request_logging_middleware(request: Request, call_next):
-    """
-    请求日志中间件
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：启动时并行初始化数据库和 Redis，关闭时释放资源"""
+    logger.info("Starting OpenCode Platform API...")
     
-    记录每个请求的：
-    - 请求路径 (path)
-    - 请求方法 (method)
-    - 请求耗时 (duration_ms)
-    - 响应状态码 (status_code)
-    - 请求ID (request_id)
-    """
-    # 生成请求ID
-    request_id = request.headers.get("X-Request-ID", str(uuid.uuid4()))
+    # 数据库和 Redis 相互独立，并行建立连接
+    await asyncio.gather(init_db(), cache.connect())
+    logger.info("Database initialized")
+    if cache._connected:
+        logger.info("Redis cache connected")
+        await rate_limiter.redis_limiter.load_script()
+    else:
+        logger.warning("Redis cache not available - running without cache")
     
-    # 记录请求开始时间
-    start_time = time.perf_counter()
+    # 启动监控数据后台写入
+    MonitoringFlusher.start()
+    RateLimitAuditLog.start()
+    StatsLogBuffer.start()
     
-    # 获取客户端IP
-    client_ip = request.client.host if request.client else "unknown"
-    forwarded_for = request.headers.get("X-Forwarded-For")
-    if forwarded_for:
-        client_ip = forwarded_for.split(",")[0].strip()
+    yield
     
-    # 处理请求
-    try:
-        response: Response = await call_next(request)
-        
-        # 计算耗时
-        duration_ms = (time.perf_counter() - start_time) * 1000
-        
-        # 记录访问日志
-        logger.info(
-            f'request_completed | '
-            f'request_id="{request_id}" | '
-            f'method="{request.method}" | '
-            f'path="{request.url.path}" | '
-            f'status_code={response.status_code} | '
-            f'duration_ms={duration_ms:.2f} | '
-            f'client_ip="{client_ip}"'
-        )
-        
-        # 添加请求ID到响应头
-        response.headers["X-Request-ID"] = request_id
-        
-        return response
-        
-    except Exception as e:
-        # 计算耗时
-        duration_ms = (time.perf_counter() - start_time) * 1000
-        
-        # 记录错误日志
-        logger.error(
-            f'request_failed | '
-            f'request_id="{request_id}" | '
-            f'method="{request.method}" | '
-            f'path="{request.url.path}" | '
-            f'duration_ms={duration_ms:.2f} | '
-            f'client_ip="{client_ip}" | '
-            f'error="{str(e)}"'
-        )
-        raise
+    logger.info("Shutting down OpenCode Platform API...")
+    
+    # 停止监控后台写入并写出剩余数据
+    await MonitoringFlusher.stop()
+    await RateLimitAuditLog.stop()
+    await StatsLogBuffer.stop()
+    
+    # 删除未使用的预创建沙箱容器
+    await skill_sandbox.close()
+    
+    # 断开Redis连接、关闭数据库连接
+    await asyncio.gather(cache.disconnect(), close_db())
+    logger.info("Redis cache disconnected, database connections closed")
 
 
 # 创建FastAPI应用
@@ -178,6 +187,8 @@ OpenCode Platform 是一个强大的技能管理和执行平台。
 详细错误码说明请查看 [错误码文档](/docs/errors)。
     """,
     version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
     docs_url="/docs",
     redoc_url="/redoc",
     openapi_url="/openapi.json",
@@ -232,66 +243,32 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS"],
     allow_headers=["Authorization", "Content-Type", "Accept"],
+    max_age=86400,  # 浏览器缓存预检结果 24 小时
 )
 
-# 限流中间件
-app.middleware("http")(rate_limit_middleware)
-
-# 请求日志中间件
-app.middleware("http")(request_logging_middleware)
-
-
-@app.on_event("startup")
-async def startup_event():
-    """应用启动事件"""
-    logger.info("Starting OpenCode Platform API...")
-    
-    # 初始化数据库
-    await init_db()
-    logger.info("Database initialized")
-    
-    # 连接Redis缓存
-    await cache.connect()
-    if cache._connected:
-        logger.info("Redis cache connected")
-    else:
-        logger.warning("Redis cache not available - running without cache")
+# 响应压缩（/metrics、/health/detailed 等较大的 JSON），位于访问中间件内层
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
 
+# 访问中间件（限流 + 请求日志）
+app.add_middleware(AccessMiddleware, max_inflight=settings.MAX_INFLIGHT_REQUESTS)
 
-@app.on_event("shutdown")
-async def shutdown_event():
-    """应用关闭事件"""
-    logger.info("Shutting down OpenCode Platform API...")
-    
-    # 断开Redis连接
-    await cache.disconnect()
-    logger.info("Redis cache disconnected")
-    
-    # 关闭数据库连接
-    await close_db()
-    logger.info("Database connections closed")
+# 存活探针（最外层，直接返回固定响应）
+app.add_middleware(LivenessProbeMiddleware, path="/health/live", body=_ALIVE_BODY)
 
 
 @app.get("/", tags=["root"])
 async def root():
     """根路径"""
-    return {
-        "message": "OpenCode Platform API",
-        "version": "1.0.0",
-        "api_version": "v1",
-        "api_prefix": "/api/v1",
-        "docs": "/docs",
-        "redoc": "/redoc"
-    }
+    return Response(content=_ROOT_BODY, media_type="application/json")
 
 
 @app.get("/health", tags=["health"])
 async def health_check():
     """基础健康检查（快速响应）"""
-    return {
-        "status": "healthy",
-        "cache": "connected" if cache._connected else "disconnected"
-    }
+    return Response(
+        content=_HEALTH_BODIES[bool(cache._connected)],
+        media_type="application/json"
+    )
 
 
 @app.get("/health/detailed", tags=["health"])
@@ -306,16 +283,22 @@ async def health_check_detailed():
 
 @app.get("/health/live", tags=["health"])
 async def liveness_probe():
-    """Kubernetes 存活探针"""
-    return {"status": "alive"}
+    """
+    Kubernetes 存活探针
+
+    GET 请求由 LivenessProbeMiddleware 直接应答，此路由保留用于 API 文档
+    """
+    return Response(content=_ALIVE_BODY, media_type="application/json")
 
 
 @app.get("/health/ready", tags=["health"])
 async def readiness_probe():
     """Kubernetes 就绪探针"""
-    # 检查关键依赖
-    db_health = await HealthChecker.check_database()
-    redis_health = await HealthChecker.check_redis()
+    # 并行检查关键依赖
+    db_health, redis_health = await asyncio.gather(
+        HealthChecker.check_database(),
+        HealthChecker.check_redis()
+    )
     
     is_ready = (
         db_health.get("status") == "healthy"
@@ -343,24 +326,19 @@ async def get_metrics():
     """
     获取监控指标
     
-    返回性能统计、错误统计和系统指标
+    返回性能统计、错误统计和系统指标（MetricsSnapshot.TTL_SECONDS 内复用上次结果）
     """
-    stats = await MonitoringStats.get_full_stats()
-    system = await SystemMetrics.collect()
-    
-    return {
-        "monitoring": stats,
-        "system": system
-    }
+    return await MetricsSnapshot.get()
 
 
-# 引入API路由
-from app.api import api_router
-from app.api import websocket as session_websocket
-from app.api import debug_websocket
-
+# 注册API路由
 app.include_router(api_router, prefix=settings.API_V1_PREFIX)
 app.include_router(session_websocket.router)
 app.include_router(debug_websocket.router)
-app.include_router(session_websocket.router)
-app.include_router(debug_websocket.router)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    # 显式使用 uvloop 事件循环和 httptools 解析器（由 uvicorn[standard] 提供）
+    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, loop="uvloop", http="httptools")
@@ -10,13 +10,14 @@ from app.models.file import File
 from app.models.published_skill import PublishedSkill, SkillPackage, SkillPermission, SkillReview, SkillRating, SkillBookmark
 from app.models.category import SkillCategory, SkillCategoryMapping
 from app.models.gateway import GatewayRoute, ApiKey, RateLimitLog
+from app.models.deployment import Deployment, DeploymentHealthCheck, DeploymentLog, DockerfileTemplate, DeploymentLoaders
 from app.models.skill_invocation_log import SkillInvocationLog, SkillErrorLog
 # Workflow
 from app.models.workflow import Workflow
 # Billing
 from app.models.billing import (
-    BillingPlan, Subscription, BillingUsage, BillingBill,
-    BillingPlanType, BillingCycle, BillingUsageType, SubscriptionStatus, BillStatus
+    BillingPlan, Subscription, BillingUsage, BillingBill, BillingLoaders,
+    BillingPlanType, BillingCycle, BillingUsageType, BillingUnit, SubscriptionStatus, BillStatus
 )
 
 __all__ = [
@@ -27,11 +28,13 @@ __all__ = [
     "SkillCategory", "SkillCategoryMapping",
     # Gateway
     "GatewayRoute", "ApiKey", "RateLimitLog",
+    # Deployment
+    "Deployment", "DeploymentHealthCheck", "DeploymentLog", "DockerfileTemplate", "DeploymentLoaders",
     # Monitoring
     "SkillInvocationLog", "SkillErrorLog",
     # Workflow
     "Workflow",
     # Billing
-    "BillingPlan", "Subscription", "BillingUsage", "BillingBill",
-    "BillingPlanType", "BillingCycle", "BillingUsageType", "SubscriptionStatus", "BillStatus"
+    "BillingPlan", "Subscription", "BillingUsage", "BillingBill", "BillingLoaders",
+    "BillingPlanType", "BillingCycle", "BillingUsageType", "BillingUnit", "SubscriptionStatus", "BillStatus"
 ]
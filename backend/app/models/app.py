@@ -76,7 +76,7 @@ class App(Base):
     
     # 元数据
     tags: Mapped[Optional[list]] = mapped_column(JSON, default=list)
-    metadata: Mapped[Optional[dict]] = mapped_column(JSON, default=dict)
+    extra_data: Mapped[Optional[dict]] = mapped_column("metadata", JSON, default=dict)
     
     # 时间戳
     created_at: Mapped[datetime] = mapped_column(
@@ -6,11 +6,11 @@
 from datetime import datetime
 from typing import Optional, List
 from decimal import Decimal
-from sqlalchemy import String, Boolean, DateTime, Text, JSON, Numeric, Integer, ForeignKey, Enum as SQLEnum
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import String, Boolean, DateTime, Text, JSON, Numeric, Integer, ForeignKey, Identity, Index, func, text
+from sqlalchemy.orm import Mapped, mapped_column, relationship, selectinload
 import enum
 
-from app.database import Base
+from app.database import Base, BulkInsertMixin, JSONBType, loader_options, partitioned_by_month, update_heavy, varchar_enum
 
 
 class BillingPlanType(str, enum.Enum):
@@ -38,6 +38,14 @@ class BillingUsageType(str, enum.Enum):
     EXECUTION_TIME = "execution_time"  # 执行时间(秒)
 
 
+class BillingUnit(str, enum.Enum):
+    """用量单位"""
+    COUNT = "count"
+    SECONDS = "seconds"
+    MB_SECONDS = "mb_seconds"
+    MB = "mb"
+
+
 class SubscriptionStatus(str, enum.Enum):
     """订阅状态"""
     ACTIVE = "active"
@@ -69,12 +77,12 @@ class BillingPlan(Base):
     
     # 套餐类型和周期
     plan_type: Mapped[BillingPlanType] = mapped_column(
-        SQLEnum(BillingPlanType),
+        varchar_enum(BillingPlanType),
         default=BillingPlanType.BASIC,
         nullable=False
     )
     billing_cycle: Mapped[BillingCycle] = mapped_column(
-        SQLEnum(BillingCycle),
+        varchar_enum(BillingCycle),
         default=BillingCycle.MONTHLY,
         nullable=False
     )
@@ -98,23 +106,29 @@ class BillingPlan(Base):
     overage_rate_execution: Mapped[Optional[Decimal]] = mapped_column(Numeric(10, 4))  # 每秒执行
     
     # 功能特性
-    features: Mapped[Optional[dict]] = mapped_column(JSON, default=dict)
+    features: Mapped[Optional[dict]] = mapped_column(JSONBType, default=dict)
     
     # 状态
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     is_public: Mapped[bool] = mapped_column(Boolean, default=True)
     
     # 时间戳
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), nullable=False)
     updated_at: Mapped[datetime] = mapped_column(
         DateTime,
-        default=datetime.utcnow,
-        onupdate=datetime.utcnow,
+        server_default=func.now(),
+        onupdate=func.now(),
         nullable=False
     )
     
-    # 关系
-    subscriptions = relationship("Subscription", back_populates="plan", cascade="all, delete-orphan")
+    # 关系（lazy="raise_on_sql"：需要时通过 BillingLoaders 显式预加载，避免逐行懒加载）
+    subscriptions = relationship(
+        "Subscription",
+        back_populates="plan",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        lazy="raise_on_sql"
+    )
     
     def __repr__(self) -> str:
         return f"<BillingPlan(id={self.id}, name={self.name}, type={self.plan_type})>"
@@ -127,6 +141,17 @@ class Subscription(Base):
     用户订阅套餐的记录
     """
     __tablename__ = "subscriptions"
+    __table_args__ = (
+        # 每个用户最多一个活跃订阅，同时用于按用户查询当前订阅
+        Index(
+            "ix_subscriptions_user_active",
+            "user_id",
+            unique=True,
+            postgresql_where=text("status = 'active'"),
+            sqlite_where=text("status = 'active'"),
+        ),
+        update_heavy(),
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -134,7 +159,7 @@ class Subscription(Base):
     
     # 订阅状态
     status: Mapped[SubscriptionStatus] = mapped_column(
-        SQLEnum(SubscriptionStatus),
+        varchar_enum(SubscriptionStatus),
         default=SubscriptionStatus.ACTIVE,
         nullable=False
     )
@@ -148,37 +173,58 @@ class Subscription(Base):
     current_period_start: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
     current_period_end: Mapped[datetime] = mapped_column(DateTime, nullable=False)
     
-    # 元数据
-    metadata: Mapped[Optional[dict]] = mapped_column(JSON, default=dict)
+    # 元数据（metadata 是声明式基类的保留属性，列名保持为 metadata）
+    extra_data: Mapped[Optional[dict]] = mapped_column("metadata", JSON, default=dict)
     
     # 时间戳
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), nullable=False)
     updated_at: Mapped[datetime] = mapped_column(
         DateTime,
-        default=datetime.utcnow,
-        onupdate=datetime.utcnow,
+        server_default=func.now(),
+        onupdate=func.now(),
         nullable=False
     )
     
     # 关系
-    user = relationship("User", back_populates="subscriptions")
-    plan = relationship("BillingPlan", back_populates="subscriptions")
-    usage_records = relationship("BillingUsage", back_populates="subscription", cascade="all, delete-orphan")
-    bills = relationship("BillingBill", back_populates="subscription", cascade="all, delete-orphan")
+    user = relationship("User", back_populates="subscriptions", lazy="raise_on_sql")
+    plan = relationship("BillingPlan", back_populates="subscriptions", lazy="raise_on_sql")
+    usage_records = relationship(
+        "BillingUsage",
+        back_populates="subscription",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        lazy="raise_on_sql"
+    )
+    bills = relationship(
+        "BillingBill",
+        back_populates="subscription",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        lazy="raise_on_sql"
+    )
     
     def __repr__(self) -> str:
         return f"<Subscription(id={self.id}, user_id={self.user_id}, status={self.status})>"
 
 
-class BillingUsage(Base):
+class BillingUsage(Base, BulkInsertMixin):
     """
     用量记录模型
     
     记录用户使用资源的详细信息
     """
     __tablename__ = "billing_usage"
+    __table_args__ = (
+        # 按用户/订阅查询时间范围并按 recorded_at 排序
+        Index("ix_billing_usage_user_recorded", "user_id", "recorded_at"),
+        Index("ix_billing_usage_sub_recorded", "subscription_id", "recorded_at"),
+        # 只追加写入，recorded_at 与物理顺序一致，BRIN 远小于 B-tree
+        Index("ix_billing_usage_recorded_brin", "recorded_at", postgresql_using="brin"),
+        partitioned_by_month("recorded_at"),
+    )
     
-    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    # 组合主键不能依赖 SERIAL 自增，使用 IDENTITY 生成
+    id: Mapped[int] = mapped_column(Identity(), primary_key=True)
     subscription_id: Mapped[int] = mapped_column(
         ForeignKey("subscriptions.id", ondelete="CASCADE"),
         nullable=False
@@ -191,30 +237,33 @@ class BillingUsage(Base):
     
     # 用量类型
     usage_type: Mapped[BillingUsageType] = mapped_column(
-        SQLEnum(BillingUsageType),
+        varchar_enum(BillingUsageType),
         nullable=False
     )
     
     # 用量数值
     quantity: Mapped[Decimal] = mapped_column(Numeric(12, 4), default=Decimal("0"), nullable=False)
-    unit: Mapped[str] = mapped_column(String(50), default="count")  # count, seconds, mb_seconds, mb
+    unit: Mapped[BillingUnit] = mapped_column(varchar_enum(BillingUnit, length=16), default=BillingUnit.COUNT)
     
     # 费用计算
     unit_price: Mapped[Decimal] = mapped_column(Numeric(10, 4), default=Decimal("0"), nullable=False)
     total_cost: Mapped[Decimal] = mapped_column(Numeric(10, 4), default=Decimal("0"), nullable=False)
     
     # 时间信息
-    recorded_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    # 分区键，与 id 组成主键；ORM 写入时带上取值以确定主键，批量 INSERT ... SELECT 由数据库填充
+    recorded_at: Mapped[datetime] = mapped_column(
+        DateTime, primary_key=True, default=datetime.utcnow, server_default=func.now()
+    )
     period_start: Mapped[datetime] = mapped_column(DateTime, nullable=False)
     period_end: Mapped[datetime] = mapped_column(DateTime, nullable=False)
     
     # 额外信息
-    metadata: Mapped[Optional[dict]] = mapped_column(JSON, default=dict)
+    extra_data: Mapped[Optional[dict]] = mapped_column("metadata", JSON, default=dict)
     
     # 关系
-    subscription = relationship("Subscription", back_populates="usage_records")
-    user = relationship("User", back_populates="usage_records")
-    skill = relationship("Skill", back_populates="usage_records")
+    subscription = relationship("Subscription", back_populates="usage_records", lazy="raise_on_sql")
+    user = relationship("User", back_populates="usage_records", lazy="raise_on_sql")
+    skill = relationship("Skill", back_populates="usage_records", lazy="raise_on_sql")
     
     def __repr__(self) -> str:
         return f"<BillingUsage(id={self.id}, type={self.usage_type}, quantity={self.quantity})>"
@@ -227,6 +276,10 @@ class BillingBill(Base):
     用户的账单记录
     """
     __tablename__ = "billing_bills"
+    __table_args__ = (
+        # 按用户查询未结清账单
+        Index("ix_billing_bills_user_status_period", "user_id", "status", "period_end"),
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -251,7 +304,7 @@ class BillingBill(Base):
     
     # 账单状态
     status: Mapped[BillStatus] = mapped_column(
-        SQLEnum(BillStatus),
+        varchar_enum(BillStatus),
         default=BillStatus.PENDING,
         nullable=False
     )
@@ -264,17 +317,36 @@ class BillingBill(Base):
     notes: Mapped[Optional[str]] = mapped_column(Text)
     
     # 时间戳
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), nullable=False)
     updated_at: Mapped[datetime] = mapped_column(
         DateTime,
-        default=datetime.utcnow,
-        onupdate=datetime.utcnow,
+        server_default=func.now(),
+        onupdate=func.now(),
         nullable=False
     )
     
     # 关系
-    user = relationship("User", back_populates="bills")
-    subscription = relationship("Subscription", back_populates="bills")
+    user = relationship("User", back_populates="bills", lazy="raise_on_sql")
+    subscription = relationship("Subscription", back_populates="bills", lazy="raise_on_sql")
     
     def __repr__(self) -> str:
         return f"<BillingBill(id={self.id}, bill_number={self.bill_number}, total={self.total_amount})>"
+
+
+class BillingLoaders:
+    """
+    计费模型的预加载选项
+
+    用法: select(Subscription).options(*BillingLoaders.subscription_with_plan)
+    """
+    @loader_options
+    def subscription_with_plan():
+        return (selectinload(Subscription.plan),)
+
+    @loader_options
+    def subscription_with_bills():
+        return (selectinload(Subscription.bills),)
+
+    @loader_options
+    def plan_with_subscriptions():
+        return (selectinload(BillingPlan.subscriptions),)
@@ -1,11 +1,11 @@
 """
 技能部署数据模型
 """
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, JSON, Enum
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, BigInteger, Float, String, Text, DateTime, Boolean, ForeignKey, JSON, Index, Identity, func
+from sqlalchemy.orm import relationship, selectinload
 from datetime import datetime
 import enum
-from app.database import Base
+from app.database import Base, JSONBType, loader_options, partitioned_by_month, update_heavy, varchar_enum
 
 
 class DeploymentStatus(str, enum.Enum):
@@ -29,6 +29,8 @@ class HealthStatus(str, enum.Enum):
 class Deployment(Base):
     """技能部署"""
     __tablename__ = "deployments"
+    # 运行状态、健康状态、重启次数等字段频繁更新
+    __table_args__ = (update_heavy(),)
 
     id = Column(Integer, primary_key=True, index=True)
     
@@ -50,7 +52,7 @@ class Deployment(Base):
     container_id = Column(String(100), nullable=True)  # Docker 容器 ID
     container_name = Column(String(100), nullable=True)  # 容器名称
     ports = Column(JSON, nullable=True)  # 端口映射 {"8080": "8080"}
-    environment = Column(JSON, nullable=True)  # 环境变量
+    environment = Column(JSONBType, nullable=True)  # 环境变量
     volumes = Column(JSON, nullable=True)  # 卷挂载
     networks = Column(JSON, nullable=True)  # 网络配置
     resource_limits = Column(JSON, nullable=True)  # 资源限制 {cpu, memory}
@@ -61,13 +63,13 @@ class Deployment(Base):
     
     # 状态信息
     status = Column(
-        Enum(DeploymentStatus),
+        varchar_enum(DeploymentStatus),
         default=DeploymentStatus.PENDING,
         nullable=False,
         index=True
     )
     health_status = Column(
-        Enum(HealthStatus),
+        varchar_enum(HealthStatus),
         default=HealthStatus.UNKNOWN,
         nullable=False
     )
@@ -79,8 +81,8 @@ class Deployment(Base):
     restart_count = Column(Integer, default=0, nullable=False)  # 重启次数
     
     # 统计信息
-    cpu_usage = Column(String(20), nullable=True)  # CPU 使用率
-    memory_usage = Column(String(20), nullable=True)  # 内存使用
+    cpu_usage = Column(Float, nullable=True)  # CPU 使用率（百分比）
+    memory_usage_bytes = Column(BigInteger, nullable=True)  # 内存使用（字节）
     network_io = Column(JSON, nullable=True)  # 网络 I/O
     
     # 错误信息
@@ -92,14 +94,26 @@ class Deployment(Base):
     max_restart_attempts = Column(Integer, default=3, nullable=False)
     
     # 时间戳
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
-    
-    # 关系
-    skill = relationship("Skill", backref="deployments")
-    user = relationship("User", backref="deployments")
-    health_checks = relationship("DeploymentHealthCheck", back_populates="deployment", cascade="all, delete-orphan")
-    logs = relationship("DeploymentLog", back_populates="deployment", cascade="all, delete-orphan")
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
+    
+    # 关系（lazy="raise_on_sql"：需要时通过 DeploymentLoaders 显式预加载，避免逐行懒加载）
+    skill = relationship("Skill", back_populates="deployments", lazy="raise_on_sql")
+    user = relationship("User", back_populates="deployments", lazy="raise_on_sql")
+    health_checks = relationship(
+        "DeploymentHealthCheck",
+        back_populates="deployment",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        lazy="raise_on_sql"
+    )
+    logs = relationship(
+        "DeploymentLog",
+        back_populates="deployment",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        lazy="raise_on_sql"
+    )
     
     def __repr__(self):
         return f"<Deployment(id={self.id}, name={self.name}, status={self.status})>"
@@ -108,12 +122,17 @@ class Deployment(Base):
 class DeploymentHealthCheck(Base):
     """部署健康检查记录"""
     __tablename__ = "deployment_health_checks"
+    __table_args__ = (
+        Index("ix_deployment_health_checks_dep_checked", "deployment_id", "checked_at"),
+        Index("ix_deployment_health_checks_checked_brin", "checked_at", postgresql_using="brin"),
+        partitioned_by_month("checked_at"),
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
-    deployment_id = Column(Integer, ForeignKey("deployments.id"), nullable=False, index=True)
+    id = Column(Integer, Identity(), primary_key=True)
+    deployment_id = Column(Integer, ForeignKey("deployments.id", ondelete="CASCADE"), nullable=False)
     
     # 健康状态
-    status = Column(Enum(HealthStatus), nullable=False)
+    status = Column(varchar_enum(HealthStatus), nullable=False)
     
     # 检查详情
     response_time_ms = Column(Integer, nullable=True)  # 响应时间（毫秒）
@@ -126,11 +145,11 @@ class DeploymentHealthCheck(Base):
     # 错误信息
     error_message = Column(Text, nullable=True)
     
-    # 时间戳
-    checked_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    # 时间戳（分区键，与 id 组成主键）；ORM 写入时带上取值以确定主键
+    checked_at = Column(DateTime, default=datetime.utcnow, server_default=func.now(), primary_key=True)
     
     # 关系
-    deployment = relationship("Deployment", back_populates="health_checks")
+    deployment = relationship("Deployment", back_populates="health_checks", lazy="raise_on_sql")
     
     def __repr__(self):
         return f"<DeploymentHealthCheck(deployment_id={self.deployment_id}, status={self.status})>"
@@ -139,19 +158,24 @@ class DeploymentHealthCheck(Base):
 class DeploymentLog(Base):
     """部署日志"""
     __tablename__ = "deployment_logs"
+    __table_args__ = (
+        Index("ix_deployment_logs_dep_logged", "deployment_id", "logged_at"),
+        partitioned_by_month("logged_at"),
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
-    deployment_id = Column(Integer, ForeignKey("deployments.id"), nullable=False, index=True)
+    id = Column(Integer, Identity(), primary_key=True)
+    deployment_id = Column(Integer, ForeignKey("deployments.id", ondelete="CASCADE"), nullable=False)
     
     # 日志信息
     log_type = Column(String(20), default="stdout", nullable=False)  # stdout, stderr, system
     content = Column(Text, nullable=True)
     
-    # 时间戳
-    logged_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    # 时间戳（分区键，与 id 组成主键）；ORM 写入时带上取值以确定主键
+    # 只按 (deployment_id, logged_at) 建索引，按时间清理通过删除分区完成
+    logged_at = Column(DateTime, default=datetime.utcnow, server_default=func.now(), primary_key=True)
     
     # 关系
-    deployment = relationship("Deployment", back_populates="logs")
+    deployment = relationship("Deployment", back_populates="logs", lazy="raise_on_sql")
     
     def __repr__(self):
         return f"<DeploymentLog(deployment_id={self.deployment_id}, type={self.log_type})>"
@@ -181,8 +205,27 @@ class DockerfileTemplate(Base):
     is_default = Column(Boolean, default=False, nullable=False)
     
     # 时间戳
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
     
     def __repr__(self):
         return f"<DockerfileTemplate(name={self.name}, language={self.language})>"
+
+
+class DeploymentLoaders:
+    """
+    部署模型的预加载选项
+
+    用法: select(Deployment).options(*DeploymentLoaders.with_health)
+    """
+    @loader_options
+    def with_health():
+        return (selectinload(Deployment.health_checks),)
+
+    @loader_options
+    def with_logs():
+        return (selectinload(Deployment.logs),)
+
+    @loader_options
+    def with_skill():
+        return (selectinload(Deployment.skill),)
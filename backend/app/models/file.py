@@ -59,7 +59,8 @@ class File(Base):
         Text,
         comment="文件描述"
     )
-    metadata: Mapped[Optional[dict]] = mapped_column(
+    extra_data: Mapped[Optional[dict]] = mapped_column(
+        "metadata",
         JSON,
         default=dict,
         comment="文件元数据"
@@ -5,10 +5,10 @@ API网关数据模型
 """
 from datetime import datetime
 from typing import Optional, List
-from sqlalchemy import String, Boolean, DateTime, Text, JSON, Integer, ForeignKey
+from sqlalchemy import String, Boolean, DateTime, Text, JSON, Integer, ForeignKey, Identity, Index, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from app.database import Base
+from app.database import Base, BulkInsertMixin, JSONBType, partitioned_by_month, update_heavy
 
 
 class GatewayRoute(Base):
@@ -18,6 +18,9 @@ class GatewayRoute(Base):
     存储API路由配置
     """
     __tablename__ = "gateway_routes"
+    __table_args__ = (
+        Index("ix_gateway_routes_methods_gin", "methods", postgresql_using="gin"),
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     
@@ -29,7 +32,7 @@ class GatewayRoute(Base):
     path: Mapped[str] = mapped_column(String(500), nullable=False)  # 例如 /api/v1/users
     service_name: Mapped[str] = mapped_column(String(100), nullable=False)  # 目标服务名
     service_url: Mapped[str] = mapped_column(String(500), nullable=False)  # 目标服务URL
-    methods: Mapped[List[str]] = mapped_column(JSON, default=list)  # 允许的HTTP方法
+    methods: Mapped[List[str]] = mapped_column(JSONBType, default=list)  # 允许的HTTP方法
     
     # 插件配置
     rate_limit: Mapped[Optional[int]] = mapped_column(Integer, default=None)  # 请求/分钟
@@ -47,8 +50,9 @@ class GatewayRoute(Base):
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     
     # 元数据
-    tags: Mapped[Optional[List[str]]] = mapped_column(JSON, default=list)
-    metadata: Mapped[Optional[dict]] = mapped_column(JSON, default=dict)
+    tags: Mapped[Optional[List[str]]] = mapped_column(JSONBType, default=list)
+    # metadata 是声明式基类的保留属性，列名保持为 metadata
+    extra_data: Mapped[Optional[dict]] = mapped_column("metadata", JSON, default=dict)
     
     # Kong/Traefik同步状态
     external_id: Mapped[Optional[str]] = mapped_column(String(100), index=True)  # 外部网关ID
@@ -60,11 +64,17 @@ class GatewayRoute(Base):
     user_id: Mapped[Optional[int]] = mapped_column(ForeignKey("users.id"))
     
     # 时间戳
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
     
     # 关系
-    user = relationship("User", backref="gateway_routes")
+    user = relationship("User", back_populates="gateway_routes", lazy="raise_on_sql")
+    rate_limit_logs = relationship(
+        "RateLimitLog",
+        back_populates="route",
+        passive_deletes=True,
+        lazy="raise_on_sql"
+    )
     
     def __repr__(self) -> str:
         return f"<GatewayRoute(id={self.id}, name={self.name}, path={self.path})>"
@@ -77,6 +87,13 @@ class ApiKey(Base):
     用于API访问认证
     """
     __tablename__ = "api_keys"
+    __table_args__ = (
+        # 按权限范围 / IP 白名单做包含查询 (@>)
+        Index("ix_api_keys_scopes_gin", "scopes", postgresql_using="gin"),
+        Index("ix_api_keys_allowed_ips_gin", "allowed_ips", postgresql_using="gin"),
+        # 每次验证都会更新 total_requests / last_used_at
+        update_heavy(),
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     
@@ -89,9 +106,9 @@ class ApiKey(Base):
     description: Mapped[Optional[str]] = mapped_column(Text)
     
     # 权限范围
-    scopes: Mapped[List[str]] = mapped_column(JSON, default=list)  # 权限范围列表
+    scopes: Mapped[List[str]] = mapped_column(JSONBType, default=list)  # 权限范围列表
     allowed_routes: Mapped[Optional[List[str]]] = mapped_column(JSON, default=list)  # 允许的路由
-    allowed_ips: Mapped[Optional[List[str]]] = mapped_column(JSON, default=list)  # 允许的IP白名单
+    allowed_ips: Mapped[Optional[List[str]]] = mapped_column(JSONBType, default=list)  # 允许的IP白名单
     
     # 限流配置
     rate_limit: Mapped[Optional[int]] = mapped_column(Integer, default=None)  # 请求/分钟，None表示无限制
@@ -111,32 +128,39 @@ class ApiKey(Base):
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
     
     # 时间戳
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
     
     # 关系
-    user = relationship("User", backref="api_keys")
+    user = relationship("User", back_populates="api_keys", lazy="raise_on_sql")
     
     def __repr__(self) -> str:
         return f"<ApiKey(id={self.id}, name={self.name}, key_prefix={self.key_prefix})>"
 
 
-class RateLimitLog(Base):
+class RateLimitLog(Base, BulkInsertMixin):
     """
     限流日志模型
     
     记录限流事件
     """
     __tablename__ = "rate_limit_logs"
+    __table_args__ = (
+        Index("ix_rate_limit_logs_key_created", "key_value", "created_at"),
+        Index("ix_rate_limit_logs_route_created", "route_id", "created_at"),
+        Index("ix_rate_limit_logs_created_brin", "created_at", postgresql_using="brin"),
+        partitioned_by_month("created_at"),
+    )
     
-    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    # 组合主键不能依赖 SERIAL 自增，使用 IDENTITY 生成
+    id: Mapped[int] = mapped_column(Identity(), primary_key=True)
     
     # 限流目标
     key_type: Mapped[str] = mapped_column(String(20), nullable=False)  # ip/user/api_key
-    key_value: Mapped[str] = mapped_column(String(100), index=True, nullable=False)
+    key_value: Mapped[str] = mapped_column(String(100), nullable=False)
     
     # 请求信息
-    route_id: Mapped[Optional[int]] = mapped_column(ForeignKey("gateway_routes.id"))
+    route_id: Mapped[Optional[int]] = mapped_column(ForeignKey("gateway_routes.id", ondelete="SET NULL"))
     path: Mapped[str] = mapped_column(String(500), nullable=False)
     method: Mapped[str] = mapped_column(String(10), nullable=False)
     
@@ -148,11 +172,13 @@ class RateLimitLog(Base):
     # 是否被限制
     blocked: Mapped[bool] = mapped_column(Boolean, default=False)
     
-    # 时间戳
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    # 时间戳（分区键，与 id 组成主键）；ORM 写入时带上取值以确定主键，批量 INSERT ... SELECT 由数据库填充
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, primary_key=True, default=datetime.utcnow, server_default=func.now()
+    )
     
     # 关系
-    route = relationship("GatewayRoute", backref="rate_limit_logs")
+    route = relationship("GatewayRoute", back_populates="rate_limit_logs", lazy="raise_on_sql")
     
     def __repr__(self) -> str:
         return f"<RateLimitLog(id={self.id}, key={self.key_value}, blocked={self.blocked})>"
@@ -1,15 +1,19 @@
 """
 已发布技能数据模型
 """
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, JSON, Numeric, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Index, LargeBinary, Numeric, UniqueConstraint, func
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship
 from datetime import datetime
-from app.database import Base
+from app.database import Base, JSONBType
 
 
 class PublishedSkill(Base):
     """已发布技能"""
     __tablename__ = "published_skills"
+    __table_args__ = (
+        Index('ix_published_skills_tags_gin', 'tags', postgresql_using='gin'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     skill_id = Column(Integer, ForeignKey("skills.id"), nullable=False, index=True)
@@ -23,7 +27,7 @@ class PublishedSkill(Base):
 
     # 分类和标签
     category = Column(String(50), nullable=True, index=True)
-    tags = Column(JSON, nullable=True)  # 标签列表
+    tags = Column(JSONBType, nullable=True)  # 标签列表
 
     # 定价信息
     price = Column(Numeric(10, 2), default=0.00, nullable=False)  # 价格（0表示免费）
@@ -74,10 +78,10 @@ class SkillPackage(Base):
     # 存储信息
     storage_path = Column(String(500), nullable=False)  # MinIO中的对象路径
     file_size = Column(Integer, nullable=False)  # 文件大小（字节）
-    checksum = Column(String(64), nullable=False)  # SHA256校验和
+    checksum = Column(LargeBinary(32), nullable=False)  # SHA256 摘要（原始 32 字节）
 
     # 依赖信息
-    dependencies = Column(JSON, nullable=True)  # 依赖列表
+    dependencies = Column(JSONBType, nullable=True)  # 依赖列表
     min_platform_version = Column(String(20), nullable=True)  # 最低平台版本要求
 
     # 发布说明
@@ -98,6 +102,15 @@ class SkillPackage(Base):
     # 关系
     published_skill = relationship("PublishedSkill", back_populates="packages")
 
+    @hybrid_property
+    def checksum_hex(self) -> str:
+        """十六进制形式的校验和，用于展示"""
+        return self.checksum.hex()
+
+    @checksum_hex.expression
+    def checksum_hex(cls):
+        return func.encode(cls.checksum, "hex")
+
     def __repr__(self):
         return f"<SkillPackage(id={self.id}, version={self.version}, skill_id={self.published_skill_id})>"
 
@@ -63,7 +63,7 @@ class Session(Base):
     total_tokens: Mapped[int] = mapped_column(Integer, default=0)
     
     # 元数据
-    metadata: Mapped[Optional[dict]] = mapped_column(JSON, default=dict)
+    extra_data: Mapped[Optional[dict]] = mapped_column("metadata", JSON, default=dict)
     
     # 时间戳
     created_at: Mapped[datetime] = mapped_column(
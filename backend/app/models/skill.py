@@ -1,10 +1,10 @@
 """
 技能数据模型
 """
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey
 from sqlalchemy.orm import relationship
 from datetime import datetime
-from app.database import Base
+from app.database import Base, JSONBType
 
 
 class Skill(Base):
@@ -29,8 +29,8 @@ class Skill(Base):
     skill_type = Column(String(50), default="custom", nullable=False)  # custom, template, imported
 
     # 技能配置
-    config = Column(JSON, nullable=True)  # 技能配置（JSON格式）
-    tags = Column(JSON, nullable=True)  # 标签列表
+    config = Column(JSONBType, nullable=True)  # 技能配置（JSON格式）
+    tags = Column(JSONBType, nullable=True)  # 标签列表
 
     # Git 仓库信息
     git_repo_url = Column(String(500), nullable=True)
@@ -55,6 +55,7 @@ class Skill(Base):
     files = relationship("SkillFile", back_populates="skill", cascade="all, delete-orphan")
     executions = relationship("SkillExecution", back_populates="skill", cascade="all, delete-orphan")
     usage_records = relationship("BillingUsage", back_populates="skill")
+    deployments = relationship("Deployment", back_populates="skill", passive_deletes=True, lazy="raise_on_sql")
 
     def __repr__(self):
         return f"<Skill(id={self.id}, name={self.name}, version={self.version})>"
@@ -100,7 +101,7 @@ class SkillExecution(Base):
 
     # 执行信息
     status = Column(String(20), default="pending", nullable=False, index=True)  # pending, running, success, failed
-    input_params = Column(JSON, nullable=True)  # 输入参数
+    input_params = Column(JSONBType, nullable=True)  # 输入参数
     output_result = Column(Text, nullable=True)  # 输出结果
     error_message = Column(Text, nullable=True)  # 错误信息
 
@@ -132,7 +133,7 @@ class SkillExecutionLog(Base):
     # 日志信息
     log_level = Column(String(20), default="INFO", nullable=False)  # DEBUG, INFO, WARNING, ERROR
     message = Column(Text, nullable=False)
-    metadata = Column(JSON, nullable=True)  # 额外元数据
+    extra_data = Column("metadata", JSONBType, nullable=True)  # 额外元数据
 
     # 时间戳
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
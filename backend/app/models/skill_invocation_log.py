@@ -3,33 +3,34 @@
 
 存储技能调用的详细日志到 PostgreSQL
 """
-from sqlalchemy import Column, Integer, String, Text, DateTime, Float, JSON, Index
+from sqlalchemy import Column, Integer, String, Text, DateTime, Float, Identity, Index
 from sqlalchemy.sql import func
-from app.database import Base
+from app.database import Base, BulkInsertMixin, JSONBType, partitioned_by_month
 
 
-class SkillInvocationLog(Base):
+class SkillInvocationLog(Base, BulkInsertMixin):
     """技能调用日志表"""
     __tablename__ = "skill_invocation_logs"
     
-    id = Column(Integer, primary_key=True, index=True)
+    # 组合主键不能依赖 SERIAL 自增，使用 IDENTITY 生成
+    id = Column(Integer, Identity(), primary_key=True)
     
     # 技能信息
-    skill_id = Column(Integer, nullable=False, index=True)
+    skill_id = Column(Integer, nullable=False)
     skill_name = Column(String(255), nullable=False)
     skill_version = Column(String(50), nullable=True)
     
     # 执行信息
     execution_type = Column(String(50), nullable=False, default="api")  # api/websocket/scheduled
-    status = Column(String(20), nullable=False, index=True)  # success/error/timeout
+    status = Column(String(20), nullable=False)  # success/error/timeout
     
     # 用户信息
-    user_id = Column(Integer, nullable=True, index=True)
+    user_id = Column(Integer, nullable=True)
     session_id = Column(Integer, nullable=True, index=True)
     
     # 请求信息
     request_id = Column(String(100), nullable=True, index=True)
-    input_params = Column(JSON, nullable=True)
+    input_params = Column(JSONBType, nullable=True)
     
     # 响应信息
     output_data = Column(Text, nullable=True)
@@ -43,18 +44,19 @@ class SkillInvocationLog(Base):
     cpu_percent = Column(Float, nullable=True)
     
     # 元数据
-    metadata = Column(JSON, nullable=True)
+    extra_data = Column("metadata", JSONBType, nullable=True)
     
     # 时间戳
-    started_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    started_at = Column(DateTime(timezone=True), primary_key=True, index=True)  # 分区键，与 id 组成主键
     completed_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     
-    # 索引
+    # 索引（skill_id/user_id/status 的单列查询由以下复合索引的前缀覆盖）
     __table_args__ = (
         Index('idx_skill_invocation_skill_date', 'skill_id', 'started_at'),
         Index('idx_skill_invocation_user_date', 'user_id', 'started_at'),
         Index('idx_skill_invocation_status_date', 'status', 'started_at'),
+        partitioned_by_month('started_at'),
     )
     
     def to_dict(self):
@@ -103,7 +105,7 @@ class SkillErrorLog(Base):
     sample_stack_trace = Column(Text, nullable=True)
     
     # 元数据
-    metadata = Column(JSON, nullable=True)
+    extra_data = Column("metadata", JSONBType, nullable=True)
     
     # 时间戳
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -7,21 +7,21 @@
 - 评分统计（分布、趋势）
 - 访问量统计（浏览次数）
 """
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, JSON, Numeric, Date, Index
+from sqlalchemy import Column, Computed, Identity, Integer, String, Text, DateTime, Boolean, ForeignKey, Numeric, Date, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime, date
-from app.database import Base
+from app.database import Base, BulkInsertMixin, JSONBType, partitioned_by_month
 
 
 class SkillDailyStats(Base):
     """技能每日统计"""
     __tablename__ = "skill_daily_stats"
     __table_args__ = (
-        Index('ix_skill_daily_stats_skill_date', 'skill_id', 'stat_date', unique=True),
+        UniqueConstraint('skill_id', 'stat_date', name='uq_skill_daily_stats_skill_date'),
     )
 
     id = Column(Integer, primary_key=True, index=True)
-    skill_id = Column(Integer, ForeignKey("published_skills.id"), nullable=False, index=True)
+    skill_id = Column(Integer, ForeignKey("published_skills.id"), nullable=False)  # 由 (skill_id, stat_date) 唯一约束覆盖
     stat_date = Column(Date, nullable=False, index=True)
 
     # 下载统计
@@ -81,15 +81,21 @@ class SkillVersionStats(Base):
         return f"<SkillVersionStats(package_id={self.package_id})>"
 
 
+_RATING_TOTAL = "rating_1_count + rating_2_count + rating_3_count + rating_4_count + rating_5_count"
+_RATING_WEIGHTED_SUM = (
+    "rating_1_count + 2 * rating_2_count + 3 * rating_3_count + 4 * rating_4_count + 5 * rating_5_count"
+)
+
+
 class SkillRatingDistribution(Base):
     """技能评分分布"""
     __tablename__ = "skill_rating_distribution"
     __table_args__ = (
-        Index('ix_skill_rating_dist_skill_date', 'skill_id', 'stat_date', unique=True),
+        UniqueConstraint('skill_id', 'stat_date', name='uq_skill_rating_dist_skill_date'),
     )
 
     id = Column(Integer, primary_key=True, index=True)
-    skill_id = Column(Integer, ForeignKey("published_skills.id"), nullable=False, index=True)
+    skill_id = Column(Integer, ForeignKey("published_skills.id"), nullable=False)  # 由 (skill_id, stat_date) 唯一约束覆盖
     stat_date = Column(Date, nullable=False, index=True)
 
     # 评分分布 (1-5星各多少个)
@@ -99,9 +105,18 @@ class SkillRatingDistribution(Base):
     rating_4_count = Column(Integer, default=0, nullable=False)
     rating_5_count = Column(Integer, default=0, nullable=False)
 
-    # 计算字段
-    total_ratings = Column(Integer, default=0, nullable=False)
-    avg_rating = Column(Numeric(3, 2), default=0.00, nullable=False)
+    # 计算字段（由数据库根据各星级计数生成，写入时只需更新计数列）
+    # 乘以 1.0 转为小数除法：SQLite 中 CAST(... AS NUMERIC) 仍是整数，会截断平均分
+    total_ratings = Column(Integer, Computed(_RATING_TOTAL, persisted=True), nullable=False)
+    avg_rating = Column(
+        Numeric(3, 2),
+        Computed(
+            f"CASE WHEN {_RATING_TOTAL} = 0 THEN 0 "
+            f"ELSE ROUND(1.0 * ({_RATING_WEIGHTED_SUM}) / ({_RATING_TOTAL}), 2) END",
+            persisted=True
+        ),
+        nullable=False
+    )
 
     # 时间戳
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -113,15 +128,22 @@ class SkillRatingDistribution(Base):
         return f"<SkillRatingDistribution(skill_id={self.skill_id}, date={self.stat_date})>"
 
 
-class SkillExecutionLog(Base):
-    """技能执行日志（用于统计）"""
-    __tablename__ = "skill_execution_logs"
+class SkillStatExecutionLog(Base, BulkInsertMixin):
+    """
+    技能执行日志（用于统计）
+
+    与 app.models.skill.SkillExecutionLog（skill_execution_logs，沙箱执行的逐行日志）
+    不是同一张表，类名和表名都需区分开
+    """
+    __tablename__ = "skill_stat_execution_logs"
     __table_args__ = (
-        Index('ix_skill_exec_logs_skill_created', 'skill_id', 'created_at'),
+        Index('ix_skill_stat_exec_logs_skill_created', 'skill_id', 'created_at'),
+        partitioned_by_month('created_at'),
     )
 
-    id = Column(Integer, primary_key=True, index=True)
-    skill_id = Column(Integer, ForeignKey("published_skills.id"), nullable=False, index=True)
+    # 组合主键不能依赖 SERIAL 自增，使用 IDENTITY 生成
+    id = Column(Integer, Identity(), primary_key=True)
+    skill_id = Column(Integer, ForeignKey("published_skills.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
     session_id = Column(Integer, ForeignKey("sessions.id"), nullable=True, index=True)
     package_id = Column(Integer, ForeignKey("skill_packages.id"), nullable=True)
@@ -136,27 +158,29 @@ class SkillExecutionLog(Base):
     error_message = Column(Text, nullable=True)
 
     # 元数据
-    metadata = Column(JSON, nullable=True)  # 其他元数据
+    extra_data = Column("metadata", JSONBType, nullable=True)  # 其他元数据
 
     # 时间戳
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow, primary_key=True, index=True)  # 分区键，与 id 组成主键
 
     # 关系
     skill = relationship("PublishedSkill", backref="execution_logs")
 
     def __repr__(self):
-        return f"<SkillExecutionLog(skill_id={self.skill_id}, status={self.status})>"
+        return f"<SkillStatExecutionLog(skill_id={self.skill_id}, status={self.status})>"
 
 
-class SkillViewLog(Base):
+class SkillViewLog(Base, BulkInsertMixin):
     """技能浏览日志"""
     __tablename__ = "skill_view_logs"
     __table_args__ = (
         Index('ix_skill_view_logs_skill_created', 'skill_id', 'created_at'),
+        partitioned_by_month('created_at'),
     )
 
-    id = Column(Integer, primary_key=True, index=True)
-    skill_id = Column(Integer, ForeignKey("published_skills.id"), nullable=False, index=True)
+    # 组合主键不能依赖 SERIAL 自增，使用 IDENTITY 生成
+    id = Column(Integer, Identity(), primary_key=True)
+    skill_id = Column(Integer, ForeignKey("published_skills.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
     
     # 浏览来源
@@ -164,7 +188,7 @@ class SkillViewLog(Base):
     referrer = Column(String(500), nullable=True)  # 来源URL
 
     # 时间戳
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow, primary_key=True, index=True)  # 分区键，与 id 组成主键
 
     # 关系
     skill = relationship("PublishedSkill", backref="view_logs")
@@ -184,8 +208,8 @@ class SkillSearchLog(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
     
     # 搜索信息
-    query = Column(String(500), nullable=False, index=True)
-    filters = Column(JSON, nullable=True)  # 筛选条件
+    query = Column(String(500), nullable=False)
+    filters = Column(JSONBType, nullable=True)  # 筛选条件
 
     # 搜索结果
     result_count = Column(Integer, default=0, nullable=False)
@@ -1,10 +1,10 @@
 """
 技能版本数据模型
 """
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON, Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean
 from sqlalchemy.orm import relationship
 from datetime import datetime
-from app.database import Base
+from app.database import Base, JSONBType
 
 
 class SkillVersion(Base):
@@ -30,7 +30,7 @@ class SkillVersion(Base):
     deletions = Column(Integer, default=0, nullable=False)
     
     # 元数据
-    metadata = Column(JSON, nullable=True)  # 额外元数据
+    extra_data = Column("metadata", JSONBType, nullable=True)  # 额外元数据
     
     # 时间戳
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -65,7 +65,7 @@ class ToolExecutionLog(Base):
     # 日志信息
     log_level = Column(String(20), default="INFO", nullable=False)  # DEBUG, INFO, WARNING, ERROR
     message = Column(Text, nullable=False)
-    metadata = Column(Text, nullable=True)  # JSON格式的额外数据
+    extra_data = Column("metadata", Text, nullable=True)  # JSON格式的额外数据
     
     # 时间戳
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
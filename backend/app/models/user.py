@@ -68,10 +68,15 @@ class User(Base):
     skills = relationship("Skill", back_populates="user", cascade="all, delete-orphan")
     apps = relationship("App", back_populates="user", cascade="all, delete-orphan")
     files = relationship("File", back_populates="user", cascade="all, delete-orphan")
+    skill_executions = relationship("SkillExecution", back_populates="user", lazy="raise_on_sql")
     # Billing relations
     subscriptions = relationship("Subscription", back_populates="user", cascade="all, delete-orphan")
     usage_records = relationship("BillingUsage", back_populates="user", cascade="all, delete-orphan")
     bills = relationship("BillingBill", back_populates="user", cascade="all, delete-orphan")
+    # Deployment / Gateway relations（仅显式加载）
+    deployments = relationship("Deployment", back_populates="user", passive_deletes=True, lazy="raise_on_sql")
+    gateway_routes = relationship("GatewayRoute", back_populates="user", passive_deletes=True, lazy="raise_on_sql")
+    api_keys = relationship("ApiKey", back_populates="user", passive_deletes=True, lazy="raise_on_sql")
     
     def __repr__(self) -> str:
         return f"<User(id={self.id}, username={self.username}, email={self.email})>"
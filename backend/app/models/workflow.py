@@ -1,12 +1,12 @@
 """
 工作流数据模型
 """
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
-from app.database import Base
+from app.database import Base, JSONBType
 
 
 class Workflow(Base):
@@ -17,8 +17,8 @@ class Workflow(Base):
     name = Column(String(255), nullable=False)
     description = Column(Text, nullable=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
-    definition = Column(JSON, nullable=False)  # {nodes: [], edges: []}
-    variables = Column(JSON, nullable=True)  # 输入变量定义
+    definition = Column(JSONBType, nullable=False)  # {nodes: [], edges: []}
+    variables = Column(JSONBType, nullable=True)  # 输入变量定义
     is_active = Column(Boolean, default=True, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
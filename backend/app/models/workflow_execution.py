@@ -155,7 +155,7 @@ class ExecutionLog(Base):
     message = Column(Text, nullable=False)
     
     # 额外数据
-    metadata = Column(JSON, nullable=True, default=dict)
+    extra_data = Column("metadata", JSON, nullable=True, default=dict)
     
     # 时间戳
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
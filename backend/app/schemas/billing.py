@@ -177,6 +177,21 @@ class UsageRecord(BaseModel):
         from_attributes = True
 
 
+class UsageRecordItem(BaseModel):
+    """单条用量"""
+    usage_type: BillingUsageType
+    quantity: Decimal = Field(..., ge=0, description="用量数值")
+    skill_id: Optional[int] = None
+    skill_name: Optional[str] = None
+    metadata: Optional[dict] = None
+
+
+class UsageRecordBatchRequest(BaseModel):
+    """批量记录用量请求"""
+    subscription_id: int = Field(..., description="订阅ID")
+    items: List[UsageRecordItem] = Field(..., min_length=1, max_length=1000, description="用量列表")
+
+
 class UsageSummary(BaseModel):
     """用量汇总"""
     usage_type: BillingUsageType
@@ -107,8 +107,8 @@ class DeploymentResponse(BaseModel):
     restart_count: int
     
     # 统计
-    cpu_usage: Optional[str]
-    memory_usage: Optional[str]
+    cpu_usage: Optional[float]  # 百分比
+    memory_usage_bytes: Optional[int]
     
     # 错误
     error_message: Optional[str]
@@ -3,7 +3,7 @@ API网关相关的Pydantic schemas
 """
 from datetime import datetime
 from typing import Optional, List
-from pydantic import BaseModel, Field, ConfigDict, field_validator
+from pydantic import AliasChoices, BaseModel, Field, ConfigDict, field_validator
 import re
 
 
@@ -126,7 +126,8 @@ class GatewayRouteResponse(GatewayRouteBase):
     priority: int = 100
     is_active: bool = True
     tags: List[str] = []
-    metadata: dict = {}
+    # ORM 模型上的属性名为 extra_data
+    metadata: dict = Field(default={}, validation_alias=AliasChoices("extra_data", "metadata"))
     external_id: Optional[str] = None
     sync_status: str = "pending"
     last_sync_at: Optional[datetime] = None
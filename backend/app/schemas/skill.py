@@ -1,7 +1,7 @@
 """
 技能 Pydantic 模型
 """
-from pydantic import BaseModel, Field
+from pydantic import AliasChoices, BaseModel, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 
@@ -112,7 +112,9 @@ class SkillExecutionLogResponse(BaseModel):
     execution_id: int
     log_level: str
     message: str
-    metadata: Optional[Dict[str, Any]] = None
+    metadata: Optional[Dict[str, Any]] = Field(
+        default=None, validation_alias=AliasChoices("extra_data", "metadata")
+    )
     created_at: datetime
 
     class Config:
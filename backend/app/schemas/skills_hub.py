@@ -92,6 +92,14 @@ class SkillPackageResponse(BaseModel):
     published_at: datetime
     download_url: Optional[str] = None  # 预签名下载URL
 
+    @field_validator('checksum', mode='before')
+    @classmethod
+    def checksum_to_hex(cls, v):
+        # 数据库中存储 SHA256 原始摘要，响应中返回十六进制
+        if isinstance(v, bytes):
+            return v.hex()
+        return v
+
     class Config:
         from_attributes = True
 
@@ -1,7 +1,9 @@
 """
 工具调用 Pydantic 模型
 """
-from pydantic import BaseModel, Field
+import json
+
+from pydantic import AliasChoices, BaseModel, Field, field_validator
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from enum import Enum
@@ -42,8 +44,18 @@ class ToolExecutionLogResponse(BaseModel):
     tool_call_id: int
     log_level: str
     message: str
-    metadata: Optional[Dict[str, Any]] = None
+    metadata: Optional[Dict[str, Any]] = Field(
+        default=None, validation_alias=AliasChoices("extra_data", "metadata")
+    )
     created_at: datetime
+
+    @field_validator('metadata', mode='before')
+    @classmethod
+    def parse_metadata(cls, v):
+        # 日志表中以 JSON 文本存储
+        if isinstance(v, str):
+            return json.loads(v)
+        return v
     
     class Config:
         from_attributes = True
@@ -16,6 +16,7 @@ import logging
 import redis.asyncio as aioredis
 
 from app.config import settings
+from app.database import jsonb_contains
 from app.models.gateway import GatewayRoute, ApiKey, RateLimitLog
 from app.schemas.gateway import (
     GatewayRouteCreate, GatewayRouteUpdate,
@@ -76,7 +77,7 @@ class GatewayService:
             retry_count=route_data.retry_count,
             priority=route_data.priority,
             tags=route_data.tags or [],
-            metadata=route_data.metadata or {},
+            extra_data=route_data.metadata or {},
             user_id=user_id,
             sync_status="pending"
         )
@@ -115,7 +116,7 @@ class GatewayService:
         if tags:
             # PostgreSQL JSON数组查询
             for tag in tags:
-                query = query.where(GatewayRoute.tags.contains([tag]))
+                query = query.where(jsonb_contains(GatewayRoute.tags, [tag]))
         
         # 计算总数
         count_query = select(func.count()).select_from(query.subquery())
@@ -156,6 +157,8 @@ class GatewayService:
         
         # 更新字段
         update_data = route_data.model_dump(exclude_unset=True)
+        if "metadata" in update_data:
+            update_data["extra_data"] = update_data.pop("metadata")
         for field, value in update_data.items():
             setattr(route, field, value)
         
@@ -468,25 +471,24 @@ class GatewayService:
         current_count: int,
         blocked: bool,
         route_id: Optional[int] = None
-    ) -> RateLimitLog:
+    ) -> None:
         """记录限流事件"""
-        log = RateLimitLog(
-            key_type=key_type,
-            key_value=key_value,
-            route_id=route_id,
-            path=path,
-            method=method,
-            limit=limit,
-            window_seconds=window_seconds,
-            current_count=current_count,
-            blocked=blocked
-        )
-        
-        self.db.add(log)
+        await self.log_rate_limit_events([{
+            "key_type": key_type,
+            "key_value": key_value,
+            "route_id": route_id,
+            "path": path,
+            "method": method,
+            "limit": limit,
+            "window_seconds": window_seconds,
+            "current_count": current_count,
+            "blocked": blocked,
+        }])
+    
+    async def log_rate_limit_events(self, events: List[Dict[str, Any]]) -> None:
+        """批量记录限流事件（一条 INSERT 写入）"""
+        await RateLimitLog.bulk_insert(self.db, events)
         await self.db.commit()
-        await self.db.refresh(log)
-        
-        return log
     
     # ==================== Kong网关集成 ====================
     
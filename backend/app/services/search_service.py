@@ -14,6 +14,7 @@ import json
 import logging
 from datetime import datetime, timedelta
 
+from app.database import jsonb_contains
 from app.models.published_skill import PublishedSkill, SkillPackage
 from app.models.category import SkillCategory, SkillCategoryMapping
 from app.core.cache import cache, CacheKeys, CacheExpire
@@ -219,7 +220,7 @@ class SearchService:
         conditions = []
         for tag in tags:
             conditions.append(
-                PublishedSkill.tags.contains([tag])
+                jsonb_contains(PublishedSkill.tags, [tag])
             )
         query = query.where(or_(*conditions))
         return query
@@ -97,7 +97,7 @@ class SkillMonitoringService:
             duration_ms=duration_ms,
             memory_bytes=memory_bytes,
             cpu_percent=cpu_percent,
-            metadata=metadata,
+            extra_data=metadata,
             started_at=started_at or datetime.utcnow(),
             completed_at=completed_at or datetime.utcnow()
         )
@@ -3,22 +3,25 @@
 
 实现统计数据收集、聚合和查询功能
 """
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, update, and_, or_, case
+from sqlalchemy import select, func, update, and_, or_, case, literal
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.sql import text
 from datetime import datetime, date, timedelta
 from decimal import Decimal
+import asyncio
 import logging
 import csv
 import io
 
+from app.database import AsyncSessionLocal
 from app.models.published_skill import PublishedSkill, SkillPackage
 from app.models.skill_stats import (
     SkillDailyStats,
     SkillVersionStats,
     SkillRatingDistribution,
-    SkillExecutionLog,
+    SkillStatExecutionLog,
     SkillViewLog,
     SkillSearchLog
 )
@@ -111,91 +114,81 @@ class StatsService:
             await self.db.rollback()
             return False
 
-    async def record_execution(
-        self,
-        skill_id: int,
-        user_id: Optional[int] = None,
-        session_id: Optional[int] = None,
-        package_id: Optional[int] = None,
-        version: Optional[str] = None,
-        execution_type: str = "invoke",
-        status: str = "success",
-        duration_ms: Optional[int] = None,
-        error_message: Optional[str] = None,
-        metadata: Optional[Dict] = None
-    ) -> bool:
-        """记录执行"""
-        try:
-            today = date.today()
-
-            # 创建执行日志
-            log = SkillExecutionLog(
-                skill_id=skill_id,
-                user_id=user_id,
-                session_id=session_id,
-                package_id=package_id,
-                execution_type=execution_type,
-                version=version,
-                status=status,
-                duration_ms=duration_ms,
-                error_message=error_message,
-                metadata=metadata
-            )
-            self.db.add(log)
-
-            # 更新每日统计
-            await self._upsert_daily_stat(
-                skill_id=skill_id,
-                stat_date=today,
-                increment={"execution_count": 1},
-                unique_user=user_id,
-                unique_field="unique_executions"
-            )
-
-            await self.db.commit()
-
-            return True
-        except Exception as e:
-            logger.error(f"Failed to record execution: {e}")
-            await self.db.rollback()
-            return False
-
-    async def record_view(
-        self,
-        skill_id: int,
-        user_id: Optional[int] = None,
-        source: Optional[str] = None,
-        referrer: Optional[str] = None
-    ) -> bool:
-        """记录浏览"""
+    async def record_executions(self, executions: List[Dict[str, Any]]) -> int:
+        """
+        批量记录执行
+
+        executions 每项包含 skill_id，以及可选的 user_id、session_id、package_id、version、
+        execution_type、status、duration_ms、error_message、metadata；执行日志通过一条
+        INSERT 写入，每日统计按技能合并后更新
+
+        Returns:
+            int: 写入的日志数，失败时为 0
+        """
+        rows = [
+            {
+                "skill_id": item["skill_id"],
+                "user_id": item.get("user_id"),
+                "session_id": item.get("session_id"),
+                "package_id": item.get("package_id"),
+                "execution_type": item.get("execution_type", "invoke"),
+                "version": item.get("version"),
+                "status": item.get("status", "success"),
+                "duration_ms": item.get("duration_ms"),
+                "error_message": item.get("error_message"),
+                "extra_data": item.get("metadata"),
+            }
+            for item in executions
+        ]
+        return await self._record_logs(SkillStatExecutionLog, rows, "execution_count")
+
+    async def record_views(self, views: List[Dict[str, Any]]) -> int:
+        """
+        批量记录浏览
+
+        views 每项包含 skill_id，以及可选的 user_id、source、referrer；
+        浏览日志通过一条 INSERT 写入，每日统计按技能合并后更新
+
+        Returns:
+            int: 写入的日志数，失败时为 0
+        """
+        rows = [
+            {
+                "skill_id": item["skill_id"],
+                "user_id": item.get("user_id"),
+                "source": item.get("source"),
+                "referrer": item.get("referrer"),
+            }
+            for item in views
+        ]
+        return await self._record_logs(SkillViewLog, rows, "view_count")
+
+    async def _record_logs(self, model, rows: List[Dict[str, Any]], count_field: str) -> int:
+        """批量写入日志并累加每日统计计数"""
+        if not rows:
+            return 0
         try:
             today = date.today()
+            await model.bulk_insert(self.db, rows)
 
-            # 创建浏览日志
-            log = SkillViewLog(
-                skill_id=skill_id,
-                user_id=user_id,
-                source=source,
-                referrer=referrer
-            )
-            self.db.add(log)
-
-            # 更新每日统计
-            await self._upsert_daily_stat(
-                skill_id=skill_id,
-                stat_date=today,
-                increment={"view_count": 1},
-                unique_user=user_id,
-                unique_field="unique_views"
-            )
+            counts: Dict[int, int] = {}
+            for row in rows:
+                counts[row["skill_id"]] = counts.get(row["skill_id"], 0) + 1
+            for skill_id, count in counts.items():
+                await self._upsert_daily_stat(
+                    skill_id=skill_id,
+                    stat_date=today,
+                    increment={count_field: count},
+                    unique_field=None
+                )
 
             await self.db.commit()
 
-            return True
+            return len(rows)
         except Exception as e:
-            logger.error(f"Failed to record view: {e}")
+            logger.error(f"Failed to record {model.__tablename__}: {e}")
             await self.db.rollback()
-            return False
+            return 0
 
     async def record_search(
         self,
@@ -226,69 +219,35 @@ class StatsService:
         self,
         skill_id: int
     ) -> bool:
-        """更新评分分布"""
-        try:
-            today = date.today()
+        """
+        更新评分分布
 
-            # 查询评分分布
+        一条 INSERT ... SELECT ... ON CONFLICT 语句完成统计和写入；
+        total_ratings 和 avg_rating 为生成列，由数据库根据各星级计数计算
+        """
+        try:
             from app.models.published_skill import SkillRating
-            result = await self.db.execute(
-                select(
-                    SkillRating.rating,
-                    func.count(SkillRating.id).label("count")
-                )
-                .where(SkillRating.published_skill_id == skill_id)
-                .group_by(SkillRating.rating)
-            )
-            rows = result.all()
 
-            # 构建分布
-            distribution = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
-            total = 0
-            weighted_sum = 0
-
-            for row in rows:
-                rating = row.rating
-                count = row.count
-                if rating in distribution:
-                    distribution[rating] = count
-                    total += count
-                    weighted_sum += rating * count
-
-            avg_rating = weighted_sum / total if total > 0 else 0
-
-            # 检查是否已有记录
-            existing = await self.db.execute(
-                select(SkillRatingDistribution).where(
-                    and_(
-                        SkillRatingDistribution.skill_id == skill_id,
-                        SkillRatingDistribution.stat_date == today
-                    )
+            count_columns = [f"rating_{n}_count" for n in range(1, 6)]
+            distribution = select(
+                literal(skill_id),
+                literal(date.today()),
+                literal(datetime.utcnow()),
+                *(
+                    func.count(SkillRating.id).filter(SkillRating.rating == n)
+                    for n in range(1, 6)
                 )
+            ).where(SkillRating.published_skill_id == skill_id)
+
+            stmt = pg_insert(SkillRatingDistribution).from_select(
+                ["skill_id", "stat_date", "created_at", *count_columns],
+                distribution
             )
-            existing_record = existing.scalar_one_or_none()
-
-            if existing_record:
-                existing_record.rating_1_count = distribution[1]
-                existing_record.rating_2_count = distribution[2]
-                existing_record.rating_3_count = distribution[3]
-                existing_record.rating_4_count = distribution[4]
-                existing_record.rating_5_count = distribution[5]
-                existing_record.total_ratings = total
-                existing_record.avg_rating = avg_rating
-            else:
-                record = SkillRatingDistribution(
-                    skill_id=skill_id,
-                    stat_date=today,
-                    rating_1_count=distribution[1],
-                    rating_2_count=distribution[2],
-                    rating_3_count=distribution[3],
-                    rating_4_count=distribution[4],
-                    rating_5_count=distribution[5],
-                    total_ratings=total,
-                    avg_rating=avg_rating
-                )
-                self.db.add(record)
+            stmt = stmt.on_conflict_do_update(
+                constraint="uq_skill_rating_dist_skill_date",
+                set_={column: stmt.excluded[column] for column in count_columns}
+            )
+            await self.db.execute(stmt)
 
             await self.db.commit()
             return True
@@ -772,3 +731,128 @@ class StatsService:
         await cache.delete_pattern(f"stats:trend:{skill_id}*")
         await cache.delete_pattern("stats:overview*")
         await cache.delete_pattern(f"skill:detail:{skill_id}*")
+
+
+class StatsLogBuffer:
+    """
+    执行/浏览日志后台写入器
+
+    记录接口在请求路径上只把日志放入内存队列，后台任务每 FLUSH_INTERVAL_SECONDS
+    或积累到 MAX_BATCH_SIZE 条时，通过 StatsService.record_executions / record_views
+    每类一条 INSERT 写入，并按技能合并每日统计；队列写满时丢弃新记录。
+    """
+
+    MAX_QUEUE_SIZE = 10000  # 队列上限
+    MAX_BATCH_SIZE = 500  # 单次写入最多包含的记录数，积累到该数量时立即写入
+    FLUSH_INTERVAL_SECONDS = 1.0  # 写入间隔
+
+    # 元素为 (日志类型, 记录参数)，日志类型为 "execution" 或 "view"
+    _queue: "asyncio.Queue[Tuple[str, Dict[str, Any]]]" = asyncio.Queue(maxsize=MAX_QUEUE_SIZE)
+    _task: Optional[asyncio.Task] = None
+    _batch_ready: Optional[asyncio.Event] = None
+    dropped_events = 0
+
+    @classmethod
+    def record_execution(cls, skill_id: int, **kwargs):
+        """记录一次执行（不阻塞），参数见 StatsService.record_executions"""
+        cls._put("execution", {"skill_id": skill_id, **kwargs})
+
+    @classmethod
+    def record_view(cls, skill_id: int, **kwargs):
+        """记录一次浏览（不阻塞），参数见 StatsService.record_views"""
+        cls._put("view", {"skill_id": skill_id, **kwargs})
+
+    @classmethod
+    def _put(cls, kind: str, item: Dict[str, Any]):
+        try:
+            cls._queue.put_nowait((kind, item))
+        except asyncio.QueueFull:
+            cls.dropped_events += 1
+            return
+        if cls._batch_ready is not None and cls._queue.qsize() >= cls.MAX_BATCH_SIZE:
+            cls._batch_ready.set()
+
+    @classmethod
+    def start(cls):
+        """
+        启动后台写入任务
+
+        队列和事件在当前事件循环中重新创建，已有的记录移入新队列
+        """
+        if cls._task is not None and not cls._task.done():
+            return
+        queue: "asyncio.Queue[Tuple[str, Dict[str, Any]]]" = asyncio.Queue(maxsize=cls.MAX_QUEUE_SIZE)
+        while not cls._queue.empty():
+            queue.put_nowait(cls._queue.get_nowait())
+        cls._queue = queue
+        cls._batch_ready = asyncio.Event()
+        cls._task = asyncio.create_task(cls._run())
+
+    @classmethod
+    async def stop(cls):
+        """停止后台写入任务并写出剩余记录"""
+        if cls._task is not None:
+            cls._task.cancel()
+            try:
+                await cls._task
+            except asyncio.CancelledError:
+                pass
+            cls._task = None
+        cls._batch_ready = None
+        await cls.flush()
+
+    @classmethod
+    async def flush(cls):
+        """
+        写出调用时队列中已有的记录
+
+        只处理开始时的队列长度，写入期间新到达的记录留给下一轮
+        """
+        pending = cls._queue.qsize()
+        while pending > 0:
+            items = cls._drain(min(pending, cls.MAX_BATCH_SIZE))
+            if not items:
+                break
+            pending -= len(items)
+            await cls._write(items)
+
+    @classmethod
+    def _drain(cls, limit: int) -> List[Tuple[str, Dict[str, Any]]]:
+        """从队列取出最多 limit 条记录"""
+        items = []
+        while len(items) < limit:
+            try:
+                items.append(cls._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return items
+
+    @classmethod
+    async def _run(cls):
+        """后台循环：定时或积累到一批时写入"""
+        while True:
+            try:
+                await asyncio.wait_for(cls._batch_ready.wait(), cls.FLUSH_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            cls._batch_ready.clear()
+            try:
+                await cls.flush()
+            except Exception as e:
+                logger.error(f"Stats log flush error: {e}")
+
+    @classmethod
+    async def _write(cls, items: List[Tuple[str, Dict[str, Any]]]):
+        """按日志类型分组写入一批记录"""
+        executions = [item for kind, item in items if kind == "execution"]
+        views = [item for kind, item in items if kind == "view"]
+
+        try:
+            async with AsyncSessionLocal() as session:
+                service = StatsService(session)
+                if executions:
+                    await service.record_executions(executions)
+                if views:
+                    await service.record_views(views)
+        except Exception as e:
+            logger.error(f"Failed to write {len(items)} stats logs: {e}")
@@ -8,11 +8,10 @@ from typing import Optional, List, Dict
 from decimal import Decimal
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_, or_
-from sqlalchemy.orm import selectinload
 
 from app.models.billing import (
-    BillingPlan, Subscription, BillingUsage, BillingBill,
-    BillingPlanType, BillingCycle, BillingUsageType, SubscriptionStatus, BillStatus
+    BillingPlan, Subscription, BillingUsage, BillingBill, BillingLoaders,
+    BillingPlanType, BillingCycle, BillingUsageType, BillingUnit, SubscriptionStatus, BillStatus
 )
 from app.schemas.billing import (
     UsageSummary, SkillUsageSummary, UsageRecord, BillItem
@@ -52,7 +51,7 @@ class UsageTrackingService:
         # 获取订阅信息
         result = await db.execute(
             select(Subscription)
-            .options(selectinload(Subscription.plan))
+            .options(*BillingLoaders.subscription_with_plan)
             .where(Subscription.id == subscription_id)
         )
         subscription = result.scalar_one_or_none()
@@ -82,7 +81,7 @@ class UsageTrackingService:
             total_cost=total_cost,
             period_start=subscription.current_period_start,
             period_end=subscription.current_period_end,
-            metadata=metadata or {}
+            extra_data=metadata or {}
         )
         
         db.add(usage)
@@ -90,6 +89,61 @@ class UsageTrackingService:
         
         return usage
     
+    @staticmethod
+    async def record_usage_batch(
+        db: AsyncSession,
+        subscription_id: int,
+        user_id: int,
+        items: List[dict]
+    ) -> int:
+        """
+        批量记录用量
+        
+        订阅和套餐只查询一次，用量记录通过一条 INSERT 写入，不构造 ORM 对象
+        
+        Args:
+            db: 数据库会话
+            subscription_id: 订阅ID
+            user_id: 用户ID
+            items: 用量列表，每项包含 usage_type、quantity，可选 skill_id、skill_name、metadata
+        
+        Returns:
+            int: 写入的记录数
+        """
+        result = await db.execute(
+            select(Subscription)
+            .options(*BillingLoaders.subscription_with_plan)
+            .where(Subscription.id == subscription_id)
+        )
+        subscription = result.scalar_one_or_none()
+        
+        if not subscription:
+            raise ValueError(f"Subscription {subscription_id} not found")
+        
+        rows = []
+        for item in items:
+            usage_type = item["usage_type"]
+            quantity = item["quantity"]
+            unit_price = UsageTrackingService._get_unit_price(subscription.plan, usage_type)
+            rows.append({
+                "subscription_id": subscription_id,
+                "user_id": user_id,
+                "skill_id": item.get("skill_id"),
+                "skill_name": item.get("skill_name"),
+                "usage_type": usage_type,
+                "quantity": quantity,
+                "unit": UsageTrackingService._get_unit(usage_type),
+                "unit_price": unit_price,
+                "total_cost": quantity * unit_price,
+                "period_start": subscription.current_period_start,
+                "period_end": subscription.current_period_end,
+                "extra_data": item.get("metadata") or {},
+            })
+        
+        await BillingUsage.bulk_insert(db, rows)
+        
+        return len(rows)
+    
     @staticmethod
     def _get_unit_price(plan: BillingPlan, usage_type: BillingUsageType) -> Decimal:
         """获取用量单价"""
@@ -103,16 +157,16 @@ class UsageTrackingService:
         return price_map.get(usage_type) or Decimal("0")
     
     @staticmethod
-    def _get_unit(usage_type: BillingUsageType) -> str:
+    def _get_unit(usage_type: BillingUsageType) -> BillingUnit:
         """获取用量单位"""
         unit_map = {
-            BillingUsageType.API_CALL: "count",
-            BillingUsageType.CPU_TIME: "seconds",
-            BillingUsageType.MEMORY: "mb_seconds",
-            BillingUsageType.STORAGE: "mb",
-            BillingUsageType.EXECUTION_TIME: "seconds",
+            BillingUsageType.API_CALL: BillingUnit.COUNT,
+            BillingUsageType.CPU_TIME: BillingUnit.SECONDS,
+            BillingUsageType.MEMORY: BillingUnit.MB_SECONDS,
+            BillingUsageType.STORAGE: BillingUnit.MB,
+            BillingUsageType.EXECUTION_TIME: BillingUnit.SECONDS,
         }
-        return unit_map.get(usage_type, "count")
+        return unit_map.get(usage_type, BillingUnit.COUNT)
     
     @staticmethod
     async def get_usage_summary(
@@ -206,7 +260,7 @@ class UsageTrackingService:
         """获取订阅配额限制"""
         # 获取活跃订阅
         query = select(Subscription).options(
-            selectinload(Subscription.plan)
+            *BillingLoaders.subscription_with_plan
         ).where(
             and_(
                 Subscription.user_id == user_id,
@@ -673,10 +727,10 @@ class SubscriptionService:
             existing.status = SubscriptionStatus.CANCELLED
             existing.cancelled_at = now
         
-        # 创建新订阅
+        # 创建新订阅（关联已查询的套餐，响应中读取 plan 时无需再次加载）
         subscription = Subscription(
             user_id=user_id,
-            plan_id=plan_id,
+            plan=plan,
             status=SubscriptionStatus.ACTIVE,
             started_at=now,
             expires_at=expires_at,
@@ -697,7 +751,7 @@ class SubscriptionService:
         """获取用户当前活跃订阅"""
         result = await db.execute(
             select(Subscription)
-            .options(selectinload(Subscription.plan))
+            .options(*BillingLoaders.subscription_with_plan)
             .where(
                 and_(
                     Subscription.user_id == user_id,
@@ -715,7 +769,9 @@ class SubscriptionService:
     ) -> Optional[Subscription]:
         """取消订阅"""
         result = await db.execute(
-            select(Subscription).where(
+            select(Subscription)
+            .options(*BillingLoaders.subscription_with_plan)
+            .where(
                 and_(
                     Subscription.id == subscription_id,
                     Subscription.user_id == user_id
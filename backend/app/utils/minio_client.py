@@ -55,7 +55,7 @@ class MinIOClient:
             content_type: 内容类型
         
         Returns:
-            tuple: (object_name, checksum)
+            tuple: (object_name, checksum)，checksum 为 SHA256 原始摘要
         """
         object_name = f"skills/{skill_id}/{version}/package.tar.gz"
         
@@ -63,7 +63,7 @@ class MinIOClient:
             # 计算checksum
             file_data.seek(0)
             content = file_data.read()
-            checksum = hashlib.sha256(content).hexdigest()
+            checksum = hashlib.sha256(content).digest()
             
             # 上传到MinIO
             file_data.seek(0)
@@ -170,7 +170,7 @@ class MinIOClient:
         self,
         skill_id: int,
         version: str,
-        expected_checksum: str
+        expected_checksum: bytes
     ) -> bool:
         """
         验证技能包完整性
@@ -178,7 +178,7 @@ class MinIOClient:
         Args:
             skill_id: 技能ID
             version: 版本号
-            expected_checksum: 预期的checksum
+            expected_checksum: 预期的checksum（SHA256 原始摘要）
         
         Returns:
             bool: 是否通过验证
@@ -188,7 +188,7 @@ class MinIOClient:
             return False
         
         content = file_data.read()
-        actual_checksum = hashlib.sha256(content).hexdigest()
+        actual_checksum = hashlib.sha256(content).digest()
         
         return actual_checksum == expected_checksum
 
@@ -2,13 +2,14 @@
 Celery应用配置
 """
 from celery import Celery
+from celery.schedules import crontab
 from app.config import settings
 
 celery_app = Celery(
     'opencode_tasks',
     broker=settings.REDIS_URL,
     backend=settings.REDIS_URL,
-    include=['tasks.agent_tasks']
+    include=['tasks.agent_tasks', 'tasks.maintenance_tasks']
 )
 
 # Celery配置
@@ -24,3 +25,11 @@ celery_app.conf.update(
     worker_prefetch_multiplier=1,  # 每次只取1个任务
     worker_max_tasks_per_child=50,  # 每个worker处理50个任务后重启
 )
+
+# 定时任务
+celery_app.conf.beat_schedule = {
+    'create-log-partitions': {
+        'task': 'tasks.maintenance_tasks.create_log_partitions',
+        'schedule': crontab(hour=3, minute=0),
+    },
+}
@@ -0,0 +1,17 @@
+"""
+数据库维护任务
+"""
+import asyncio
+import logging
+
+from tasks.celery_app import celery_app
+from app.database import maintain_partitions
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task
+def create_log_partitions() -> None:
+    """为按月分区的日志表补齐未来几个月的分区"""
+    logger.info("Ensuring monthly partitions for log tables")
+    asyncio.run(maintain_partitions())
@@ -0,0 +1,212 @@
+"""
+访问中间件测试
+"""
+import pytest
+from unittest.mock import AsyncMock, patch
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.core.access import AccessMiddleware, LivenessProbeMiddleware
+
+
+async def _ok(request):
+    return PlainTextResponse("ok")
+
+
+async def _boom(request):
+    raise RuntimeError("boom")
+
+
+@pytest.fixture
+def client():
+    app = Starlette(routes=[
+        Route("/api/v1/items", _ok),
+        Route("/health", _ok),
+        Route("/boom", _boom),
+    ])
+    app.add_middleware(AccessMiddleware)
+    return TestClient(app, raise_server_exceptions=False)
+
+
+@pytest.fixture
+def is_allowed():
+    with patch("app.core.rate_limit.rate_limiter.is_allowed", new_callable=AsyncMock) as mock:
+        mock.return_value = (True, 59, 1)
+        yield mock
+
+
+class TestAccessMiddleware:
+    """访问中间件测试"""
+
+    def test_adds_request_id_and_rate_limit_headers(self, client, is_allowed):
+        """测试响应中包含请求ID和限流头"""
+        response = client.get("/api/v1/items")
+
+        assert response.status_code == 200
+        assert response.headers["X-Request-ID"]
+        assert response.headers["X-RateLimit-Limit"] == "60"
+        assert response.headers["X-RateLimit-Remaining"] == "59"
+        assert response.headers["X-RateLimit-Reset"] == "60"
+
+    def test_propagates_request_id(self, client, is_allowed):
+        """测试透传客户端提供的请求ID"""
+        response = client.get("/api/v1/items", headers={"X-Request-ID": "abc"})
+
+        assert response.headers["X-Request-ID"] == "abc"
+
+    def test_generated_request_ids_unique(self, client, is_allowed):
+        """测试生成的请求ID不重复"""
+        ids = {client.get("/api/v1/items").headers["X-Request-ID"] for _ in range(5)}
+
+        assert len(ids) == 5
+
+    def test_excluded_path_skips_rate_limit(self, client, is_allowed):
+        """测试排除路径不做限流检查"""
+        response = client.get("/health")
+
+        assert response.status_code == 200
+        assert "X-RateLimit-Limit" not in response.headers
+        is_allowed.assert_not_called()
+
+    def test_preflight_bypasses_rate_limit(self, client, is_allowed):
+        """测试 CORS 预检请求不做限流检查"""
+        client.options(
+            "/api/v1/items",
+            headers={"Origin": "http://a.test", "Access-Control-Request-Method": "POST"}
+        )
+
+        is_allowed.assert_not_called()
+
+    def test_rejects_with_429(self, client, is_allowed):
+        """测试超限时返回 429 而不是抛出异常"""
+        is_allowed.return_value = (False, 30, 60)
+
+        response = client.get("/api/v1/items")
+
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "30"
+        assert response.headers["X-Request-ID"]
+        assert response.json()["error"]["code"] == "ERR_1003"
+
+    def test_logs_completed_request(self, client, is_allowed):
+        """测试记录访问日志"""
+        with patch("app.core.access.logger") as logger:
+            logger.isEnabledFor.return_value = True
+            client.get("/api/v1/items", headers={"X-Request-ID": "abc"})
+
+        extra = logger.info.call_args.kwargs["extra"]
+        assert extra["request_id"] == "abc"
+        assert extra["status_code"] == 200
+        assert extra["path"] == "/api/v1/items"
+
+    def test_logs_failed_request(self, client, is_allowed):
+        """测试处理异常时记录错误日志"""
+        with patch("app.core.access.logger") as logger:
+            response = client.get("/boom")
+
+        assert response.status_code == 500
+        assert logger.error.call_args.kwargs["extra"]["error"] == "boom"
+
+
+class TestPerformanceRecording:
+    """请求性能记录测试"""
+
+    def test_records_completed_request(self, client, is_allowed):
+        """测试请求结束后记录性能并添加响应时间头"""
+        with patch("app.core.access.PerformanceMonitor.record_completed") as record:
+            response = client.get("/api/v1/items")
+
+        assert response.headers["X-Response-Time"].endswith("ms")
+        record.assert_called_once()
+        path, method, duration_ms, status_code = record.call_args.args
+        assert (path, method, status_code) == ("/api/v1/items", "GET", 200)
+        assert duration_ms >= 0
+
+    def test_excluded_path_not_recorded(self, client, is_allowed):
+        """测试健康检查等路径不记录性能"""
+        with patch("app.core.access.PerformanceMonitor.record_completed") as record:
+            response = client.get("/health")
+
+        assert "X-Response-Time" not in response.headers
+        record.assert_not_called()
+
+    def test_rejected_request_not_recorded(self, client, is_allowed):
+        """测试被限流拒绝的请求不记录性能"""
+        is_allowed.return_value = (False, 30, 60)
+
+        with patch("app.core.access.PerformanceMonitor.record_completed") as record:
+            client.get("/api/v1/items")
+
+        record.assert_not_called()
+
+    def test_unhandled_error_logged(self, client, is_allowed):
+        """测试未处理的异常记入错误日志"""
+        with patch("app.core.access.ErrorLogger.log_error", new_callable=AsyncMock) as log_error:
+            client.get("/boom")
+
+        log_error.assert_awaited_once()
+        assert log_error.call_args.kwargs["error_type"] == "RuntimeError"
+        assert log_error.call_args.kwargs["endpoint"] == "/boom"
+
+
+class TestConcurrencyLimit:
+    """并发上限测试"""
+
+    def _middleware(self, max_inflight):
+        app = Starlette(routes=[Route("/api/v1/items", _ok), Route("/health/live", _ok)])
+        return AccessMiddleware(app, max_inflight=max_inflight)
+
+    def test_rejects_when_saturated(self, is_allowed):
+        """测试并发数达到上限时直接返回 503"""
+        middleware = self._middleware(1)
+        middleware._inflight = 1
+
+        response = TestClient(middleware).get("/api/v1/items")
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        assert response.json()["error"]["code"] == "ERR_1004"
+        is_allowed.assert_not_called()
+
+    def test_health_not_limited(self, is_allowed):
+        """测试健康检查不受并发上限限制"""
+        middleware = self._middleware(1)
+        middleware._inflight = 1
+
+        response = TestClient(middleware).get("/health/live")
+
+        assert response.status_code == 200
+
+    def test_inflight_released(self, is_allowed):
+        """测试请求结束后释放并发计数"""
+        middleware = self._middleware(1)
+        client = TestClient(middleware)
+
+        assert client.get("/api/v1/items").status_code == 200
+        assert client.get("/api/v1/items").status_code == 200
+        assert middleware._inflight == 0
+
+
+class TestLivenessProbeMiddleware:
+    """存活探针中间件测试"""
+
+    def _client(self):
+        app = Starlette(routes=[Route("/health/live", _boom), Route("/api/v1/items", _ok)])
+        return TestClient(
+            LivenessProbeMiddleware(app, path="/health/live", body=b'{"status":"alive"}'),
+            raise_server_exceptions=False
+        )
+
+    def test_answers_probe_directly(self):
+        """测试探针请求不进入内层应用"""
+        response = self._client().get("/health/live")
+
+        assert response.status_code == 200
+        assert response.json() == {"status": "alive"}
+        assert response.headers["content-length"] == "18"
+
+    def test_passes_other_requests(self):
+        """测试其他请求正常交给内层应用"""
+        assert self._client().get("/api/v1/items").text == "ok"
@@ -0,0 +1,81 @@
+"""
+计费API测试
+"""
+import pytest
+from decimal import Decimal
+from httpx import AsyncClient
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.api.billing import get_current_user
+from app.main import app
+from app.models.billing import BillingPlan, BillingUsageType
+from app.models.user import User
+from app.services.usage_service import SubscriptionService, UsageTrackingService
+
+
+@pytest.fixture
+def current_user():
+    """模拟已登录用户"""
+    user = MagicMock(id=7)
+    app.dependency_overrides[get_current_user] = lambda: user
+    yield user
+    app.dependency_overrides.pop(get_current_user, None)
+
+
+@pytest.mark.asyncio
+async def test_record_usage_batch(client: AsyncClient, current_user):
+    """测试一次上报的多条用量通过批量写入记录"""
+    with patch.object(
+        UsageTrackingService, "record_usage_batch", new_callable=AsyncMock, return_value=2
+    ) as record:
+        response = await client.post(
+            app.url_path_for("record_usage_batch"),
+            json={
+                "subscription_id": 3,
+                "items": [
+                    {"usage_type": "api_call", "quantity": 1, "skill_id": 5},
+                    {"usage_type": "cpu_time", "quantity": "0.25", "skill_id": 5},
+                ]
+            }
+        )
+
+    assert response.status_code == 200
+    assert response.json()["count"] == 2
+    record.assert_awaited_once()
+    kwargs = record.call_args.kwargs
+    assert (kwargs["subscription_id"], kwargs["user_id"]) == (3, 7)
+    assert [item["usage_type"] for item in kwargs["items"]] == [
+        BillingUsageType.API_CALL, BillingUsageType.CPU_TIME
+    ]
+    assert kwargs["items"][1]["quantity"] == Decimal("0.25")
+
+
+@pytest.mark.asyncio
+async def test_record_usage_batch_rejects_empty(client: AsyncClient, current_user):
+    """测试空的用量列表被拒绝"""
+    response = await client.post(
+        app.url_path_for("record_usage_batch"),
+        json={"subscription_id": 3, "items": []}
+    )
+
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_cancel_subscription_includes_plan(client: AsyncClient, db_session, current_user):
+    """测试取消订阅的响应包含套餐信息"""
+    db_session.add(User(id=7, email="u@example.com", username="u", hashed_password="x"))
+    db_session.add(BillingPlan(id=1, name="Basic", slug="basic"))
+    await db_session.flush()
+    subscription = await SubscriptionService.create_subscription(db_session, user_id=7, plan_id=1)
+    await db_session.commit()
+    db_session.expunge_all()
+
+    response = await client.post(
+        app.url_path_for("cancel_subscription", subscription_id=subscription.id)
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "cancelled"
+    assert data["plan"]["slug"] == "basic"
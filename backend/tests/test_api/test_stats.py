@@ -0,0 +1,40 @@
+"""
+统计API测试
+"""
+import pytest
+from httpx import AsyncClient
+from unittest.mock import patch
+
+from app.main import app
+from app.services.stats_service import StatsLogBuffer, StatsService
+
+
+@pytest.mark.asyncio
+async def test_record_execution_enqueues(client: AsyncClient):
+    """测试记录执行只放入写入队列，不在请求中写库"""
+    with patch.object(StatsLogBuffer, "record_execution") as record, \
+            patch.object(StatsService, "record_executions") as write:
+        response = await client.post(
+            app.url_path_for("record_execution"),
+            json={"skill_id": 1, "status": "success", "duration_ms": 12}
+        )
+
+    assert response.status_code == 204
+    record.assert_called_once()
+    assert record.call_args.kwargs["skill_id"] == 1
+    assert record.call_args.kwargs["duration_ms"] == 12
+    write.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_record_view_enqueues(client: AsyncClient):
+    """测试记录浏览只放入写入队列"""
+    with patch.object(StatsLogBuffer, "record_view") as record:
+        response = await client.post(
+            app.url_path_for("record_view"),
+            json={"skill_id": 2, "source": "search"}
+        )
+
+    assert response.status_code == 204
+    record.assert_called_once()
+    assert record.call_args.kwargs["source"] == "search"
@@ -11,6 +11,7 @@ from app.core.cache import (
     CacheKeys,
     CacheExpire
 )
+from app.config import settings
 
 
 @pytest.mark.asyncio
@@ -21,7 +22,8 @@ class TestCacheManager:
         """测试成功连接"""
         cache_manager = CacheManager()
         
-        with patch('redis.asyncio.from_url') as mock_redis:
+        with patch('redis.asyncio.BlockingConnectionPool.from_url') as mock_pool, \
+                patch('redis.asyncio.Redis') as mock_redis:
             mock_client = AsyncMock()
             mock_client.ping = AsyncMock()
             mock_redis.return_value = mock_client
@@ -30,12 +32,16 @@ class TestCacheManager:
             
             assert cache_manager._connected is True
             mock_client.ping.assert_called_once()
+            assert mock_pool.call_args.kwargs["max_connections"] == settings.REDIS_MAX_CONNECTIONS
+            assert mock_pool.call_args.kwargs["timeout"] == settings.REDIS_POOL_TIMEOUT
+            mock_redis.assert_called_once_with(connection_pool=mock_pool.return_value)
     
     async def test_connect_failure(self):
         """测试连接失败"""
         cache_manager = CacheManager()
         
-        with patch('redis.asyncio.from_url') as mock_redis:
+        with patch('redis.asyncio.BlockingConnectionPool.from_url'), \
+                patch('redis.asyncio.Redis') as mock_redis:
             mock_client = AsyncMock()
             mock_client.ping = AsyncMock(side_effect=Exception("Connection failed"))
             mock_redis.return_value = mock_client
@@ -44,6 +50,19 @@ class TestCacheManager:
             
             assert cache_manager._connected is False
     
+    async def test_pool_stats(self):
+        """测试连接池使用情况统计"""
+        cache_manager = CacheManager()
+        assert cache_manager.pool_stats() == {}
+
+        cache_manager.pool = MagicMock(max_connections=50)
+        cache_manager.pool._in_use_connections = {1, 2}
+        cache_manager.pool._available_connections = [3]
+
+        assert cache_manager.pool_stats() == {
+            "max_connections": 50, "in_use": 2, "available": 1
+        }
+    
     async def test_get_cache_hit(self):
         """测试缓存命中"""
         cache_manager = CacheManager()
@@ -0,0 +1,71 @@
+"""
+数据库分区维护测试
+"""
+import pytest
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+from app.database import PARTITION_MONTHS_AHEAD
+from tasks.maintenance_tasks import create_log_partitions
+
+# 按月分区的表；模块只导入 app.database，模型需由维护任务自行注册
+PARTITIONED_TABLES = [
+    "rate_limit_logs",
+    "skill_invocation_logs",
+    "skill_stat_execution_logs",
+    "skill_view_logs",
+    "billing_usage",
+    "deployment_health_checks",
+]
+# 模型按月分区、但数据库中仍是普通表
+NOT_YET_PARTITIONED = "deployment_logs"
+
+
+@pytest.fixture
+def executed():
+    """模拟 worker 引擎的连接，记录执行的 SQL"""
+    statements = []
+
+    async def execute(stmt):
+        sql = str(stmt)
+        statements.append(sql)
+        if "pg_class" in sql:
+            return [(name,) for name in PARTITIONED_TABLES]
+        return MagicMock()
+
+    conn = MagicMock()
+    conn.dialect.name = "postgresql"
+    conn.execute = execute
+    engine = MagicMock()
+    engine.begin.return_value.__aenter__.return_value = conn
+    with patch("app.database.worker_engine", engine):
+        yield statements
+
+
+class TestCreateLogPartitions:
+    """定时分区维护任务测试"""
+
+    def test_creates_partitions_for_partitioned_tables(self, executed):
+        """测试任务为每个分区表创建默认分区和本月分区"""
+        create_log_partitions()
+
+        month = f"{date.today():%Y%m}"
+        for table in PARTITIONED_TABLES:
+            assert f'CREATE TABLE IF NOT EXISTS "{table}_default" PARTITION OF "{table}" DEFAULT' in executed
+            assert any(
+                sql.startswith(f'CREATE TABLE IF NOT EXISTS "{table}_p{month}" PARTITION OF "{table}"')
+                for sql in executed
+            )
+
+    def test_creates_months_ahead(self, executed):
+        """测试提前创建之后几个月的分区"""
+        create_log_partitions()
+
+        partitions = [sql for sql in executed if '"rate_limit_logs_p' in sql]
+        assert len(partitions) == PARTITION_MONTHS_AHEAD + 1
+
+    def test_skips_tables_not_yet_partitioned(self, executed):
+        """测试数据库中尚未转换为分区表的表被跳过"""
+        create_log_partitions()
+
+        assert not any(f'"{NOT_YET_PARTITIONED}_' in sql for sql in executed)
@@ -0,0 +1,58 @@
+"""
+日志格式化模块测试
+"""
+import json
+import logging
+
+from app.core.log_format import JSONFormatter, KeyValueFormatter
+
+
+def _make_record(msg="request_completed", **extra):
+    record = logging.LogRecord("app.main", logging.INFO, __file__, 1, msg, None, None)
+    record.__dict__.update(extra)
+    return record
+
+
+class TestJSONFormatter:
+    """JSON 格式化器测试"""
+
+    def test_includes_extra_fields(self):
+        """测试 extra 字段与基础字段一起输出"""
+        record = _make_record(request_id="abc", status_code=200, duration_ms=1.5)
+
+        payload = json.loads(JSONFormatter().format(record))
+
+        assert payload["message"] == "request_completed"
+        assert payload["level"] == "INFO"
+        assert payload["logger"] == "app.main"
+        assert payload["request_id"] == "abc"
+        assert payload["status_code"] == 200
+        assert payload["duration_ms"] == 1.5
+
+    def test_non_serializable_extra(self):
+        """测试无法序列化的字段退化为字符串"""
+        record = _make_record(error=ValueError("boom"))
+
+        payload = json.loads(JSONFormatter().format(record))
+
+        assert payload["error"] == "boom"
+
+
+class TestKeyValueFormatter:
+    """键值文本格式化器测试"""
+
+    def test_appends_extra_fields(self):
+        """测试字符串字段加引号，数值字段原样输出"""
+        record = _make_record(request_id="abc", status_code=200)
+
+        line = KeyValueFormatter("%(levelname)s - %(message)s").format(record)
+
+        assert line == 'INFO - request_completed | request_id="abc" | status_code=200'
+
+    def test_without_extra(self):
+        """测试无 extra 字段时与普通格式化一致"""
+        record = _make_record("plain message")
+
+        line = KeyValueFormatter("%(levelname)s - %(message)s").format(record)
+
+        assert line == "INFO - plain message"
@@ -0,0 +1,578 @@
+"""
+监控模块测试
+"""
+import asyncio
+import json
+from collections import deque
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.core import monitoring
+from app.core.monitoring import (
+    PerformanceMonitor,
+    ErrorLogger,
+    HealthChecker,
+    MetricsSnapshot,
+    MonitoringFlusher,
+    MonitoringStats,
+    SkillExecutionMetrics,
+    SystemMetrics,
+    monitor_query
+)
+
+
+def _mock_pipeline():
+    """创建模拟的 Redis pipeline"""
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=[])
+    pipe.__aenter__ = AsyncMock(return_value=pipe)
+    pipe.__aexit__ = AsyncMock(return_value=False)
+    return pipe
+
+
+@pytest.fixture(autouse=True)
+def reset_monitor():
+    """每个测试前清空性能统计"""
+    PerformanceMonitor._stats.clear()
+    PerformanceMonitor._pending.clear()
+    SkillExecutionMetrics._pending.clear()
+    MonitoringFlusher._drain([])
+    yield
+    PerformanceMonitor._stats.clear()
+    PerformanceMonitor._pending.clear()
+    SkillExecutionMetrics._pending.clear()
+    MonitoringFlusher._drain([])
+
+
+@pytest.mark.asyncio
+class TestPerformanceMonitor:
+    """性能监控测试"""
+
+    async def test_fast_request_skips_redis(self):
+        """测试快速请求只更新内存统计"""
+        client = MagicMock()
+        client.lpush = AsyncMock()
+
+        with patch("app.core.monitoring.cache") as mock_cache:
+            mock_cache._connected = True
+            mock_cache.client = client
+
+            await PerformanceMonitor.record_request("/api/v1/skills", "GET", 12.0, 200)
+
+        client.lpush.assert_not_called()
+        assert MonitoringFlusher._queue.empty()
+        stats = PerformanceMonitor.get_stats()
+        assert stats["GET:/api/v1/skills"]["total_requests"] == 1
+        assert PerformanceMonitor._pending[("GET", "/api/v1/skills")] == [1, 12.0]
+
+    async def test_flush_writes_deltas(self):
+        """测试增量刷新使用一次 pipeline"""
+        pipe = _mock_pipeline()
+        client = MagicMock()
+        client.pipeline = MagicMock(return_value=pipe)
+
+        with patch("app.core.monitoring.cache") as mock_cache:
+            mock_cache._connected = True
+            mock_cache.client = client
+
+            await PerformanceMonitor.record_request("/api/v1/skills", "GET", 10.0, 200)
+            await PerformanceMonitor.record_request("/api/v1/skills", "GET", 20.0, 200)
+            await MonitoringFlusher.flush()
+
+        pipe.hincrby.assert_called_once()
+        assert pipe.hincrby.call_args[0][1] == "GET:/api/v1/skills:count"
+        assert pipe.hincrby.call_args[0][2] == 2
+        assert pipe.hincrbyfloat.call_args[0][2] == 30.0
+        pipe.execute.assert_awaited_once()
+        assert not PerformanceMonitor._pending
+
+    async def test_get_stats_reuses_unchanged_snapshot(self):
+        """测试未变化的端点复用上次计算结果"""
+        with patch("app.core.monitoring.cache") as mock_cache:
+            mock_cache._connected = False
+            mock_cache.client = None
+
+            await PerformanceMonitor.record_request("/a", "GET", 10.0, 200)
+            await PerformanceMonitor.record_request("/b", "GET", 10.0, 500)
+            first = PerformanceMonitor.get_stats()
+
+            await PerformanceMonitor.record_request("/b", "GET", 30.0, 200)
+            second = PerformanceMonitor.get_stats()
+
+        assert second["GET:/a"] is first["GET:/a"]
+        assert second["GET:/b"]["total_requests"] == 2
+        assert second["GET:/b"]["avg_time_ms"] == 20.0
+        assert second["GET:/b"]["error_rate"] == 50.0
+
+    async def test_stats_keyed_by_method_and_endpoint(self):
+        """测试内部按 (method, endpoint) 记录，读取时格式化键和时间"""
+        with patch("app.core.monitoring.cache") as mock_cache, \
+                patch("app.core.monitoring.time.time", return_value=1704067200.0):
+            mock_cache._connected = False
+            mock_cache.client = None
+
+            await PerformanceMonitor.record_request("/a", "POST", 10.0, 200)
+
+        assert PerformanceMonitor._stats[("POST", "/a")].last_updated == 1704067200.0
+        stats = PerformanceMonitor.get_stats()
+        assert stats["POST:/a"]["last_updated"] == "2024-01-01T00:00:00"
+
+
+class TestSampling:
+    """请求采样测试"""
+
+    def test_errors_and_slow_requests_always_recorded(self):
+        """测试错误和慢请求不参与采样"""
+        with patch("app.core.monitoring.random.random", return_value=0.99):
+            assert PerformanceMonitor.sample_weight(5.0, 500) == 1
+            assert PerformanceMonitor.sample_weight(1500.0, 200) == 1
+            assert PerformanceMonitor.sample_weight(5.0, 200) == 0
+
+    def test_sampled_request_is_weighted(self):
+        """测试被采中的快速请求按采样率放大计数"""
+        with patch("app.core.monitoring.random.random", return_value=0.01), \
+                patch("app.core.monitoring.cache") as mock_cache:
+            mock_cache._connected = True
+            mock_cache.client = MagicMock()
+
+            weight = PerformanceMonitor.sample_weight(5.0, 200)
+            PerformanceMonitor.record_request_sync("/a", "GET", 5.0, 200, weight)
+
+        assert weight == PerformanceMonitor.SAMPLE_RATE
+        stats = PerformanceMonitor.get_stats()["GET:/a"]
+        assert stats["total_requests"] == PerformanceMonitor.SAMPLE_RATE
+        assert stats["avg_time_ms"] == 5.0
+        assert PerformanceMonitor._pending[("GET", "/a")][0] == PerformanceMonitor.SAMPLE_RATE
+
+    def test_record_completed_skips_unsampled(self):
+        """测试未被采中的快速请求不更新统计"""
+        with patch("app.core.monitoring.random.random", return_value=0.99), \
+                patch.object(PerformanceMonitor, "record_request_sync") as record:
+            PerformanceMonitor.record_completed("/a", "GET", 5.0, 200)
+
+        record.assert_not_called()
+
+    def test_record_completed_slow_request(self):
+        """测试慢请求总是记录并写警告日志"""
+        with patch.object(PerformanceMonitor, "record_request_sync") as record, \
+                patch("app.core.monitoring.logger") as mock_logger:
+            PerformanceMonitor.record_completed("/a", "GET", 1500.0, 200)
+
+        record.assert_called_once_with("/a", "GET", 1500.0, 200, 1)
+        mock_logger.warning.assert_called_once()
+
+
+@pytest.mark.asyncio
+class TestMonitorQuery:
+    """查询监控装饰器测试"""
+
+    async def test_stack_trace_disabled_by_default(self):
+        """测试默认不采集堆栈"""
+        @monitor_query
+        async def failing_query():
+            raise ValueError("boom")
+
+        with patch.object(ErrorLogger, "log_error", new=AsyncMock()) as mock_log:
+            with pytest.raises(ValueError):
+                await failing_query()
+
+        assert mock_log.call_args.kwargs["stack_trace"] is None
+
+    async def test_stack_trace_formatted_when_enabled(self):
+        """测试开启后采集格式化的堆栈"""
+        @monitor_query
+        async def failing_query():
+            raise ValueError("boom")
+
+        with patch.object(ErrorLogger, "log_error", new=AsyncMock()) as mock_log, \
+                patch.object(ErrorLogger, "INCLUDE_TRACEBACKS", True):
+            with pytest.raises(ValueError):
+                await failing_query()
+
+        stack_trace = mock_log.call_args.kwargs["stack_trace"]
+        assert "Traceback" in stack_trace
+        assert "ValueError: boom" in stack_trace
+
+
+@pytest.mark.asyncio
+class TestSlowQueryDetector:
+    """慢查询检测测试"""
+
+    async def test_disconnected_skips_record(self):
+        """测试 Redis 未连接时不构建和入队记录"""
+        with patch("app.core.monitoring.cache") as mock_cache, \
+                patch("app.core.monitoring._truncate_query") as truncate:
+            mock_cache._connected = False
+            mock_cache.client = None
+
+            await monitoring.SlowQueryDetector.log_query("SELECT 1", 800.0)
+
+        truncate.assert_not_called()
+        assert MonitoringFlusher._queue.empty()
+
+
+@pytest.mark.asyncio
+class TestDailyStats:
+    """每日统计测试"""
+
+    async def test_selected_endpoints_use_hmget(self):
+        """测试指定端点时只读取对应字段"""
+        client = MagicMock()
+        client.hgetall = AsyncMock()
+        client.hmget = AsyncMock(return_value=["3", None, "1.5", None])
+
+        with patch("app.core.monitoring.cache") as mock_cache:
+            mock_cache._connected = True
+            mock_cache.client = client
+
+            result = await PerformanceMonitor.get_daily_stats(
+                "2024-01-01", endpoints=["GET:/a", "GET:/b"]
+            )
+
+        client.hgetall.assert_not_called()
+        client.hmget.assert_awaited_once_with(
+            "monitor:api:2024-01-01",
+            ["GET:/a:count", "GET:/b:count", "GET:/a:time", "GET:/b:time"]
+        )
+        assert result == {"GET:/a:count": "3", "GET:/a:time": "1.5"}
+
+
+@pytest.mark.asyncio
+class TestSlowRequestLog:
+    """慢请求日志读取测试"""
+
+    async def test_reuses_decoded_records(self):
+        """测试重复读取时复用已解码的记录"""
+        old = json.dumps({"endpoint": "/a", "duration_ms": 1500})
+        new = json.dumps({"endpoint": "/b", "duration_ms": 2500})
+        client = MagicMock()
+        client.lrange = AsyncMock(side_effect=[[old], [new, old]])
+
+        with patch("app.core.monitoring.cache") as mock_cache:
+            mock_cache._connected = True
+            mock_cache.client = client
+
+            first = await PerformanceMonitor.get_slow_requests("2024-01-02")
+            second = await PerformanceMonitor.get_slow_requests("2024-01-02")
+
+        assert [r["endpoint"] for r in second] == ["/b", "/a"]
+        assert second[1] is first[0]
+
+
+@pytest.mark.asyncio
+class TestErrorLogger:
+    """错误日志收集测试"""
+
+    async def test_log_error_is_queued(self):
+        """测试错误记录不直接访问 Redis，由后台批量写入"""
+        pipe = _mock_pipeline()
+        client = MagicMock()
+        client.pipeline = MagicMock(return_value=pipe)
+
+        with patch("app.core.monitoring.cache") as mock_cache:
+            mock_cache._connected = True
+            mock_cache.client = client
+
+            await ErrorLogger.log_error("ValueError", "boom", endpoint="/a", method="GET")
+            await ErrorLogger.log_error("KeyError", "missing", endpoint="/b", method="GET")
+            client.pipeline.assert_not_called()
+
+            await MonitoringFlusher.flush()
+
+        client.pipeline.assert_called_once_with(transaction=False)
+        pipe.lpush.assert_called_once()
+        assert len(pipe.lpush.call_args[0]) == 3
+        payload = pipe.lpush.call_args[0][1]
+        assert json.loads(payload)["error_type"] == "ValueError"
+        assert pipe.incrby.call_args[0][1] == 2
+        pipe.execute.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+class TestMonitoringStats:
+    """监控统计汇总测试"""
+
+    async def test_full_stats_use_one_pipeline(self):
+        """测试完整统计只执行一次 pipeline"""
+        pipe = _mock_pipeline()
+        pipe.execute = AsyncMock(return_value=[
+            [json.dumps({"endpoint": "/slow"})],
+            "4",
+            [json.dumps({"error_type": "ValueError"})],
+            None,
+            [],
+            {"GET:/a:count": "2"},
+        ])
+        client = MagicMock()
+        client.pipeline = MagicMock(return_value=pipe)
+
+        with patch("app.core.monitoring.cache") as mock_cache:
+            mock_cache._connected = True
+            mock_cache.client = client
+
+            stats = await MonitoringStats.get_full_stats()
+
+        pipe.execute.assert_awaited_once()
+        assert stats["performance"]["slow_requests"] == [{"endpoint": "/slow"}]
+        assert stats["performance"]["daily"] == {"GET:/a:count": "2"}
+        assert stats["errors"]["count"] == 4
+        assert stats["queries"]["slow_count"] == 0
+
+
+@pytest.mark.asyncio
+class TestMonitoringFlusher:
+    """后台批量写入测试"""
+
+    async def test_slow_request_is_queued(self):
+        """测试慢请求记录进入写入队列"""
+        with patch("app.core.monitoring.cache") as mock_cache:
+            mock_cache._connected = True
+            mock_cache.client = MagicMock()
+
+            await PerformanceMonitor.record_request("/slow", "POST", 1500.0, 200)
+
+        list_name, _, record = MonitoringFlusher._queue.get_nowait()
+        assert list_name == "slow"
+        assert record["endpoint"] == "/slow"
+
+    async def test_full_queue_drops_events(self):
+        """测试队列写满时丢弃事件而不阻塞"""
+        with patch.object(MonitoringFlusher, "_queue", asyncio.Queue(maxsize=1)):
+            dropped = MonitoringFlusher.dropped_events
+            MonitoringFlusher.enqueue("errors", {"n": 1})
+            MonitoringFlusher.enqueue("errors", {"n": 2})
+
+            assert MonitoringFlusher._queue.qsize() == 1
+            assert MonitoringFlusher.dropped_events == dropped + 1
+
+    async def test_failed_write_restores_counters(self):
+        """测试写入失败时端点增量保留到下次刷新"""
+        pipe = _mock_pipeline()
+        pipe.execute = AsyncMock(side_effect=ConnectionError("down"))
+        client = MagicMock()
+        client.pipeline = MagicMock(return_value=pipe)
+
+        with patch("app.core.monitoring.cache") as mock_cache:
+            mock_cache._connected = True
+            mock_cache.client = client
+
+            await PerformanceMonitor.record_request("/a", "GET", 5.0, 200)
+            await MonitoringFlusher.flush()
+
+        assert PerformanceMonitor._pending[("GET", "/a")] == [1, 5.0]
+
+    async def test_flush_stops_at_snapshot(self):
+        """测试刷新只写出开始时已在队列中的事件"""
+        async def write(events, flush_counters):
+            # 写入期间不断有新事件到达（超过 3 次后停止，回归时测试失败而不是挂起）
+            if mock_write.call_count <= 3:
+                MonitoringFlusher.enqueue("errors", {"n": "late"})
+
+        with patch.object(MonitoringFlusher, "_queue", asyncio.Queue()), \
+                patch.object(MonitoringFlusher, "_write", side_effect=write) as mock_write:
+            MonitoringFlusher.enqueue("errors", {"n": 1})
+            await MonitoringFlusher.flush()
+
+            assert mock_write.call_count == 1
+            assert MonitoringFlusher._queue.qsize() == 1
+
+
+class TestMonitoringFlusherRestart:
+    """同一进程内多次启动测试"""
+
+    def test_restart_in_new_event_loop(self):
+        """测试新的事件循环中重新启动后后台任务仍能取到事件"""
+        async def lifespan(n):
+            MonitoringFlusher.start()
+            task = MonitoringFlusher._task
+            MonitoringFlusher.enqueue("errors", {"n": n})
+            await asyncio.sleep(MonitoringFlusher.LINGER_SECONDS * 2)
+            alive = not task.done()
+            await MonitoringFlusher.stop()
+            return alive
+
+        with patch.object(MonitoringFlusher, "_queue", asyncio.Queue()), \
+                patch.object(MonitoringFlusher, "_write", new_callable=AsyncMock) as mock_write:
+            assert asyncio.run(lifespan(1)) is True
+            assert asyncio.run(lifespan(2)) is True
+
+        written = [record["n"] for args in mock_write.call_args_list for _, _, record in args.args[0]]
+        assert written == [1, 2]
+
+    def test_restart_keeps_pending_events(self):
+        """测试启动前已入队的事件转移到新队列"""
+        async def lifespan():
+            MonitoringFlusher.start()
+            await MonitoringFlusher.stop()
+
+        with patch.object(MonitoringFlusher, "_queue", asyncio.Queue()), \
+                patch.object(MonitoringFlusher, "_write", new_callable=AsyncMock) as mock_write:
+            MonitoringFlusher.enqueue("errors", {"n": 1})
+            asyncio.run(lifespan())
+
+        written = [record["n"] for args in mock_write.call_args_list for _, _, record in args.args[0]]
+        assert written == [1]
+
+
+class TestToday:
+    """日期缓存测试"""
+
+    def test_date_recomputed_after_midnight(self):
+        """测试跨过 UTC 零点后日期更新"""
+        monitoring._today_expires_at = 0.0
+        with patch("app.core.monitoring.time.time", return_value=1704153599.0):
+            assert monitoring._today() == "2024-01-01"
+        with patch("app.core.monitoring.time.time", return_value=1704153600.0):
+            assert monitoring._today() == "2024-01-02"
+        monitoring._today_expires_at = 0.0
+
+
+@pytest.mark.asyncio
+class TestRecentErrorsInMemory:
+    """内存错误缓冲测试"""
+
+    async def test_keeps_latest_hundred(self):
+        """测试内存中只保留最近100条错误"""
+        with patch("app.core.monitoring.cache") as mock_cache, \
+                patch.object(ErrorLogger, "_errors", deque(maxlen=100)):
+            mock_cache._connected = False
+            mock_cache.client = None
+
+            for i in range(150):
+                await ErrorLogger.log_error("ValueError", f"error {i}")
+
+            recent = await ErrorLogger.get_recent_errors(limit=10)
+            count = await ErrorLogger.get_error_count()
+
+        assert count == 100
+        assert [e["message"] for e in recent] == [f"error {i}" for i in range(140, 150)]
+
+
+@pytest.mark.asyncio
+class TestSystemMetrics:
+    """系统指标采集测试"""
+
+    async def test_collect_does_not_block_and_reuses_process_scans(self):
+        """测试 CPU 采样不阻塞，网络连接数和打开文件数按间隔刷新"""
+        with patch("app.core.monitoring.psutil.cpu_percent", return_value=12.5) as cpu, \
+                patch.object(monitoring._process, "net_connections", return_value=[1, 2]) as conns, \
+                patch.object(monitoring._process, "open_files", return_value=[1, 2, 3]) as files, \
+                patch.object(SystemMetrics, "_process_scan_expires_at", 0.0):
+            first = await SystemMetrics.collect()
+            second = await SystemMetrics.collect()
+
+        cpu.assert_called_with(interval=None)
+        conns.assert_called_once_with(kind="inet")
+        files.assert_called_once_with()
+        assert first["cpu"]["percent"] == 12.5
+        assert second["network"]["connections"] == 2
+        assert second["process"]["open_files"] == 3
+
+    async def test_open_files_can_be_disabled(self):
+        """测试关闭后不扫描打开的文件"""
+        with patch.object(monitoring._process, "open_files") as files, \
+                patch.object(SystemMetrics, "COLLECT_OPEN_FILES", False), \
+                patch.object(SystemMetrics, "_process_scan_expires_at", 0.0):
+            metrics = await SystemMetrics.collect()
+
+        files.assert_not_called()
+        assert metrics["process"]["open_files"] is None
+
+    async def test_net_connections_can_be_disabled(self):
+        """测试关闭后不扫描网络连接"""
+        with patch.object(monitoring._process, "net_connections") as conns, \
+                patch.object(SystemMetrics, "COLLECT_NET_CONNECTIONS", False), \
+                patch.object(SystemMetrics, "_process_scan_expires_at", 0.0):
+            metrics = await SystemMetrics.collect()
+
+        conns.assert_not_called()
+        assert metrics["network"]["connections"] is None
+
+
+@pytest.mark.asyncio
+class TestMetricsSnapshot:
+    """监控指标快照测试"""
+
+    async def test_concurrent_requests_share_collection(self):
+        """测试并发请求只采集一次，TTL 内复用结果"""
+        stats = AsyncMock(return_value={"date": "x"})
+        with patch.object(MonitoringStats, "get_full_stats", stats), \
+                patch.object(SystemMetrics, "collect", AsyncMock(return_value={"cpu": {}})), \
+                patch.object(MetricsSnapshot, "_snapshot", None), \
+                patch.object(MetricsSnapshot, "_expires_at", 0.0):
+            results = await asyncio.gather(*(MetricsSnapshot.get() for _ in range(5)))
+            again = await MetricsSnapshot.get()
+
+        stats.assert_awaited_once()
+        assert all(r == {"monitoring": {"date": "x"}, "system": {"cpu": {}}} for r in results)
+        assert again is results[0]
+
+    async def test_expired_snapshot_recollected(self):
+        """测试快照过期后重新采集"""
+        stats = AsyncMock(return_value={})
+        with patch.object(MonitoringStats, "get_full_stats", stats), \
+                patch.object(SystemMetrics, "collect", AsyncMock(return_value={})), \
+                patch.object(MetricsSnapshot, "_snapshot", None), \
+                patch.object(MetricsSnapshot, "_expires_at", 0.0), \
+                patch.object(MetricsSnapshot, "TTL_SECONDS", 0.0):
+            await MetricsSnapshot.get()
+            await MetricsSnapshot.get()
+
+        assert stats.await_count == 2
+
+
+@pytest.mark.asyncio
+class TestHealthChecker:
+    """健康检查测试"""
+
+    async def test_full_health_runs_checks_concurrently(self):
+        """测试数据库和 Redis 检查并行执行"""
+        started = []
+        release = asyncio.Event()
+
+        async def slow_check(name):
+            started.append(name)
+            await release.wait()
+            return {"status": "healthy"}
+
+        with patch.object(HealthChecker, "check_database", lambda: slow_check("db")), \
+                patch.object(HealthChecker, "check_redis", lambda: slow_check("redis")), \
+                patch.object(HealthChecker, "check_disk_space", AsyncMock(return_value={"status": "warning"})):
+            task = asyncio.create_task(HealthChecker.get_full_health())
+            for _ in range(5):
+                await asyncio.sleep(0)
+            assert sorted(started) == ["db", "redis"]
+            release.set()
+            health = await task
+
+        assert health["status"] == "degraded"
+        assert health["checks"]["database"] == {"status": "healthy"}
+        assert health["checks"]["disk"] == {"status": "warning"}
+
+
+@pytest.mark.asyncio
+class TestSkillExecutionMetrics:
+    """技能执行指标测试"""
+
+    async def test_executions_are_coalesced(self):
+        """测试多次执行合并为一次 pipeline 写入"""
+        pipe = _mock_pipeline()
+        client = MagicMock()
+        client.pipeline = MagicMock(return_value=pipe)
+        client.hincrby = AsyncMock()
+
+        with patch("app.core.monitoring.cache") as mock_cache:
+            mock_cache._connected = True
+            mock_cache.client = client
+
+            for _ in range(3):
+                await SkillExecutionMetrics.record_execution(7, True, 100)
+            await SkillExecutionMetrics.record_execution(7, False, 100, "TIMEOUT")
+            client.hincrby.assert_not_called()
+
+            await MonitoringFlusher.flush()
+
+        fields = {c[0][1]: c[0][2] for c in pipe.hincrby.call_args_list}
+        assert fields == {"7:total": 4, "7:success": 3, "7:failure": 1}
+        pipe.execute.assert_awaited_once()
+        assert not SkillExecutionMetrics._pending
@@ -0,0 +1,310 @@
+"""
+限流模块测试
+"""
+import asyncio
+from hashlib import blake2b
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.core.rate_limit import (
+    InMemoryRateLimiter,
+    RateLimitAuditLog,
+    RedisRateLimiter,
+    RateLimitConfig,
+    _rate_limit_key,
+    _resolve_rule,
+    client_ip_from_scope
+)
+
+
+class TestInMemoryRateLimiter:
+    """内存限流器测试"""
+
+    def test_allows_until_limit(self):
+        """测试窗口内达到上限后拒绝"""
+        limiter = InMemoryRateLimiter()
+
+        with patch("app.core.rate_limit.time.monotonic", return_value=1000.0):
+            results = [limiter.is_allowed("ip:1", 3, 60) for _ in range(4)]
+
+        assert [r[0] for r in results] == [True, True, True, False]
+        assert results[2][2] == 3
+        assert results[3] == (False, 60, 3)
+
+    def test_expired_requests_are_released(self):
+        """测试窗口过期后重新允许请求"""
+        limiter = InMemoryRateLimiter()
+
+        with patch("app.core.rate_limit.time.monotonic", return_value=1000.0):
+            limiter.is_allowed("ip:1", 2, 60)
+        with patch("app.core.rate_limit.time.monotonic", return_value=1030.0):
+            limiter.is_allowed("ip:1", 2, 60)
+            assert limiter.is_allowed("ip:1", 2, 60) == (False, 30, 2)
+        with patch("app.core.rate_limit.time.monotonic", return_value=1060.0):
+            assert limiter.is_allowed("ip:1", 2, 60) == (True, 0, 2)
+
+    def test_idle_keys_are_collected(self):
+        """测试过期的键在定期清理时被删除"""
+        limiter = InMemoryRateLimiter()
+        limiter.GC_INTERVAL = 3
+
+        with patch("app.core.rate_limit.time.monotonic", return_value=1000.0):
+            limiter.is_allowed("ip:1", 5, 60)
+            limiter.is_allowed("ip:2", 5, 60)
+        with patch("app.core.rate_limit.time.monotonic", return_value=1061.0):
+            limiter.is_allowed("ip:3", 5, 60)
+
+        assert list(limiter.requests) == ["ip:3"]
+
+    def test_retry_after_rounds_up(self):
+        """测试重试时间向上取整，不会返回 0 秒"""
+        limiter = InMemoryRateLimiter()
+
+        with patch("app.core.rate_limit.time.monotonic", return_value=1000.0):
+            limiter.is_allowed("ip:1", 1, 60)
+        with patch("app.core.rate_limit.time.monotonic", return_value=1059.5):
+            assert limiter.is_allowed("ip:1", 1, 60) == (False, 1, 1)
+
+    def test_keys_are_independent(self):
+        """测试不同限流键互不影响"""
+        limiter = InMemoryRateLimiter()
+
+        assert limiter.is_allowed("ip:1", 1, 60)[0] is True
+        assert limiter.is_allowed("ip:1", 1, 60)[0] is False
+        assert limiter.is_allowed("ip:2", 1, 60)[0] is True
+
+
+@pytest.mark.asyncio
+class TestRedisRateLimiter:
+    """Redis 限流器测试"""
+
+    async def test_allowed_within_limit(self):
+        """测试计数未超限时允许"""
+        limiter = RedisRateLimiter()
+        script = AsyncMock(return_value=[2, 59000])
+
+        with patch("app.core.rate_limit.cache") as mock_cache:
+            mock_cache._connected = True
+            mock_cache.client.register_script = MagicMock(return_value=script)
+
+            result = await limiter.is_allowed("ip:1", 10, 60)
+
+        assert result == (True, 0, 2)
+        assert script.call_args.kwargs["keys"] == ["ratelimit:ip:1:60"]
+        assert script.call_args.kwargs["args"] == [60000]
+
+    async def test_rejected_with_retry_after_from_ttl(self):
+        """测试超限时使用窗口剩余时间作为重试时间"""
+        limiter = RedisRateLimiter()
+        script = AsyncMock(return_value=[11, 12500])
+
+        with patch("app.core.rate_limit.cache") as mock_cache:
+            mock_cache._connected = True
+            mock_cache.client.register_script = MagicMock(return_value=script)
+
+            result = await limiter.is_allowed("ip:1", 10, 60)
+
+        assert result == (False, 13, 11)
+
+    async def test_blocked_key_skips_redis(self):
+        """测试超限后窗口内的请求直接在本地拒绝"""
+        limiter = RedisRateLimiter()
+        script = AsyncMock(return_value=[11, 12500])
+
+        with patch("app.core.rate_limit.cache") as mock_cache, \
+                patch("app.core.rate_limit.time.monotonic", return_value=100.0):
+            mock_cache._connected = True
+            mock_cache.client.register_script = MagicMock(return_value=script)
+
+            first = await limiter.is_allowed("ip:1", 10, 60)
+            second = await limiter.is_allowed("ip:1", 10, 60)
+
+        assert first == second == (False, 13, 11)
+        script.assert_awaited_once()
+
+    async def test_block_expires_with_window(self):
+        """测试窗口过期后重新访问 Redis"""
+        limiter = RedisRateLimiter()
+        script = AsyncMock(side_effect=[[11, 12500], [1, 60000]])
+
+        with patch("app.core.rate_limit.cache") as mock_cache, \
+                patch("app.core.rate_limit.time.monotonic", side_effect=[100.0, 113.0]):
+            mock_cache._connected = True
+            mock_cache.client.register_script = MagicMock(return_value=script)
+
+            await limiter.is_allowed("ip:1", 10, 60)
+            result = await limiter.is_allowed("ip:1", 10, 60)
+
+        assert result == (True, 0, 1)
+        assert script.await_count == 2
+
+    async def test_load_script_preloads_sha(self):
+        """测试启动时预加载脚本并复用"""
+        limiter = RedisRateLimiter()
+        script = AsyncMock(return_value=[1, 60000])
+
+        with patch("app.core.rate_limit.cache") as mock_cache:
+            mock_cache._connected = True
+            mock_cache.client.register_script = MagicMock(return_value=script)
+            mock_cache.client.script_load = AsyncMock()
+
+            await limiter.load_script()
+            await limiter.is_allowed("ip:1", 10, 60)
+
+        mock_cache.client.script_load.assert_awaited_once_with(RedisRateLimiter.LUA_SCRIPT)
+        mock_cache.client.register_script.assert_called_once()
+
+    async def test_not_connected_raises(self):
+        """测试 Redis 未连接时抛出异常由外层降级"""
+        limiter = RedisRateLimiter()
+
+        with patch("app.core.rate_limit.cache") as mock_cache:
+            mock_cache._connected = False
+
+            with pytest.raises(ConnectionError):
+                await limiter.is_allowed("ip:1", 10, 60)
+
+
+class TestResolveRule:
+    """限流规则匹配测试"""
+
+    def test_rule_priority(self):
+        """测试上传和认证规则优先于 API 前缀"""
+        assert _resolve_rule("/api/v1/files/upload") == RateLimitConfig.FILE_UPLOAD
+        assert _resolve_rule("/api/v1/auth/token") == RateLimitConfig.AUTH
+        assert _resolve_rule("/api/v1/login") == RateLimitConfig.AUTH
+        assert _resolve_rule("/api/v1/skills") == RateLimitConfig.API
+        assert _resolve_rule("/ws") == RateLimitConfig.DEFAULT
+
+
+class TestRateLimitKey:
+    """限流键测试"""
+
+    def _request(self, user_id=None, client=("10.0.0.1", 5000), forwarded_for=None):
+        request = MagicMock()
+        request.state.user_id = user_id
+        headers = [(b"x-forwarded-for", forwarded_for.encode())] if forwarded_for else []
+        request.scope = {"client": client, "headers": [(b"accept", b"*/*")] + headers}
+        return request
+
+    def test_user_id_preferred(self):
+        """测试已认证请求使用用户ID"""
+        assert _rate_limit_key(self._request(user_id=42, forwarded_for="1.2.3.4")) == "u:42"
+
+    def test_forwarded_for_first_address(self):
+        """测试代理请求使用 X-Forwarded-For 中的第一个地址"""
+        request = self._request(forwarded_for="1.2.3.4, 10.0.0.2")
+        assert _rate_limit_key(request) == _rate_limit_key(self._request(client=("1.2.3.4", 1)))
+
+    def test_client_address_from_scope(self):
+        """测试直接从 scope 读取客户端地址"""
+        key = _rate_limit_key(self._request())
+        assert key == "i:" + blake2b(b"10.0.0.1", digest_size=8).hexdigest()
+        assert _rate_limit_key(self._request(client=None)) != key
+
+    def test_ip_not_stored_in_key(self):
+        """测试限流键中不包含原始 IP"""
+        key = _rate_limit_key(self._request(forwarded_for="1.2.3.4"))
+        assert "1.2.3.4" not in key
+        assert len(key) == 18
+
+
+class TestClientIpFromScope:
+    """客户端IP解析测试"""
+
+    def test_forwarded_for_single(self):
+        """测试只有一个地址的 X-Forwarded-For"""
+        scope = {"headers": [(b"x-forwarded-for", b" 1.2.3.4 ")], "client": ("10.0.0.1", 1)}
+        assert client_ip_from_scope(scope) == "1.2.3.4"
+
+    def test_forwarded_for_chain(self):
+        """测试代理链取第一个地址"""
+        scope = {"headers": [(b"x-forwarded-for", b"1.2.3.4, 10.0.0.2")], "client": None}
+        assert client_ip_from_scope(scope) == "1.2.3.4"
+
+    def test_fallback_to_client(self):
+        """测试无代理头时使用对端地址"""
+        assert client_ip_from_scope({"headers": [], "client": ("10.0.0.1", 1)}) == "10.0.0.1"
+        assert client_ip_from_scope({"headers": [], "client": None}) == "unknown"
+
+
+@pytest.mark.asyncio
+class TestRateLimitAuditLog:
+    """限流审计日志测试"""
+
+    @pytest.fixture(autouse=True)
+    def queue(self):
+        with patch.object(RateLimitAuditLog, "_queue", asyncio.Queue(maxsize=2)) as queue, \
+                patch.object(RateLimitAuditLog, "_blocked_logged", {}):
+            yield queue
+
+    async def test_blocked_always_recorded(self):
+        """测试被拒绝的请求总是记录"""
+        with patch.object(RateLimitAuditLog, "SAMPLE_RATE", 0.0):
+            RateLimitAuditLog.record("i:abc", "/api/v1/items", "GET", 60, 60, 61, blocked=True)
+
+        row = RateLimitAuditLog._queue.get_nowait()
+        assert row["key_type"] == "ip"
+        assert row["key_value"] == "i:abc"
+        assert row["blocked"] is True
+
+    async def test_allowed_sampled_out(self):
+        """测试放行的请求按抽样比例记录"""
+        with patch.object(RateLimitAuditLog, "SAMPLE_RATE", 0.0):
+            RateLimitAuditLog.record("u:1", "/api/v1/items", "GET", 60, 60, 1, blocked=False)
+
+        assert RateLimitAuditLog._queue.empty()
+
+    async def test_full_queue_drops_events(self):
+        """测试队列写满时丢弃事件而不阻塞"""
+        dropped = RateLimitAuditLog.dropped_events
+        for user_id in range(3):
+            RateLimitAuditLog.record(f"u:{user_id}", "/a", "GET", 60, 60, 61, blocked=True)
+
+        assert RateLimitAuditLog._queue.qsize() == 2
+        assert RateLimitAuditLog.dropped_events == dropped + 1
+
+    async def test_flush_writes_one_batch(self):
+        """测试刷新时一次写出队列中的事件"""
+        RateLimitAuditLog.record("u:1", "/a", "GET", 60, 60, 61, blocked=True)
+        RateLimitAuditLog.record("u:2", "/b", "POST", 60, 60, 61, blocked=True)
+
+        with patch.object(RateLimitAuditLog, "_write", new_callable=AsyncMock) as write:
+            await RateLimitAuditLog.flush()
+
+        rows = write.call_args.args[0]
+        assert [row["key_value"] for row in rows] == ["u:1", "u:2"]
+        assert RateLimitAuditLog._queue.empty()
+
+    async def test_blocked_recorded_once_per_window(self):
+        """测试同一个键在封禁期内只记录第一次拒绝"""
+        for _ in range(3):
+            RateLimitAuditLog.record("u:1", "/a", "GET", 60, 60, 61, blocked=True, retry_after=30)
+        RateLimitAuditLog.record("u:1", "/a", "GET", 10, 1, 11, blocked=True, retry_after=1)
+
+        rows = [RateLimitAuditLog._queue.get_nowait() for _ in range(2)]
+        assert [row["window_seconds"] for row in rows] == [60, 1]
+
+    async def test_blocked_recorded_again_after_window(self):
+        """测试封禁期结束后再次被拒绝时重新记录"""
+        with patch("app.core.rate_limit.time.monotonic", return_value=100.0):
+            RateLimitAuditLog.record("u:1", "/a", "GET", 60, 60, 61, blocked=True, retry_after=30)
+        with patch("app.core.rate_limit.time.monotonic", return_value=131.0):
+            RateLimitAuditLog.record("u:1", "/a", "GET", 60, 60, 61, blocked=True, retry_after=30)
+
+        assert RateLimitAuditLog._queue.qsize() == 2
+
+    async def test_flush_stops_at_snapshot(self):
+        """测试刷新只写出开始时已在队列中的事件"""
+        RateLimitAuditLog.record("u:1", "/a", "GET", 60, 60, 61, blocked=True)
+
+        async def write(rows):
+            # 写入期间不断有新事件到达
+            RateLimitAuditLog._queue.put_nowait({"key_value": "late"})
+
+        with patch.object(RateLimitAuditLog, "_write", side_effect=write) as mock_write:
+            await RateLimitAuditLog.flush()
+
+        assert mock_write.call_count == 1
+        assert RateLimitAuditLog._queue.get_nowait() == {"key_value": "late"}
@@ -0,0 +1,192 @@
+"""
+技能执行沙箱测试
+"""
+import io
+import json
+import tarfile
+import pytest
+from unittest.mock import MagicMock, patch
+
+import docker
+
+from app.core.skill_executor import SANDBOX_ENV_FILE, SANDBOX_USER, SkillExecutionSandbox
+
+
+@pytest.fixture
+def api():
+    client = MagicMock()
+    client.api.create_container.return_value = {"Id": "new-container"}
+    with patch("app.core.skill_executor.get_docker_client", return_value=client):
+        yield client.api
+
+
+@pytest.fixture
+def sandbox(api):
+    sandbox = SkillExecutionSandbox()
+    sandbox.warm_pool_size = 0
+    return sandbox
+
+
+def _log_stream(chunks):
+    stream = MagicMock()
+    stream.__iter__.return_value = iter(chunks)
+    return stream
+
+
+def _untar(archive: bytes) -> dict:
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        return {m.name: tar.extractfile(m).read() for m in tar.getmembers()}
+
+
+@pytest.mark.asyncio
+class TestWarmPool:
+    """预创建容器池测试"""
+
+    async def test_acquire_uses_pool_and_refills(self, sandbox, api):
+        """测试优先取预创建的容器，并在后台补充"""
+        sandbox.warm_pool_size = 1
+        sandbox._warm_pool.put_nowait("warm-container")
+
+        container_id = await sandbox._acquire_container()
+        await sandbox._refill_task
+
+        assert container_id == "warm-container"
+        assert sandbox._warm_pool.get_nowait() == "new-container"
+        api.create_container.assert_called_once()
+
+    async def test_acquire_creates_when_pool_empty(self, sandbox, api):
+        """测试池为空时现场创建容器"""
+        container_id = await sandbox._acquire_container()
+
+        assert container_id == "new-container"
+        assert sandbox._refill_task is None
+
+    async def test_container_runs_as_unprivileged_user(self, sandbox, api):
+        """测试容器以非 root 用户运行，技能目录和根文件系统不可写"""
+        await sandbox._acquire_container()
+
+        kwargs = api.create_container.call_args.kwargs
+        assert kwargs["user"] == SANDBOX_USER
+        assert not SANDBOX_USER.startswith("0")
+        host_config = api.create_host_config.call_args.kwargs
+        assert host_config["read_only"] is True
+        assert host_config["cap_drop"] == ["ALL"]
+
+    async def test_refill_does_not_use_execution_executor(self, sandbox, api):
+        """测试补充容器不占用执行线程池"""
+        sandbox.warm_pool_size = 2
+
+        with patch.object(sandbox, "_run_in_executor", side_effect=AssertionError):
+            await sandbox._refill()
+
+        assert sandbox._warm_pool.qsize() == 2
+
+    async def test_refill_stops_on_error(self, sandbox, api):
+        """测试创建失败时停止补充"""
+        sandbox.warm_pool_size = 2
+        api.create_container.side_effect = docker.errors.APIError("boom")
+
+        await sandbox._refill()
+
+        assert sandbox._warm_pool.empty()
+
+    async def test_close_removes_unused_containers(self, sandbox, api):
+        """测试关闭时删除尚未使用的容器"""
+        sandbox._warm_pool.put_nowait("a")
+        sandbox._warm_pool.put_nowait("b")
+
+        await sandbox.close()
+
+        removed = [c.args[0] for c in api.remove_container.call_args_list]
+        assert removed == ["a", "b"]
+        assert api.remove_container.call_args.kwargs == {"v": True, "force": True}
+
+
+class TestArchiveAndLogs:
+    """文件打包和日志读取测试"""
+
+    def test_archive_contents(self, sandbox):
+        """测试 tar 包包含技能文件、参数文件和环境变量文件"""
+        archive = sandbox._build_archive(
+            {"main.py": b"print(1)", "lib/util.py": b"x = 1"},
+            b'{"a": 1}',
+            {"SKILL_ID": "7", "SKILL_MAIN_FILE": "my main.py"}
+        )
+
+        entries = _untar(archive)
+        with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+            # 文件属于 root 且不可被其他用户写入，沙箱用户只能读取
+            assert {(m.uid, m.mode) for m in tar.getmembers()} == {(0, 0o644)}
+
+        assert entries["main.py"] == b"print(1)"
+        assert entries["lib/util.py"] == b"x = 1"
+        assert json.loads(entries["params.json"]) == {"a": 1}
+        assert entries[SANDBOX_ENV_FILE] == b"SKILL_ID=7\nSKILL_MAIN_FILE='my main.py'\n"
+
+    def test_logs_truncated_at_budget(self, sandbox, api):
+        """测试日志超过上限后停止读取并截断"""
+        sandbox.max_output_size = 8
+        chunks = iter([b"a" * 6, b"b" * 6, b"c" * 6])
+        stream = _log_stream(chunks)
+        api.logs.return_value = stream
+
+        logs = sandbox._read_logs("c1")
+
+        assert logs == "aaaaaabb\n... [output truncated]"
+        assert next(chunks) == b"c" * 6
+        stream.close.assert_called_once()
+
+    def test_logs_within_budget(self, sandbox, api):
+        """测试日志未超过上限时原样返回"""
+        api.logs.return_value = _log_stream([b"ok\n"])
+
+        assert sandbox._read_logs("c1") == "ok\n"
+
+
+@pytest.mark.asyncio
+class TestExecuteSkill:
+    """技能执行测试"""
+
+    async def test_success(self, sandbox, api):
+        """测试写入技能文件后启动容器并返回输出"""
+        api.wait.return_value = {"StatusCode": 0}
+        api.logs.return_value = _log_stream([b"done"])
+        api.stats.return_value = {"memory_stats": {"usage": 1024 * 1024, "limit": 4 * 1024 * 1024}}
+
+        result = await sandbox.execute_skill(7, {"main.py": "print(1)"}, "main.py", {}, 1)
+
+        assert result["success"] is True
+        assert result["output"] == "done"
+        assert result["resource_usage"]["memory_percent"] == 25.0
+        container_id, path, archive = api.put_archive.call_args.args
+        assert (container_id, path) == ("new-container", "/app/skill")
+        assert "main.py" in _untar(archive)
+        api.start.assert_called_once_with("new-container")
+        api.remove_container.assert_called_once_with("new-container", v=True, force=True)
+
+    async def test_container_removed_on_start_failure(self, sandbox, api):
+        """测试启动失败时仍删除容器"""
+        api.start.side_effect = docker.errors.APIError("boom")
+
+        result = await sandbox.execute_skill(7, {"main.py": ""}, "main.py", {}, 1)
+
+        assert result["error_code"] == "CONTAINER_ERROR"
+        api.remove_container.assert_called_once_with("new-container", v=True, force=True)
+
+    async def test_timeout_kills_and_removes_container(self, sandbox, api):
+        """测试超时时终止并删除容器"""
+        api.wait.side_effect = Exception("read timeout")
+
+        result = await sandbox.execute_skill(7, {"main.py": ""}, "main.py", {}, 1)
+
+        assert result["error_code"] == "TIMEOUT"
+        api.kill.assert_called_once_with("new-container")
+        api.remove_container.assert_called_once_with("new-container", v=True, force=True)
+
+    async def test_validation_error_creates_no_container(self, sandbox, api):
+        """测试文件路径非法时不创建容器"""
+        result = await sandbox.execute_skill(7, {"../x.py": ""}, "main.py", {}, 1)
+
+        assert result["error_code"] == "VALIDATION_ERROR"
+        api.create_container.assert_not_called()
+        api.remove_container.assert_not_called()
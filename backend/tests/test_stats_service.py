@@ -0,0 +1,266 @@
+"""
+统计数据服务测试
+"""
+import asyncio
+import pytest
+from datetime import date
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+import app.models  # noqa: F401  注册外键引用的表
+from app.models.skill_stats import SkillRatingDistribution, SkillStatExecutionLog, SkillViewLog
+from app.services.stats_service import StatsLogBuffer, StatsService
+
+
+@pytest.fixture
+def db():
+    session = MagicMock()
+    session.execute = AsyncMock()
+    session.commit = AsyncMock()
+    session.rollback = AsyncMock()
+    return session
+
+
+@pytest.fixture
+def service(db):
+    service = StatsService(db)
+    service._upsert_daily_stat = AsyncMock()
+    return service
+
+
+def _inserted_rows(db):
+    """取出 bulk_insert 传给 execute 的行"""
+    stmt, rows = db.execute.call_args.args
+    return stmt, rows
+
+
+def _compiled_columns(model, rows) -> str:
+    """按 PostgreSQL 方言编译多 VALUES INSERT，返回列清单部分"""
+    sql = str(insert(model).values(rows).compile(dialect=postgresql.dialect()))
+    return sql[sql.index("(") + 1:sql.index(")")]
+
+
+@pytest.mark.asyncio
+class TestRecordLogs:
+    """批量记录执行/浏览日志测试"""
+
+    async def test_record_executions_single_insert(self, service, db):
+        """测试执行日志通过一条 INSERT 写入全部行"""
+        count = await service.record_executions([
+            {"skill_id": 1, "user_id": 7, "status": "error", "duration_ms": 12,
+             "metadata": {"trace": "abc"}},
+            {"skill_id": 1},
+            {"skill_id": 2, "execution_type": "test"},
+        ])
+
+        assert count == 3
+        db.execute.assert_awaited_once()
+        stmt, rows = _inserted_rows(db)
+        assert stmt.table.name == SkillStatExecutionLog.__tablename__
+        assert len(rows) == 3
+        assert rows[0]["extra_data"] == {"trace": "abc"}
+        assert rows[1]["execution_type"] == "invoke"
+        assert rows[1]["status"] == "success"
+        db.commit.assert_awaited_once()
+
+    async def test_record_executions_column_mapping(self, service, db):
+        """测试行字典的键对应模型属性，extra_data 写入 metadata 列"""
+        await service.record_executions([{"skill_id": 1, "metadata": {"a": 1}}])
+
+        _, rows = _inserted_rows(db)
+        columns = _compiled_columns(SkillStatExecutionLog, rows)
+
+        assert "metadata" in columns.split(", ")
+        assert "extra_data" not in columns
+        assert set(rows[0]) <= set(SkillStatExecutionLog.__mapper__.columns.keys())
+
+    async def test_record_executions_aggregates_daily_stats(self, service):
+        """测试每日统计按技能合并计数"""
+        await service.record_executions([{"skill_id": 1}, {"skill_id": 2}, {"skill_id": 1}])
+
+        increments = {
+            call.kwargs["skill_id"]: call.kwargs["increment"]
+            for call in service._upsert_daily_stat.call_args_list
+        }
+        assert increments == {1: {"execution_count": 2}, 2: {"execution_count": 1}}
+
+    async def test_record_views(self, service, db):
+        """测试浏览日志批量写入并累加浏览次数"""
+        count = await service.record_views([
+            {"skill_id": 3, "user_id": 5, "source": "search", "referrer": "/search?q=x"},
+            {"skill_id": 3},
+        ])
+
+        assert count == 2
+        stmt, rows = _inserted_rows(db)
+        assert stmt.table.name == SkillViewLog.__tablename__
+        assert rows[0] == {"skill_id": 3, "user_id": 5, "source": "search", "referrer": "/search?q=x"}
+        assert _compiled_columns(SkillViewLog, rows).split(", ")[:4] == [
+            "skill_id", "user_id", "source", "referrer"
+        ]
+        service._upsert_daily_stat.assert_awaited_once()
+        assert service._upsert_daily_stat.call_args.kwargs["increment"] == {"view_count": 2}
+
+    async def test_empty_batch_skips_database(self, service, db):
+        """测试空批次不访问数据库"""
+        assert await service.record_views([]) == 0
+        db.execute.assert_not_called()
+        db.commit.assert_not_called()
+
+    async def test_failure_rolls_back(self, service, db):
+        """测试写入失败时回滚并返回 0"""
+        db.execute.side_effect = Exception("db down")
+
+        assert await service.record_executions([{"skill_id": 1}]) == 0
+        db.rollback.assert_awaited_once()
+        db.commit.assert_not_called()
+
+
+@pytest.mark.asyncio
+class TestStatsLogBuffer:
+    """执行/浏览日志后台写入测试"""
+
+    @pytest.fixture(autouse=True)
+    def queue(self):
+        with patch.object(StatsLogBuffer, "_queue", asyncio.Queue(maxsize=3)) as queue:
+            yield queue
+
+    async def test_record_does_not_touch_database(self):
+        """测试记录时只入队，不打开数据库会话"""
+        with patch("app.services.stats_service.AsyncSessionLocal") as session_factory:
+            StatsLogBuffer.record_execution(1, user_id=7, status="error")
+            StatsLogBuffer.record_view(2, source="search")
+
+        session_factory.assert_not_called()
+        assert StatsLogBuffer._queue.get_nowait() == ("execution", {"skill_id": 1, "user_id": 7, "status": "error"})
+        assert StatsLogBuffer._queue.get_nowait() == ("view", {"skill_id": 2, "source": "search"})
+
+    async def test_full_queue_drops_records(self):
+        """测试队列写满时丢弃记录而不阻塞"""
+        dropped = StatsLogBuffer.dropped_events
+        for skill_id in range(4):
+            StatsLogBuffer.record_view(skill_id)
+
+        assert StatsLogBuffer._queue.qsize() == 3
+        assert StatsLogBuffer.dropped_events == dropped + 1
+
+    async def test_flush_writes_each_kind_in_one_batch(self):
+        """测试刷新时执行和浏览日志各通过一次批量写入"""
+        StatsLogBuffer.record_execution(1)
+        StatsLogBuffer.record_view(2)
+        StatsLogBuffer.record_execution(3, duration_ms=5)
+
+        with patch("app.services.stats_service.AsyncSessionLocal"), \
+                patch.object(StatsService, "record_executions", new_callable=AsyncMock) as executions, \
+                patch.object(StatsService, "record_views", new_callable=AsyncMock) as views:
+            await StatsLogBuffer.flush()
+
+        executions.assert_awaited_once_with([{"skill_id": 1}, {"skill_id": 3, "duration_ms": 5}])
+        views.assert_awaited_once_with([{"skill_id": 2}])
+        assert StatsLogBuffer._queue.empty()
+
+    async def test_flush_splits_batches(self):
+        """测试超过单批上限时分批写入"""
+        for skill_id in range(3):
+            StatsLogBuffer.record_view(skill_id)
+
+        with patch.object(StatsLogBuffer, "MAX_BATCH_SIZE", 2), \
+                patch.object(StatsLogBuffer, "_write", new_callable=AsyncMock) as write:
+            await StatsLogBuffer.flush()
+
+        assert [len(call.args[0]) for call in write.call_args_list] == [2, 1]
+
+    async def test_full_batch_flushes_before_interval(self):
+        """测试积累到一批时不等写入间隔立即写入"""
+        with patch.object(StatsLogBuffer, "MAX_BATCH_SIZE", 2), \
+                patch.object(StatsLogBuffer, "FLUSH_INTERVAL_SECONDS", 60), \
+                patch.object(StatsLogBuffer, "_write", new_callable=AsyncMock) as write:
+            StatsLogBuffer.start()
+            StatsLogBuffer.record_view(1)
+            await asyncio.sleep(0.01)
+            assert write.await_count == 0
+
+            StatsLogBuffer.record_view(2)
+            await asyncio.sleep(0.01)
+            assert write.await_count == 1
+
+            await StatsLogBuffer.stop()
+
+        assert [item["skill_id"] for _, item in write.call_args_list[0].args[0]] == [1, 2]
+
+
+RATING_COUNT_COLUMNS = [f"rating_{n}_count" for n in range(1, 6)]
+
+
+@pytest.fixture
+def rating_table():
+    """SQLite 内存库中只建评分分布表，用于验证生成列"""
+    engine = create_engine("sqlite://")
+    table = SkillRatingDistribution.__table__
+    table.create(engine)
+    with engine.begin() as conn:
+        yield conn, table
+    engine.dispose()
+
+
+def _upsert_counts(conn, table, counts):
+    """按 (skill_id, stat_date) 冲突时覆盖计数列，对应 PostgreSQL 上的 ON CONFLICT 语句"""
+    stmt = sqlite_insert(table).values(skill_id=1, stat_date=date(2026, 10, 1), **counts)
+    conn.execute(stmt.on_conflict_do_update(
+        index_elements=["skill_id", "stat_date"],
+        set_={column: stmt.excluded[column] for column in RATING_COUNT_COLUMNS}
+    ))
+
+
+@pytest.mark.asyncio
+class TestRatingDistribution:
+    """评分分布更新测试"""
+
+    async def test_upsert_statement(self, service, db):
+        """测试通过一条 INSERT ... SELECT ... ON CONFLICT 写入，只更新计数列"""
+        assert await service.update_rating_distribution(5) is True
+
+        stmt = db.execute.call_args.args[0]
+        on_conflict = stmt._post_values_clause
+        assert on_conflict.constraint_target == "uq_skill_rating_dist_skill_date"
+        assert [key for key, _ in on_conflict.update_values_to_set] == RATING_COUNT_COLUMNS
+        assert stmt._select_names == ["skill_id", "stat_date", "created_at", *RATING_COUNT_COLUMNS]
+        assert len(stmt.select.selected_columns) == len(stmt._select_names)
+        db.commit.assert_awaited_once()
+
+    async def test_upsert_constraint_exists(self):
+        """测试 ON CONFLICT 引用的唯一约束在表上定义"""
+        names = {c.name for c in SkillRatingDistribution.__table__.constraints}
+        assert "uq_skill_rating_dist_skill_date" in names
+
+    async def test_generated_totals(self, rating_table):
+        """测试总数和平均分由数据库根据各星级计数生成"""
+        conn, table = rating_table
+        _upsert_counts(conn, table, {"rating_4_count": 1, "rating_5_count": 1})
+
+        row = conn.execute(select(table.c.total_ratings, table.c.avg_rating)).one()
+        assert row.total_ratings == 2
+        assert row.avg_rating == Decimal("4.50")
+
+    async def test_generated_totals_follow_upsert(self, rating_table):
+        """测试冲突更新计数列后生成列随之重新计算"""
+        conn, table = rating_table
+        _upsert_counts(conn, table, {"rating_5_count": 3})
+        _upsert_counts(conn, table, {"rating_1_count": 1, "rating_2_count": 1, "rating_5_count": 1})
+
+        rows = conn.execute(select(table.c.total_ratings, table.c.avg_rating)).all()
+        assert len(rows) == 1
+        assert rows[0].total_ratings == 3
+        assert rows[0].avg_rating == Decimal("2.67")
+
+    async def test_generated_totals_empty(self, rating_table):
+        """测试没有评分时平均分为 0 而不是除零错误"""
+        conn, table = rating_table
+        _upsert_counts(conn, table, {})
+
+        row = conn.execute(select(table.c.total_ratings, table.c.avg_rating)).one()
+        assert (row.total_ratings, row.avg_rating) == (0, Decimal("0.00"))
@@ -0,0 +1,135 @@
+"""
+用量记录服务测试
+"""
+import pytest
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+import app.models  # noqa: F401  注册关联的模型
+from app.models.billing import (
+    BillingPlan, BillingUnit, BillingUsage, BillingUsageType, Subscription, SubscriptionStatus
+)
+from app.models.user import User
+from app.schemas.billing import SubscriptionResponse
+from app.services.usage_service import SubscriptionService, UsageTrackingService
+
+
+@pytest.fixture
+def subscription():
+    subscription = MagicMock()
+    subscription.plan.overage_rate_api = Decimal("0.01")
+    subscription.plan.overage_rate_cpu = Decimal("0.5")
+    subscription.current_period_start = datetime(2026, 10, 1)
+    subscription.current_period_end = datetime(2026, 11, 1)
+    return subscription
+
+
+@pytest.fixture
+def db(subscription):
+    session = MagicMock()
+    lookup = MagicMock()
+    lookup.scalar_one_or_none.return_value = subscription
+    session.execute = AsyncMock(side_effect=[lookup, MagicMock()])
+    return session
+
+
+@pytest.mark.asyncio
+class TestRecordUsageBatch:
+    """批量记录用量测试"""
+
+    async def test_single_insert(self, db):
+        """测试订阅只查询一次，全部用量通过一条 INSERT 写入"""
+        count = await UsageTrackingService.record_usage_batch(
+            db, subscription_id=3, user_id=7,
+            items=[
+                {"usage_type": BillingUsageType.API_CALL, "quantity": Decimal("10"), "skill_id": 5},
+                {"usage_type": BillingUsageType.CPU_TIME, "quantity": Decimal("2"),
+                 "metadata": {"run": "a"}},
+            ]
+        )
+
+        assert count == 2
+        assert db.execute.await_count == 2
+        stmt, rows = db.execute.call_args.args
+        assert stmt.table.name == BillingUsage.__tablename__
+        assert [row["total_cost"] for row in rows] == [Decimal("0.10"), Decimal("1.0")]
+        assert rows[0]["unit"] == BillingUnit.COUNT
+        assert rows[0]["extra_data"] == {}
+        assert rows[1]["extra_data"] == {"run": "a"}
+        assert {row["period_start"] for row in rows} == {datetime(2026, 10, 1)}
+
+    async def test_missing_subscription(self, db):
+        """测试订阅不存在时报错且不写入"""
+        lookup = MagicMock()
+        lookup.scalar_one_or_none.return_value = None
+        db.execute.side_effect = [lookup]
+
+        with pytest.raises(ValueError):
+            await UsageTrackingService.record_usage_batch(
+                db, subscription_id=3, user_id=7,
+                items=[{"usage_type": BillingUsageType.API_CALL, "quantity": Decimal("1")}]
+            )
+        db.execute.assert_awaited_once()
+
+
+@pytest.fixture
+async def sessions():
+    """SQLite 内存库中只建用户、套餐和订阅表，返回会话工厂"""
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            lambda sync_conn: [
+                model.__table__.create(sync_conn) for model in (User, BillingPlan, Subscription)
+            ]
+        )
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as session:
+        session.add(User(id=7, email="u@example.com", username="u", hashed_password="x"))
+        session.add(BillingPlan(id=1, name="Basic", slug="basic"))
+        await session.commit()
+    yield factory
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+class TestSubscriptionResponse:
+    """订阅接口返回的对象可直接序列化（plan 已加载，不触发懒加载）"""
+
+    async def test_create_subscription(self, sessions):
+        """测试新建的订阅关联已查询的套餐"""
+        async with sessions() as session:
+            subscription = await SubscriptionService.create_subscription(session, user_id=7, plan_id=1)
+
+            response = SubscriptionResponse.model_validate(subscription)
+
+        assert response.plan.slug == "basic"
+
+    async def test_cancel_subscription(self, sessions):
+        """测试取消订阅时预加载套餐"""
+        async with sessions() as session:
+            subscription = await SubscriptionService.create_subscription(session, user_id=7, plan_id=1)
+            await session.commit()
+
+        async with sessions() as session:
+            cancelled = await SubscriptionService.cancel_subscription(
+                session, subscription_id=subscription.id, user_id=7
+            )
+
+            response = SubscriptionResponse.model_validate(cancelled)
+
+        assert response.status == SubscriptionStatus.CANCELLED
+        assert response.plan.slug == "basic"
+
+    async def test_cancel_other_users_subscription(self, sessions):
+        """测试不能取消其他用户的订阅"""
+        async with sessions() as session:
+            subscription = await SubscriptionService.create_subscription(session, user_id=7, plan_id=1)
+            await session.commit()
+
+        async with sessions() as session:
+            assert await SubscriptionService.cancel_subscription(
+                session, subscription_id=subscription.id, user_id=8
+            ) is None
@@ -3,12 +3,7 @@
 -- Sprint 18: 后端技能计费系统 (MVP)
 -- =====================================================
 
--- 枚举类型
-CREATE TYPE billing_plan_type AS ENUM ('free', 'basic', 'pro', 'enterprise');
-CREATE TYPE billing_cycle AS ENUM ('daily', 'weekly', 'monthly', 'yearly');
-CREATE TYPE billing_usage_type AS ENUM ('api_call', 'cpu_time', 'memory', 'storage', 'execution_time');
-CREATE TYPE subscription_status AS ENUM ('active', 'cancelled', 'expired', 'pending');
-CREATE TYPE bill_status AS ENUM ('pending', 'paid', 'cancelled', 'overdue');
+-- 枚举字段以 VARCHAR(20) + CHECK 约束存储，新增取值时无需 ALTER TYPE
 
 -- =====================================================
 -- 套餐表
@@ -20,8 +15,12 @@ CREATE TABLE billing_plans (
     description TEXT,
     
     -- 套餐类型和周期
-    plan_type billing_plan_type NOT NULL DEFAULT 'basic',
-    billing_cycle billing_cycle NOT NULL DEFAULT 'monthly',
+    plan_type VARCHAR(20) NOT NULL DEFAULT 'basic'
+        CONSTRAINT ck_billing_plans_billingplantype
+        CHECK (plan_type IN ('free', 'basic', 'pro', 'enterprise')),
+    billing_cycle VARCHAR(20) NOT NULL DEFAULT 'monthly'
+        CONSTRAINT ck_billing_plans_billingcycle
+        CHECK (billing_cycle IN ('daily', 'weekly', 'monthly', 'yearly')),
     
     -- 定价
     price DECIMAL(10, 2) NOT NULL DEFAULT 0.00,
@@ -82,7 +81,9 @@ CREATE TABLE subscriptions (
     plan_id INTEGER NOT NULL REFERENCES billing_plans(id) ON DELETE RESTRICT,
     
     -- 订阅状态
-    status subscription_status NOT NULL DEFAULT 'active',
+    status VARCHAR(20) NOT NULL DEFAULT 'active'
+        CONSTRAINT ck_subscriptions_subscriptionstatus
+        CHECK (status IN ('active', 'cancelled', 'expired', 'pending')),
     
     -- 时间范围
     started_at TIMESTAMP NOT NULL DEFAULT NOW(),
@@ -99,13 +100,15 @@ CREATE TABLE subscriptions (
     -- 时间戳
     created_at TIMESTAMP NOT NULL DEFAULT NOW(),
     updated_at TIMESTAMP NOT NULL DEFAULT NOW()
-);
+) WITH (fillfactor = 70);  -- 频繁更新，为 HOT 更新预留页内空间
 
 -- 索引
 CREATE INDEX ix_subscriptions_user_id ON subscriptions(user_id);
 CREATE INDEX ix_subscriptions_plan_id ON subscriptions(plan_id);
 CREATE INDEX ix_subscriptions_status ON subscriptions(status);
 CREATE INDEX ix_subscriptions_expires_at ON subscriptions(expires_at);
+-- 每个用户最多一个活跃订阅，同时用于按用户查询当前订阅
+CREATE UNIQUE INDEX ix_subscriptions_user_active ON subscriptions(user_id) WHERE status = 'active';
 
 -- 触发器：自动更新 updated_at
 CREATE OR REPLACE FUNCTION update_subscriptions_updated_at()
@@ -122,10 +125,10 @@ CREATE TRIGGER trigger_subscriptions_updated_at
     EXECUTE FUNCTION update_subscriptions_updated_at();
 
 -- =====================================================
--- 用量记录表
+-- 用量记录表（按 recorded_at 按月分区，分区由应用启动和定时任务创建）
 -- =====================================================
 CREATE TABLE billing_usage (
-    id SERIAL PRIMARY KEY,
+    id INTEGER GENERATED BY DEFAULT AS IDENTITY,
     subscription_id INTEGER NOT NULL REFERENCES subscriptions(id) ON DELETE CASCADE,
     user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
     
@@ -134,11 +137,15 @@ CREATE TABLE billing_usage (
     skill_name VARCHAR(255),
     
     -- 用量类型
-    usage_type billing_usage_type NOT NULL,
+    usage_type VARCHAR(20) NOT NULL
+        CONSTRAINT ck_billing_usage_billingusagetype
+        CHECK (usage_type IN ('api_call', 'cpu_time', 'memory', 'storage', 'execution_time')),
     
     -- 用量数值
     quantity DECIMAL(12, 4) NOT NULL DEFAULT 0,
-    unit VARCHAR(50) NOT NULL DEFAULT 'count',
+    unit VARCHAR(16) NOT NULL DEFAULT 'count'
+        CONSTRAINT ck_billing_usage_billingunit
+        CHECK (unit IN ('count', 'seconds', 'mb_seconds', 'mb')),
     
     -- 费用计算
     unit_price DECIMAL(10, 4) NOT NULL DEFAULT 0,
@@ -150,19 +157,27 @@ CREATE TABLE billing_usage (
     period_end TIMESTAMP NOT NULL,
     
     -- 额外信息
-    metadata JSONB DEFAULT '{}'
-);
+    metadata JSONB DEFAULT '{}',
 
--- 索引
-CREATE INDEX ix_billing_usage_subscription_id ON billing_usage(subscription_id);
-CREATE INDEX ix_billing_usage_user_id ON billing_usage(user_id);
+    -- 分区键必须包含在主键中
+    PRIMARY KEY (id, recorded_at)
+) PARTITION BY RANGE (recorded_at);
+
+-- 默认分区兜底
+CREATE TABLE billing_usage_default PARTITION OF billing_usage DEFAULT;
+
+-- 索引（user_id、subscription_id 由下方复合索引的前导列覆盖）
 CREATE INDEX ix_billing_usage_skill_id ON billing_usage(skill_id);
 CREATE INDEX ix_billing_usage_usage_type ON billing_usage(usage_type);
-CREATE INDEX ix_billing_usage_recorded_at ON billing_usage(recorded_at);
+-- 只追加写入，recorded_at 与物理顺序一致，BRIN 远小于 B-tree
+CREATE INDEX ix_billing_usage_recorded_brin ON billing_usage USING brin (recorded_at);
 CREATE INDEX ix_billing_usage_period ON billing_usage(period_start, period_end);
 
 -- 复合索引用于统计查询
 CREATE INDEX ix_billing_usage_user_type_period ON billing_usage(user_id, usage_type, period_start, period_end);
+-- 按用户/订阅查询时间范围并按 recorded_at 排序的用量明细
+CREATE INDEX ix_billing_usage_user_recorded ON billing_usage(user_id, recorded_at);
+CREATE INDEX ix_billing_usage_sub_recorded ON billing_usage(subscription_id, recorded_at);
 
 -- =====================================================
 -- 账单表
@@ -188,7 +203,9 @@ CREATE TABLE billing_bills (
     currency VARCHAR(3) NOT NULL DEFAULT 'CNY',
     
     -- 账单状态
-    status bill_status NOT NULL DEFAULT 'pending',
+    status VARCHAR(20) NOT NULL DEFAULT 'pending'
+        CONSTRAINT ck_billing_bills_billstatus
+        CHECK (status IN ('pending', 'paid', 'cancelled', 'overdue')),
     paid_at TIMESTAMP,
     
     -- 明细项目
@@ -209,6 +226,8 @@ CREATE INDEX ix_billing_bills_subscription_id ON billing_bills(subscription_id);
 CREATE INDEX ix_billing_bills_status ON billing_bills(status);
 CREATE INDEX ix_billing_bills_period ON billing_bills(period_start, period_end);
 CREATE INDEX ix_billing_bills_due_date ON billing_bills(due_date);
+-- 按用户查询未结清账单
+CREATE INDEX ix_billing_bills_user_status_period ON billing_bills(user_id, status, period_end);
 
 -- 触发器：自动更新 updated_at
 CREATE OR REPLACE FUNCTION update_billing_bills_updated_at()
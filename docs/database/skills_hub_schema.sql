@@ -66,7 +66,7 @@ CREATE TABLE IF NOT EXISTS skill_packages (
     -- 存储信息
     storage_path VARCHAR(500) NOT NULL,
     file_size INTEGER NOT NULL,
-    checksum VARCHAR(64) NOT NULL,
+    checksum BYTEA NOT NULL,  -- SHA256 原始摘要（32 字节）
     
     -- 依赖信息
     dependencies JSONB,